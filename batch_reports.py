@@ -0,0 +1,187 @@
+import argparse
+import collections
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import pdf_report
+import plan_types
+
+REPORTS_DIR = 'reports'
+CHUNK_SIZE = 25        # Members rendered per task
+DEFAULT_GOAL = "General Fitness"
+
+# Per-process state, set up once by _init_worker
+_worker = {}
+
+
+def member_profile(member):
+    """Turn a roster row into the user_info dict the chatbot expects."""
+    return {
+        'Age': int(member['Age']),
+        'Gender': member['Gender'],
+        'Weight (kg)': float(member['Weight (kg)']),
+        'Height (m)': float(member['Height (m)']),
+        'Max_BPM': int(member['Max_BPM']),
+        'Avg_BPM': int(member['Avg_BPM']),
+        'Resting_BPM': int(member['Resting_BPM']),
+        'Session_Duration (hours)': float(member['Session_Duration (hours)']),
+        'Fat_Percentage': float(member['Fat_Percentage']),
+        'Water_Intake (liters)': float(member['Water_Intake (liters)']),
+        'Workout_Frequency (days/week)': int(member['Workout_Frequency (days/week)']),
+        'BMI': float(member['BMI']),
+        'Goal': member['Goal'] if pd.notna(member.get('Goal')) else DEFAULT_GOAL,
+    }
+
+
+def read_roster(path):
+    """Read members to report on, as (member id, record) pairs.
+
+    A .jsonl file holds scored plans, one {"member_id", "plan", "meal_plan"}
+    object per line, as written by write_plans. Any other file is read as a
+    CSV roster with the columns of the members dataset (plus an optional
+    Member_ID and Goal), whose members are scored by the workers.
+    """
+    if path.endswith('.jsonl'):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield str(record['member_id']), (plan_types.WorkoutPlan.from_dict(record['plan']),
+                                                     plan_types.MealPlan.from_dict(record['meal_plan']))
+    else:
+        roster = pd.read_csv(path)
+        for i, member in roster.iterrows():
+            member_id = member['Member_ID'] if 'Member_ID' in roster.columns else f"member_{i + 1:04d}"
+            yield str(member_id), member_profile(member)
+
+
+def report_filename(member_id):
+    """Turn a member ID into a safe PDF file name: no path separators, no leading dots."""
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', member_id).strip('_')
+    return f"{slug or 'member'}.pdf"
+
+
+def write_plans(path, scored):
+    """Write (member id, plan, meal plan) triples as JSON lines."""
+    with open(path, 'w') as f:
+        for member_id, plan, meal_plan in scored:
+            f.write(json.dumps({'member_id': member_id, 'plan': plan.to_dict(), 'meal_plan': meal_plan.to_dict()}) + '\n')
+
+
+def prepare_artifacts():
+    """Load, and if needed train or rebuild, the models and precomputed tables in this process.
+
+    Runs before the pool starts, so workers find every file under models/
+    up to date and only ever read them.
+    """
+    from gym_chatbot_new import GymChatbot
+
+    GymChatbot.shared()
+
+
+def _init_worker(score):
+    """Set up a worker process once: the report fonts and, for rosters, the models."""
+    pdf_report.new_document()  # Loads the font metrics
+    if score:
+        import planning_pipeline
+        from gym_chatbot_new import GymChatbot
+        # The parent prepared the artifacts; never retrain or rewrite them from several processes
+        GymChatbot.shared(read_only=True)
+        _worker['pipeline'] = planning_pipeline.shared_pipeline()
+
+
+def _score(user_info):
+    """Build the workout and meal plan of one member, like the planner page does."""
+    results = _worker['pipeline'].run(user_info)
+    return results['plan'], results['meal_plan']
+
+
+def _render_chunk(chunk, out_dir, booklet):
+    """Render a chunk of members.
+
+    Returns (pages, page streams for the booklet or None, scored plans).
+    Individual PDFs are written to out_dir as soon as they are rendered.
+    """
+    pages = 0
+    document = pdf_report.new_document() if booklet else None
+    scored = []
+    for member_id, record in chunk:
+        plan, meal_plan = record if isinstance(record, tuple) else _score(record)
+        scored.append((member_id, plan, meal_plan))
+        title = f"Workout & Nutrition Plan - {member_id}"
+        if booklet:
+            pages += pdf_report.add_plan_pages(document, plan, meal_plan, title)
+        else:
+            pdf = pdf_report.new_document()
+            pages += pdf_report.add_plan_pages(pdf, plan, meal_plan, title)
+            with open(os.path.join(out_dir, report_filename(member_id)), 'wb') as f:
+                f.write(pdf.output(dest='S').encode('latin-1'))
+    return pages, pdf_report.page_streams(document) if booklet else None, scored
+
+
+def render_reports(members, out_dir=REPORTS_DIR, booklet=None, workers=None, chunk_size=CHUNK_SIZE):
+    """Render PDF reports for (member id, record) pairs on a process pool.
+
+    Records are (WorkoutPlan, MealPlan) tuples or user_info dicts to score
+    first. Writes one PDF per member into out_dir, named by report_filename(),
+    or a single booklet file if `booklet` is a path. Returns (members, pages,
+    scored plans).
+    """
+    members = list(members)
+    chunks = [members[i:i + chunk_size] for i in range(0, len(members), chunk_size)]
+    score = any(not isinstance(record, tuple) for _, record in members)
+    if not booklet:
+        os.makedirs(out_dir, exist_ok=True)
+        names = collections.Counter(report_filename(member_id) for member_id, _ in members)
+        clashes = [name for name, count in names.items() if count > 1]
+        if clashes:
+            raise ValueError(f"Member IDs map to the same report file: {', '.join(sorted(clashes)[:5])}")
+    if score:
+        prepare_artifacts()
+
+    total_pages = 0
+    streams = []
+    scored = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(score,)) as executor:
+        for pages, chunk_streams, chunk_scored in executor.map(_render_chunk, chunks, [out_dir] * len(chunks),
+                                                               [bool(booklet)] * len(chunks)):
+            total_pages += pages
+            scored.extend(chunk_scored)
+            if chunk_streams:
+                streams.extend(chunk_streams)
+
+    if booklet:
+        os.makedirs(os.path.dirname(os.path.abspath(booklet)), exist_ok=True)
+        with open(booklet, 'wb') as f:
+            f.write(pdf_report.assemble(streams).output(dest='S').encode('latin-1'))
+    return len(members), total_pages, scored
+
+
+def main():
+    """Render printable plans for every member of a roster."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('roster', help="scored plans (.jsonl) or a members CSV to score first")
+    parser.add_argument('--out-dir', default=REPORTS_DIR, help="directory for one PDF per member")
+    parser.add_argument('--booklet', help="write a single merged PDF to this path instead")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--save-plans', help="also write the scored plans to this .jsonl file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    members, pages, scored = render_reports(read_roster(args.roster), args.out_dir, args.booklet, args.workers,
+                                            args.chunk_size)
+    elapsed = time.perf_counter() - start
+    if args.save_plans:
+        write_plans(args.save_plans, scored)
+
+    print(f"Rendered {members} members, {pages} pages in {elapsed:.2f}s "
+          f"({pages / elapsed:.0f} pages/s, {members / elapsed:.0f} members/s)")
+    print(f"Output: {args.booklet or args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Hit rate, agreement and latency of the classifier cascades against the full forests.
+
+Calibrates cascades of the workout type and experience level classifiers for
+several target agreements, then predicts sampled member profiles one at a
+time, like the planner does, with the forest pipeline and with each cascade.
+Reports per model: the threshold, the share of rows the first trees
+answered, how often the answer matched the forest pipeline and the mean
+milliseconds per prediction. The 'all trees' row runs every tree through the
+cascade's NumPy encoder, separating its savings from the early exits.
+
+Usage: python benchmarks/cascade_inference.py [--profiles 300] [--trees 10] [--targets 0.99 0.995 0.999]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+import cascade
+from chatbot_concurrency import sample_profiles
+from gym_chatbot_new import GymChatbot
+
+
+def timed_predictions(predict, frames):
+    """Predict every single-row frame. Returns (mean seconds, predictions)."""
+    predict(frames[0])  # Warm up
+    start = time.perf_counter()
+    predictions = [predict(frame)[0] for frame in frames]
+    return (time.perf_counter() - start) / len(frames), np.array(predictions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', type=int, default=300)
+    parser.add_argument('--trees', type=int, default=cascade.CASCADE_TREES)
+    parser.add_argument('--targets', type=float, nargs='+', default=[0.99, 0.995, 0.999])
+    args = parser.parse_args()
+
+    chatbot = GymChatbot.shared()
+    snapshot = chatbot.snapshot
+    calibration = cascade.calibration_profiles(snapshot.dataset)
+    rows = [chatbot.prepare_prediction_data(user_info) for user_info in sample_profiles(args.profiles, seed=13)]
+
+    print(f"{'model':>11} {'mode':>13} {'threshold':>10} {'hit rate':>9} {'agreement':>10} {'ms/row':>7}")
+    for name, model, column in [('workout', snapshot.workout_model, 1), ('experience', snapshot.experience_model, 2)]:
+        frames = [row[column] for row in rows]
+        seconds, expected = timed_predictions(model.predict, frames)
+        print(f"{name:>11} {'forest':>13} {'':>10} {'':>9} {'':>10} {seconds * 1000:>7.2f}")
+
+        cascades = [('all trees', cascade.CascadeForest(model, args.trees))]
+        cascades += [(f"target {target:g}", cascade.build_cascade(model, calibration, args.trees, target))
+                     for target in args.targets]
+        for mode, forest in cascades:
+            seconds, predicted = timed_predictions(forest.predict, frames)
+            threshold = '-' if forest.threshold is None else f"{forest.threshold:.2f}"
+            print(f"{name:>11} {mode:>13} {threshold:>10} {forest.hit_rate():>9.1%} "
+                  f"{np.mean(predicted == expected):>10.1%} {seconds * 1000:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Check that a GymChatbot is safe to share between threads.
+
+Runs the full recommendation path (predictions, exercise recommendations and
+workout plan) for sampled member profiles on 1..N worker threads while another
+thread keeps publishing new snapshots, and checks that every result matches
+the single-threaded run.
+
+Throughput is printed per worker count for reference only. It does not grow
+with threads: requests are dominated by sklearn's Python-level predict
+overhead, which holds the GIL.
+
+Usage: python benchmarks/chatbot_concurrency.py [--profiles 200] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import pandas as pd
+from gym_chatbot_new import GymChatbot
+
+GOALS = ["Weight Loss", "Muscle Building", "Cardiovascular Health", "Flexibility", "General Fitness"]
+
+
+def sample_profiles(n, seed=42):
+    """Turn sampled member rows into user_info dicts like the planner page builds."""
+    members = pd.read_csv('members_with_exercise_recommendations.csv').sample(n, replace=True, random_state=seed)
+    profiles = []
+    for i, (_, member) in enumerate(members.iterrows()):
+        profiles.append({
+            'Age': int(member['Age']),
+            'Gender': member['Gender'],
+            'Weight (kg)': float(member['Weight (kg)']),
+            'Height (m)': float(member['Height (m)']),
+            'Max_BPM': int(member['Max_BPM']),
+            'Avg_BPM': int(member['Avg_BPM']),
+            'Resting_BPM': int(member['Resting_BPM']),
+            'Session_Duration (hours)': float(member['Session_Duration (hours)']),
+            'Fat_Percentage': float(member['Fat_Percentage']),
+            'Water_Intake (liters)': float(member['Water_Intake (liters)']),
+            'Workout_Frequency (days/week)': int(member['Workout_Frequency (days/week)']),
+            'BMI': float(member['BMI']),
+            'Goal': GOALS[i % len(GOALS)],
+        })
+    return profiles
+
+
+def recommend(chatbot, user_info):
+    """Run one request end to end against a single snapshot."""
+    snapshot = chatbot.snapshot
+    calories_table, workout, experience = chatbot.predict_profile(user_info, snapshot)
+    calories = calories_table.loc[workout, user_info['Session_Duration (hours)']]
+    recommendations = chatbot.get_exercise_recommendations(user_info, workout, experience, snapshot)
+    return chatbot.get_workout_plan(user_info, workout, calories, experience, recommendations, calories_table, snapshot)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    chatbot = GymChatbot.shared()
+    profiles = sample_profiles(args.profiles)
+    expected = [recommend(chatbot, user_info) for user_info in profiles]
+
+    # Keep swapping in equivalent snapshots to exercise the publish path during reads
+    stop = threading.Event()
+    swaps = [0]
+
+    def publisher():
+        while not stop.is_set():
+            chatbot.publish_snapshot()
+            swaps[0] += 1
+            time.sleep(0.001)
+
+    swapper = threading.Thread(target=publisher, daemon=True)
+    swapper.start()
+
+    print(f"{'workers':>8} {'requests/s':>12} {'mismatches':>11}")
+    total_mismatches = 0
+    try:
+        for workers in args.workers:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                start = time.perf_counter()
+                results = list(pool.map(lambda user_info: recommend(chatbot, user_info), profiles))
+                elapsed = time.perf_counter() - start
+            throughput = len(profiles) / elapsed
+            mismatches = sum(result != plan for result, plan in zip(results, expected))
+            total_mismatches += mismatches
+            print(f"{workers:>8} {throughput:>12.1f} {mismatches:>11}")
+    finally:
+        stop.set()
+        swapper.join()
+    print(f"{swaps[0]} snapshots published during the run")
+    if total_mismatches:
+        print(f"NOT SAFE: {total_mismatches} results differed from the single-threaded run")
+    else:
+        print("Safe under concurrency: every result matched the single-threaded run")
+
+
+if __name__ == "__main__":
+    main()
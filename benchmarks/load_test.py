@@ -0,0 +1,195 @@
+"""Headless load test of the planner and results pages.
+
+Runs simulated sessions on concurrent workers with Streamlit's AppTest, fully
+offline. Each session fills in pages/AI_Workout_Planner.py with a sampled
+member profile, submits it and renders pages/AI_Workout_Planner_Results.py
+from the stored results. Reports p50/p95/p99 latency per step, errors, the
+messages and bytes of a results view, and the CPU and RSS of this process
+sampled over time.
+
+Every worker keeps one AppTest per page and reuses it across its sessions,
+like a browser tab; a fresh AppTest rescans installed packages for components
+on its first run, which would swamp the page timings.
+
+Usage: python benchmarks/load_test.py [--sessions 40] [--concurrency 4] [--interval 1.0]
+"""
+import argparse
+import os
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+from chatbot_concurrency import sample_profiles
+from results_render import payload
+from gym_chatbot_new import GymChatbot
+
+PLANNER_PAGE = os.path.join(ROOT, 'pages', 'AI_Workout_Planner.py')
+RESULTS_PAGE = os.path.join(ROOT, 'pages', 'AI_Workout_Planner_Results.py')
+STEPS = ['load', 'submit', 'results', 'session']
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def form_inputs(user_info):
+    """Turn a user_info profile back into the (widget kind, label, value) inputs of the planner form."""
+    inches = round(user_info['Height (m)'] / 0.0254)
+    feet = min(max(inches // 12, 4), 7)
+    return [
+        ('number_input', "What is your age?", min(max(user_info['Age'], 18), 100)),
+        ('selectbox', "What is your gender?", user_info['Gender']),
+        ('number_input', "What is your weight (in lbs)?", min(max(round(user_info['Weight (kg)'] * 2.20462), 75), 330)),
+        ('number_input', "What is your height (feet)?", feet),
+        ('number_input', "Inches:", min(max(inches - feet * 12, 0), 11)),
+        ('number_input', "Typical workout session duration (hours):",
+         min(max(user_info['Session_Duration (hours)'], 0.25), 3.0)),
+        ('slider', "How many days per week do you work out?", user_info['Workout_Frequency (days/week)']),
+        ('number_input', "What is your body fat percentage?", min(max(round(user_info['Fat_Percentage']), 5), 50)),
+        ('number_input', "How many cups of water do you drink per day? (1 cup = 8 oz)",
+         min(max(round(user_info['Water_Intake (liters)'] / 0.236588), 2), 20)),
+        ('selectbox', "What is your fitness goal?", user_info['Goal']),
+    ]
+
+
+def widget(app, kind, label):
+    return next(element for element in getattr(app, kind) if element.label == label)
+
+
+def page_errors(app):
+    # The planner ends with st.switch_page, which AppTest can't follow since it runs a single page
+    return [error.message for error in app.exception if 'Could not find page' not in error.message]
+
+
+class Worker(threading.local):
+    """The planner and results apps of one simulated browser tab."""
+
+    def __init__(self):
+        self.planner = AppTest.from_file(PLANNER_PAGE, default_timeout=120)
+        self.results = AppTest.from_file(RESULTS_PAGE, default_timeout=120)
+
+
+def run_session(worker, user_info):
+    """Run one session. Returns ({step: seconds}, error message or None).
+
+    The timings also hold the delta messages and bytes sent for the results view.
+    """
+    timings = {}
+    start = time.perf_counter()
+    try:
+        planner = worker.planner
+        planner.session_state['results_key'] = None
+        planner.run()
+        timings['load'] = time.perf_counter() - start
+        for kind, label, value in form_inputs(user_info):
+            widget(planner, kind, label).set_value(value)
+        planner.button[0].click()
+
+        step = time.perf_counter()
+        planner.run()
+        timings['submit'] = time.perf_counter() - step
+        errors = page_errors(planner)
+        if errors or not planner.session_state['results_key']:
+            return timings, errors[0] if errors else "no results stored"
+
+        step = time.perf_counter()
+        worker.results.session_state['results_key'] = planner.session_state['results_key']
+        worker.results.run()
+        timings['results'] = time.perf_counter() - step
+        errors = page_errors(worker.results)
+        if errors:
+            return timings, errors[0]
+        timings['messages'], timings['payload'] = payload(worker.results._tree)
+    except Exception as e:
+        return timings, f"{type(e).__name__}: {e}"
+    timings['session'] = time.perf_counter() - start
+    return timings, None
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * PAGE_SIZE / 2 ** 20
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def sample_usage(stop, interval, samples, finished):
+    """Append (elapsed, CPU %, RSS MB, sessions done) every interval until stop is set."""
+    start = last_time = time.perf_counter()
+    last_cpu = cpu_seconds()
+    while not stop.wait(interval):
+        now, cpu = time.perf_counter(), cpu_seconds()
+        samples.append((now - start, 100 * (cpu - last_cpu) / (now - last_time), rss_mb(), len(finished)))
+        last_time, last_cpu = now, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between CPU/RSS samples")
+    args = parser.parse_args()
+
+    GymChatbot.shared()
+    profiles = sample_profiles(args.sessions, seed=7)
+    worker = Worker()
+    pool = ThreadPoolExecutor(max_workers=args.concurrency)
+    # Warm up the models, caches and the apps of every worker thread outside the measurement
+    barrier = threading.Barrier(args.concurrency)
+
+    def warm_up(user_info):
+        run_session(worker, user_info)
+        barrier.wait()  # Keeps each thread busy so every worker gets one warm-up session
+    list(pool.map(warm_up, profiles[:args.concurrency]))
+
+    samples, finished = [], []
+    stop = threading.Event()
+    sampler = threading.Thread(target=sample_usage, args=(stop, args.interval, samples, finished), daemon=True)
+    results = []
+
+    def session(user_info):
+        result = run_session(worker, user_info)
+        finished.append(result)
+        return result
+
+    start = time.perf_counter()
+    sampler.start()
+    try:
+        results = list(pool.map(session, profiles))
+    finally:
+        pool.shutdown()
+        stop.set()
+        sampler.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"{'time s':>7} {'cpu %':>6} {'rss MB':>7} {'sessions':>9}")
+    for at, cpu, rss, done in samples:
+        print(f"{at:>7.1f} {cpu:>6.0f} {rss:>7.0f} {done:>9}")
+
+    errors = [error for _, error in results if error]
+    print(f"\n{len(results)} sessions on {args.concurrency} workers in {elapsed:.1f}s "
+          f"({len(results) / elapsed:.2f} sessions/s), {len(errors)} errors")
+    for error in sorted(set(errors)):
+        print(f"  {errors.count(error)} x {error}")
+    print(f"{'step':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for step in STEPS:
+        times = [timings[step] for timings, _ in results if step in timings]
+        if times:
+            p50, p95, p99 = np.percentile(times, [50, 95, 99]) * 1000
+            print(f"{step:>8} {p50:>8.0f} {p95:>8.0f} {p99:>8.0f}")
+    views = [timings for timings, error in results if not error]
+    if views:
+        print(f"results view: {np.mean([view['messages'] for view in views]):.0f} messages, "
+              f"{np.mean([view['payload'] for view in views]) / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
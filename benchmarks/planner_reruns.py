@@ -0,0 +1,83 @@
+"""Script executions and server CPU per planner session, with and without the input form.
+
+Replays a user filling in pages/AI_Workout_Planner.py with Streamlit's headless
+AppTest. Without a form the browser reruns the script after every widget edit;
+inside the form it only reruns on submit. AppTest itself reruns on every
+run() call, so both modes are replayed here by choosing when to call it.
+
+Usage: python benchmarks/planner_reruns.py [--sessions 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+PAGE = os.path.join(ROOT, 'pages', 'AI_Workout_Planner.py')
+
+# (widget kind, label, value) edits of one session, in order
+EDITS = [
+    ('number_input', "What is your age?", 34),
+    ('selectbox', "What is your gender?", "Female"),
+    ('number_input', "What is your weight (in lbs)?", 150),
+    ('number_input', "What is your height (feet)?", 5),
+    ('number_input', "Inches:", 6),
+    ('number_input', "Typical workout session duration (hours):", 1.5),
+    ('slider', "How many days per week do you work out?", 4),
+    ('number_input', "What is your body fat percentage?", 22),
+    ('number_input', "How many cups of water do you drink per day? (1 cup = 8 oz)", 8),
+    ('selectbox', "What is your fitness goal?", "Muscle Building"),
+]
+
+
+def widget(app, kind, label):
+    return next(element for element in getattr(app, kind) if element.label == label)
+
+
+def run_session(rerun_on_edit):
+    """Fill in and submit the planner once. Returns (script runs, wall seconds, CPU seconds)."""
+    app = AppTest.from_file(PAGE, default_timeout=120)
+    runs = 0
+    wall = cpu = 0.0
+
+    def run():
+        nonlocal runs, wall, cpu
+        start, start_cpu = time.perf_counter(), time.process_time()
+        app.run()
+        wall += time.perf_counter() - start
+        cpu += time.process_time() - start_cpu
+        runs += 1
+
+    run()
+    for kind, label, value in EDITS:
+        widget(app, kind, label).set_value(value)
+        if rerun_on_edit:
+            run()
+    app.button[0].click()
+    run()
+    # The planner ends by switching to the results page, which AppTest can't follow
+    assert 'results_key' in app.session_state, app.exception
+    return runs, wall, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=5)
+    args = parser.parse_args()
+
+    run_session(False)  # Warm up models and caches
+
+    print(f"{'mode':>16} {'runs/session':>13} {'wall ms':>9} {'cpu ms':>8}")
+    for mode, rerun_on_edit in [('rerun per edit', True), ('form submit', False)]:
+        results = [run_session(rerun_on_edit) for _ in range(args.sessions)]
+        runs, wall, cpu = (sum(values) / args.sessions for values in zip(*results))
+        print(f"{mode:>16} {runs:>13.0f} {wall * 1000:>9.1f} {cpu * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
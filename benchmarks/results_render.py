@@ -0,0 +1,109 @@
+"""Render time and browser payload of one results page view.
+
+Runs pages/AI_Workout_Planner_Results.py headless with Streamlit's AppTest on
+scored plans and reports the script time per view, the number of delta
+messages sent over the websocket and their serialized size.
+Pass --page to measure another version of the page.
+
+Usage: python benchmarks/results_render.py [--views 20] [--page PATH]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from streamlit.proto.Block_pb2 import Block as BlockProto
+from streamlit.proto.Element_pb2 import Element
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.runtime.forward_msg_cache import populate_hash_if_needed
+from streamlit.runtime.runtime_util import serialize_forward_msg
+from streamlit.testing.v1 import AppTest
+from chatbot_concurrency import recommend, sample_profiles
+from gym_chatbot_new import GymChatbot
+import gym_ml_model_new
+import session_store
+
+PAGE = os.path.join(ROOT, 'pages', 'AI_Workout_Planner_Results.py')
+
+
+# Element and Block field of every proto type, to wrap protos back into the messages the server sends
+ELEMENT_FIELDS = {field.message_type.full_name: field.name for field in Element.DESCRIPTOR.fields
+                  if field.message_type is not None}
+BLOCK_FIELDS = {field.message_type.full_name: field.name for field in BlockProto.DESCRIPTOR.fields
+                if field.message_type is not None}
+
+
+def message_size(proto, path):
+    """Serialized size of the ForwardMsg that sends one element or block to the browser."""
+    msg = ForwardMsg()
+    name = proto.DESCRIPTOR.full_name
+    if isinstance(proto, BlockProto):
+        msg.delta.add_block.CopyFrom(proto)
+    elif name in BLOCK_FIELDS:
+        getattr(msg.delta.add_block, BLOCK_FIELDS[name]).CopyFrom(proto)
+    else:
+        getattr(msg.delta.new_element, ELEMENT_FIELDS[name]).CopyFrom(proto)
+    msg.metadata.delta_path.extend(path)
+    populate_hash_if_needed(msg)
+    return len(serialize_forward_msg(msg))
+
+
+def payload(node, path=()):
+    """Return (messages, bytes) sent for a rendered element tree."""
+    messages, size = 0, 0
+    proto = getattr(node, 'proto', None)
+    if proto is not None:
+        messages, size = 1, message_size(proto, path)
+    for index, child in getattr(node, 'children', {}).items():
+        child_messages, child_size = payload(child, path + (index,))
+        messages += child_messages
+        size += child_size
+    return messages, size
+
+
+def results_for(chatbot, user_info):
+    plan = recommend(chatbot, user_info)
+    meal_plan = gym_ml_model_new.generate_meal_recommendations(plan.calories_per_session, "nutrients_csvfile.csv",
+                                                               user_info['Goal'])
+    return {'plan': plan, 'meal_plan': meal_plan, 'predicted_calories': plan.calories_per_session,
+            'predicted_workout': plan.workout_type, 'predicted_experience': 1}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--views', type=int, default=20)
+    parser.add_argument('--page', default=PAGE)
+    args = parser.parse_args()
+
+    chatbot = GymChatbot.shared()
+    views = [results_for(chatbot, user_info) for user_info in sample_profiles(args.views)]
+
+    store = session_store.get_store()
+    # One app for all views: a new AppTest rescans installed packages for components on its first run
+    app = AppTest.from_file(os.path.abspath(args.page), default_timeout=60)
+    times, messages, sizes = [], [], []
+    for i, results in enumerate([views[0]] + views):
+        app.session_state['results_key'] = store.put(results)
+        start = time.perf_counter()
+        app.run()
+        elapsed = time.perf_counter() - start
+        if i == 0:
+            continue  # Warm-up view
+        count, size = payload(app._tree)
+        times.append(elapsed)
+        messages.append(count)
+        sizes.append(size)
+
+    times.sort()
+    print(f"{len(times)} views of {os.path.relpath(args.page, ROOT)}")
+    print(f"render ms: median {times[len(times) // 2] * 1000:.1f}, max {times[-1] * 1000:.1f}")
+    print(f"messages per view: {sum(messages) / len(messages):.0f}")
+    print(f"payload per view: {sum(sizes) / len(sizes) / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Cost of a what-if calories sweep against a single calories prediction.
+
+Times, per member profile, one calories prediction for the user's own row,
+the workout type by duration table of the results page, the default what-if
+grid (20 session durations by 1-7 days a week) as one batched prediction and
+the same grid predicted one point at a time by the forest. Also reports the
+largest difference between the two, which should be zero: a grid over
+several frequencies is predicted by the forest, since the calorie surface
+holds the frequency at its median.
+
+Usage: python benchmarks/what_if_sweep.py [--profiles 10] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+from chatbot_concurrency import sample_profiles
+from gym_chatbot_new import GymChatbot, WHAT_IF_DURATIONS, WHAT_IF_FREQUENCIES
+
+
+def point_by_point(chatbot, user_info, workout_type):
+    """The sweep grid predicted one row at a time, in the sweep's order."""
+    predictions = []
+    for duration in WHAT_IF_DURATIONS:
+        for frequency in WHAT_IF_FREQUENCIES:
+            point = dict(user_info, **{'Session_Duration (hours)': duration, 'Workout_Frequency (days/week)': frequency})
+            user_calories, _, _ = chatbot.prepare_prediction_data(point)
+            user_calories['Workout_Type'] = workout_type
+            predictions.append(chatbot.snapshot.calories_model.predict(user_calories)[0])
+    return np.array(predictions)
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    chatbot = GymChatbot.shared()
+    profiles = sample_profiles(args.profiles, seed=3)
+    chatbot.predict_calories_sweep(profiles[0], 'Cardio')  # Warm up
+
+    times = {'single prediction': [], 'calories table': [], 'sweep (batched)': [], 'sweep (per point)': []}
+    mismatch = 0.0
+    for user_info in profiles:
+        user_calories, _, _ = chatbot.prepare_prediction_data(user_info)
+        user_calories['Workout_Type'] = 'Cardio'
+        times['single prediction'].append(timed(lambda: chatbot.snapshot.calories_model.predict(user_calories),
+                                                args.repeat)[0])
+        times['calories table'].append(timed(lambda: chatbot.predict_calories_by_workout_type(user_info),
+                                             args.repeat)[0])
+        seconds, sweep = timed(lambda: chatbot.predict_calories_sweep(user_info, 'Cardio'), args.repeat)
+        times['sweep (batched)'].append(seconds)
+        seconds, points = timed(lambda: point_by_point(chatbot, user_info, 'Cardio'), 1)
+        times['sweep (per point)'].append(seconds)
+        mismatch = max(mismatch, np.abs(sweep['Calories'].to_numpy() - points).max())
+
+    grid = len(WHAT_IF_DURATIONS) * len(WHAT_IF_FREQUENCIES)
+    print(f"{args.profiles} profiles, {grid}-point grid, max batched vs per-point difference {mismatch:.3g} calories")
+    print(f"{'prediction':>18} {'mean ms':>8}")
+    for name, seconds in times.items():
+        print(f"{name:>18} {np.mean(seconds) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import itertools
+import os
+import time
+import numpy as np
+import pandas as pd
+from fingerprints import file_fingerprint
+
+CALORIE_SURFACE_FILE = 'models/calorie_surface.npz'
+CALORIES_MODEL_FILE = 'models/calories_model.pkl'
+
+# Features the surface interpolates over and the knots per axis. Each axis spans the forest's split
+# thresholds for the feature: past them every tree takes the same branch, so queries are clamped exactly.
+SURFACE_AXES = [
+    ('Session_Duration (hours)', 11),
+    ('Avg_BPM', 11),
+    ('Age', 8),
+    ('Fat_Percentage', 6),
+    ('Weight (kg)', 6),
+    ('Height (m)', 6),
+]
+
+# Ranges of the profiles the planner and the what-if section can send, sampled to measure the error
+PROFILE_RANGES = {
+    'Age': (18, 100),
+    'Weight (kg)': (75 / 2.20462, 330 / 2.20462),
+    'Height (m)': (48 * 0.0254, 95 * 0.0254),
+    'Max_BPM': (130, 210),
+    'Avg_BPM': (90, 190),
+    'Resting_BPM': (40, 90),
+    'Session_Duration (hours)': (0.25, 3.0),
+    'Fat_Percentage': (5, 50),
+    'Water_Intake (liters)': (0.45, 4.75),
+    'Workout_Frequency (days/week)': (1, 7),
+}
+
+ERROR_CELLS = 5               # Error bounds are measured per cell of a 5x5 split of the duration and BPM axes
+CALIBRATION_PROFILES = 40000  # Sampled profiles the error bounds are measured on
+MIN_CALIBRATION = 20          # Cells with fewer sampled profiles are always answered by the forest
+ERROR_BUDGET = 0.10           # Largest relative error a cell may have to be served from the surface, about the
+                              # forest's own p90 error on held-out members
+EXPERIENCE_LEVEL = 2          # The planner always predicts calories at this experience level
+
+
+class CalorieSurface:
+    """The calories forest sampled on a grid, answered by multilinear interpolation.
+
+    The table holds the forest's prediction at every knot of SURFACE_AXES for
+    each gender and workout type, with the model's other features at their
+    training medians (BMI follows weight and height). Those features barely
+    move the forest, but they are why the surface is not exact: the largest
+    relative error seen on sampled profiles is kept per gender, workout type
+    and duration/BPM cell, and predict() only serves rows whose cell is
+    within the error budget.
+    """
+
+    def __init__(self, fingerprint, genders, workout_types, lower, upper, table, error_bound):
+        self.fingerprint = fingerprint
+        self.genders = genders              # (genders,)
+        self.workout_types = workout_types  # (workout types,)
+        self.lower = lower                  # (axes,) first knot of each axis
+        self.upper = upper                  # (axes,) last knot of each axis
+        self.table = table                  # (genders, workout types, *knots), float32
+        self.error_bound = error_bound      # (genders, workout types, ERROR_CELLS, ERROR_CELLS), inf if unmeasured
+        self.model = None                   # The forest the surface was checked against, set when loaded
+
+        knots = np.array(table.shape[2:])
+        self._step = (upper - lower) / (knots - 1)
+        self._last_cell = knots - 2
+        # Offsets of the 2^axes corners of a grid cell in the flattened table, and which end of each axis they take
+        strides = np.array(table.strides[2:]) // table.itemsize
+        self._corners = np.array(list(itertools.product((0, 1), repeat=len(knots))), dtype=bool)
+        self._corner_offsets = self._corners @ strides
+
+    @classmethod
+    def build(cls, model, fingerprint, axes=SURFACE_AXES, profiles=CALIBRATION_PROFILES, seed=0):
+        """Sample the forest on the grid and measure the error bounds."""
+        preprocessor = model.named_steps['preprocessor']
+        numeric = list(preprocessor.transformers_[0][2])
+        genders, workout_types = preprocessor.named_transformers_['cat'].named_steps['onehot'].categories_
+        medians = preprocessor.named_transformers_['num'].named_steps['imputer'].statistics_
+        defaults = dict(zip(numeric, medians))
+        lower, upper = split_ranges(model, [name for name, _ in axes])
+
+        knots = [np.linspace(lo, hi, n) for (_, n), lo, hi in zip(axes, lower, upper)]
+        grid = np.meshgrid(*knots, indexing='ij')
+        frame = pd.DataFrame({name: np.repeat(value, grid[0].size) for name, value in defaults.items()})
+        for (name, _), values in zip(axes, grid):
+            frame[name] = values.ravel()
+        frame['BMI'] = frame['Weight (kg)'] / frame['Height (m)'] ** 2
+        frame['Experience_Level'] = EXPERIENCE_LEVEL
+        frame['Gender'], frame['Workout_Type'] = genders[0], workout_types[0]
+        frame = frame[model.feature_names_in_]
+
+        table = np.empty((len(genders), len(workout_types)) + grid[0].shape, dtype=np.float32)
+        for (i, gender), (j, workout_type) in itertools.product(enumerate(genders), enumerate(workout_types)):
+            frame['Gender'] = gender
+            frame['Workout_Type'] = workout_type
+            table[i, j] = model.predict(frame).reshape(grid[0].shape)
+
+        surface = cls(fingerprint, np.array(genders, dtype=str), np.array(workout_types, dtype=str), lower, upper, table,
+                      np.full((len(genders), len(workout_types), ERROR_CELLS, ERROR_CELLS), np.inf))
+        surface.calibrate(model, sample_profiles(profiles, genders, workout_types, seed))
+        return surface
+
+    def calibrate(self, model, frame):
+        """Set the error bounds to the largest relative error of the surface on sampled profiles."""
+        frame = frame[model.feature_names_in_]
+        truth = model.predict(frame)
+        estimate, cell = self._interpolate(frame)
+        error = np.abs(estimate - truth) / np.maximum(truth, 1)
+        known = cell >= 0
+        cells = np.prod(self.error_bound.shape)
+        worst = np.zeros(cells)
+        np.maximum.at(worst, cell[known], error[known])
+        counts = np.bincount(cell[known], minlength=cells)
+        self.error_bound = np.where(counts >= MIN_CALIBRATION, worst, np.inf).reshape(self.error_bound.shape)
+
+    def _interpolate(self, frame):
+        """Interpolate every row. Returns (calories, flat error cell), the cell being -1 for unknown categories."""
+        gender = _category_index(self.genders, frame['Gender'])
+        workout_type = _category_index(self.workout_types, frame['Workout_Type'])
+        known = (gender >= 0) & (workout_type >= 0)
+
+        points = np.column_stack([frame[name].to_numpy(dtype=np.float64) for name, _ in SURFACE_AXES])
+        position = (np.clip(points, self.lower, self.upper) - self.lower) / self._step
+        index = np.minimum(position.astype(np.int64), self._last_cell)
+        weight = position - index
+
+        base = np.ravel_multi_index((np.where(known, gender, 0), np.where(known, workout_type, 0)) + tuple(index.T),
+                                    self.table.shape)
+        values = self.table.ravel()[base[:, None] + self._corner_offsets]
+        weights = np.where(self._corners, weight[:, None, :], 1 - weight[:, None, :]).prod(axis=2)
+        calories = (values * weights).sum(axis=1)
+
+        # Error cells split the duration and BPM axes (the first two) evenly
+        cell = np.minimum((position[:, :2] / (self._last_cell[:2] + 1) * ERROR_CELLS).astype(np.int64), ERROR_CELLS - 1)
+        flat = np.ravel_multi_index((np.where(known, gender, 0), np.where(known, workout_type, 0),
+                                     cell[:, 0], cell[:, 1]), self.error_bound.shape)
+        return calories, np.where(known, flat, -1)
+
+    def predict(self, frame, budget=ERROR_BUDGET):
+        """Interpolate calories for the rows of a model feature frame.
+
+        Returns (calories, served): rows that are not served fall in a cell
+        whose error bound exceeds the budget, or have an unknown gender or
+        workout type, and must be predicted with the forest.
+        """
+        calories, cell = self._interpolate(frame)
+        served = cell >= 0
+        served[served] = self.error_bound.ravel()[cell[served]] <= budget
+        return calories, served
+
+    def save(self, path=CALORIE_SURFACE_FILE):
+        """Save the surface to a compressed .npz file."""
+        np.savez_compressed(path, fingerprint=np.array(self.fingerprint), genders=self.genders,
+                            workout_types=self.workout_types, lower=self.lower, upper=self.upper, table=self.table,
+                            error_bound=self.error_bound)
+
+    @classmethod
+    def load(cls, path=CALORIE_SURFACE_FILE):
+        """Load a surface previously written with save()."""
+        with np.load(path, allow_pickle=False) as archive:
+            return cls(str(archive['fingerprint']), archive['genders'], archive['workout_types'], archive['lower'],
+                       archive['upper'], archive['table'], archive['error_bound'])
+
+
+def _category_index(categories, values):
+    """Index of each value in a sorted category array, -1 where it is not one of them."""
+    values = np.asarray(values, dtype=str)
+    index = np.minimum(np.searchsorted(categories, values), len(categories) - 1)
+    return np.where(categories[index] == values, index, -1)
+
+
+def split_ranges(model, features):
+    """Return the (lower, upper) split thresholds of the forest for each numeric feature, in raw units."""
+    preprocessor = model.named_steps['preprocessor']
+    numeric = list(preprocessor.transformers_[0][2])
+    scaler = preprocessor.named_transformers_['num'].named_steps['scaler']
+    columns = [numeric.index(name) for name in features]
+    lower = np.full(len(columns), np.inf)
+    upper = np.full(len(columns), -np.inf)
+    for tree in model.named_steps['model'].estimators_:
+        feature, threshold = tree.tree_.feature, tree.tree_.threshold
+        for k, column in enumerate(columns):
+            used = threshold[feature == column]
+            if len(used):
+                lower[k] = min(lower[k], used.min())
+                upper[k] = max(upper[k], used.max())
+    return lower * scaler.scale_[columns] + scaler.mean_[columns], upper * scaler.scale_[columns] + scaler.mean_[columns]
+
+
+def sample_profiles(n, genders, workout_types, seed=0):
+    """Sample model feature rows uniformly over PROFILE_RANGES."""
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({name: rng.uniform(lo, hi, n) for name, (lo, hi) in PROFILE_RANGES.items()})
+    frame['Gender'] = rng.choice(genders, n)
+    frame['Workout_Type'] = rng.choice(workout_types, n)
+    frame['BMI'] = frame['Weight (kg)'] / frame['Height (m)'] ** 2
+    frame['Experience_Level'] = EXPERIENCE_LEVEL
+    return frame
+
+
+def predict_calories(calories_model, surface, frame, budget=ERROR_BUDGET):
+    """Predict calories for model feature rows from the surface, with the forest answering the rows it can't.
+
+    The forest answers everything when there is no surface or the surface
+    was not checked against this model.
+    """
+    if surface is None or surface.model is not calories_model:
+        return calories_model.predict(frame)
+    calories, served = surface.predict(frame, budget)
+    if not served.all():
+        calories[~served] = calories_model.predict(frame[~served])
+    return calories
+
+
+def load_or_build_surface(calories_model, model_file=CALORIES_MODEL_FILE, path=CALORIE_SURFACE_FILE, save=True):
+    """Load the surface of a calories model, building it if missing or built for another model file.
+
+    Built surfaces are saved unless `save` is False.
+    """
+    fingerprint = file_fingerprint(model_file)
+    surface = None
+    if os.path.exists(path):
+        try:
+            surface = CalorieSurface.load(path)
+        except Exception:
+            print("Could not load calorie surface, rebuilding...")
+    if surface is None or surface.fingerprint != fingerprint:
+        surface = CalorieSurface.build(calories_model, fingerprint)
+        if save:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            surface.save(path)
+    surface.model = calories_model
+    return surface
+
+
+def main():
+    """Build the calorie surface of the saved calories model and report its error and speed."""
+    import pickle
+
+    print("Building calorie surface...")
+    with open(CALORIES_MODEL_FILE, 'rb') as f:
+        model = pickle.load(f)
+    start = time.perf_counter()
+    surface = CalorieSurface.build(model, file_fingerprint(CALORIES_MODEL_FILE))
+    os.makedirs(os.path.dirname(CALORIE_SURFACE_FILE), exist_ok=True)
+    surface.save()
+    surface.model = model
+    print(f"{surface.table.size} grid points built in {time.perf_counter() - start:.1f}s, "
+          f"{os.path.getsize(CALORIE_SURFACE_FILE) / 2 ** 20:.1f} MB in {CALORIE_SURFACE_FILE}")
+
+    # Check the surface on profiles it was not calibrated on
+    frame = sample_profiles(5000, surface.genders, surface.workout_types, seed=1)[model.feature_names_in_]
+    truth = model.predict(frame)
+    calories, served = surface.predict(frame)
+    error = np.abs(calories - truth) / truth
+    print(f"{served.mean():.0%} of sampled profiles served within the {ERROR_BUDGET:.0%} budget, "
+          f"relative error p50 {np.median(error[served]):.2%}, max {error[served].max():.2%}")
+
+    row = frame.iloc[:1]
+    for name, predict in [('forest', model.predict), ('surface', surface.predict)]:
+        start = time.perf_counter()
+        for _ in range(100):
+            predict(row)
+        print(f"{name}: {(time.perf_counter() - start) * 10:.3f} ms per single-row prediction")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+CASCADE_TREES = 10            # Trees asked first; the rest of the forest only runs when they are unsure
+TARGET_AGREEMENT = 0.995      # Share of first-stage answers that must match the full forest on calibration profiles
+CALIBRATION_PROFILES = 20000  # Sampled profiles the threshold is calibrated on
+CALIBRATION_NOISE = 0.05      # Relative noise added to the measurements of the members the profiles are sampled from
+
+# Measurements of the members that are jittered for calibration
+MEASUREMENTS = ['Age', 'Weight (kg)', 'Height (m)', 'Max_BPM', 'Avg_BPM', 'Resting_BPM', 'Session_Duration (hours)',
+                'Fat_Percentage', 'Water_Intake (liters)']
+
+
+class FeatureEncoder:
+    """The fitted ColumnTransformer of a model pipeline, applied with NumPy.
+
+    Mirrors the median imputation and standard scaling of the numeric
+    columns and the most-frequent imputation and one-hot encoding (unknown
+    categories as all zeros) of the categorical ones, without the per-call
+    overhead of the sklearn transformers, which dwarfs a few trees.
+    """
+
+    def __init__(self, preprocessor):
+        transformers = dict((name, (pipeline, list(columns))) for name, pipeline, columns in preprocessor.transformers_)
+        numeric, self.numeric = transformers['num']
+        categorical, self.categorical = transformers['cat']
+        self.medians = numeric.named_steps['imputer'].statistics_
+        self.mean = numeric.named_steps['scaler'].mean_
+        self.scale = numeric.named_steps['scaler'].scale_
+        self.modes = categorical.named_steps['imputer'].statistics_
+        self.categories = [{value: k for k, value in enumerate(values)}
+                           for values in categorical.named_steps['onehot'].categories_]
+        self.width = len(self.numeric) + sum(len(values) for values in self.categories)
+
+    def transform(self, frame):
+        """Encode the rows of a feature frame as the float32 matrix the trees take."""
+        X = np.zeros((len(frame), self.width), dtype=np.float64)
+        numeric = frame[self.numeric].to_numpy(dtype=np.float64)
+        numeric = np.where(np.isnan(numeric), self.medians, numeric)
+        X[:, :len(self.numeric)] = (numeric - self.mean) / self.scale
+
+        offset = len(self.numeric)
+        for column, mode, categories in zip(self.categorical, self.modes, self.categories):
+            values = frame[column].to_numpy(dtype=object)
+            for row, value in enumerate(values):
+                k = categories.get(mode if pd.isna(value) else value)
+                if k is not None:
+                    X[row, offset + k] = 1
+            offset += len(categories)
+        return X.astype(np.float32)
+
+
+class CascadeForest:
+    """A fitted random forest classifier pipeline that asks a few of its trees first.
+
+    The first CASCADE_TREES trees answer when the top class's share of their
+    averaged probabilities reaches the calibrated threshold. Otherwise the
+    rest of the trees run too and the answer is the full forest's, the
+    first trees' votes being reused. Until calibrated every row takes the
+    full forest.
+    """
+
+    def __init__(self, pipeline, first_trees=CASCADE_TREES, threshold=None):
+        self.pipeline = pipeline
+        self.encoder = FeatureEncoder(pipeline.named_steps['preprocessor'])
+        forest = pipeline.named_steps['model']
+        self.classes = forest.classes_
+        self.first = forest.estimators_[:first_trees]
+        self.rest = forest.estimators_[first_trees:]
+        self.threshold = threshold
+        # Rows predicted, rows answered by the first trees, seconds in the first trees and in the rest
+        self.stats = [0, 0, 0.0, 0.0]
+        self._lock = threading.Lock()
+
+    def _votes(self, trees, X):
+        votes = np.zeros((len(X), len(self.classes)))
+        for tree in trees:
+            votes += tree.predict_proba(X, check_input=False)
+        return votes
+
+    def calibrate(self, frame, target_agreement=TARGET_AGREEMENT):
+        """Set the lowest threshold at which first-stage answers still match the full forest often enough.
+
+        Returns the share of the calibration rows the first stage answers.
+        """
+        X = self.encoder.transform(frame[self.pipeline.feature_names_in_])
+        first = self._votes(self.first, X)
+        full = (first + self._votes(self.rest, X)).argmax(axis=1)
+        confidence = first.max(axis=1) / len(self.first)
+
+        # Serve the most confident rows first; only cut between distinct confidences
+        order = np.argsort(-confidence, kind='stable')
+        confidence = confidence[order]
+        agreement = np.cumsum(first.argmax(axis=1)[order] == full[order]) / np.arange(1, len(order) + 1)
+        boundary = np.append(confidence[1:] < confidence[:-1], True)
+        cuts = np.flatnonzero(boundary & (agreement >= target_agreement))
+        self.threshold = confidence[cuts[-1]] if len(cuts) else None
+        return (cuts[-1] + 1) / len(order) if len(cuts) else 0.0
+
+    def predict(self, frame):
+        """Predict the classes of the rows of a feature frame, like the pipeline's predict()."""
+        X = self.encoder.transform(frame[self.pipeline.feature_names_in_])
+        start = time.perf_counter()
+        votes = self._votes(self.first, X)
+        if self.threshold is None:
+            unsure = np.ones(len(X), dtype=bool)
+        else:
+            unsure = votes.max(axis=1) / len(self.first) < self.threshold
+        middle = time.perf_counter()
+        if unsure.any():
+            votes[unsure] += self._votes(self.rest, X[unsure])
+        end = time.perf_counter()
+
+        with self._lock:
+            self.stats[0] += len(X)
+            self.stats[1] += int(len(X) - unsure.sum())
+            self.stats[2] += middle - start
+            self.stats[3] += end - middle
+        return self.classes.take(votes.argmax(axis=1))
+
+    def hit_rate(self):
+        """Share of the rows predicted so far that the first trees answered."""
+        return self.stats[1] / self.stats[0] if self.stats[0] else 0.0
+
+
+def predict(model, cascade, frame):
+    """Predict with the cascade built for a model, or with the model itself if there is none."""
+    if cascade is None or cascade.pipeline is not model:
+        return model.predict(frame)
+    return cascade.predict(frame)
+
+
+def calibration_profiles(dataset, n=CALIBRATION_PROFILES, noise=CALIBRATION_NOISE, seed=0):
+    """Sample members with noise on their measurements, as feature rows like prepare_prediction_data builds."""
+    rng = np.random.default_rng(seed)
+    frame = dataset.sample(n, replace=True, random_state=seed).reset_index(drop=True)
+    for column in MEASUREMENTS:
+        frame[column] = frame[column] * (1 + rng.normal(0, noise, n))
+    frame['BMI'] = frame['Weight (kg)'] / frame['Height (m)'] ** 2
+    # The planner passes these placeholders to the classifiers
+    frame['Experience_Level'] = 2
+    frame['Calories_Burned'] = 0
+    return frame
+
+
+def build_cascade(model, frame, first_trees=CASCADE_TREES, target_agreement=TARGET_AGREEMENT):
+    """Build the cascade of a classifier pipeline and calibrate it on sampled feature rows."""
+    forest = CascadeForest(model, first_trees)
+    forest.calibrate(frame, target_agreement)
+    return forest
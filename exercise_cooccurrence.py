@@ -0,0 +1,170 @@
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+
+COOCCURRENCE_FILE = 'models/exercise_cooccurrence.npz'
+
+
+def split_exercises(value):
+    """Split a Recommended_Exercises cell into a list of exercise names."""
+    if pd.isna(value):
+        return []
+    return [name for name in value.split(', ') if name]
+
+
+def dataset_fingerprint(df):
+    """Hash the Recommended_Exercises column the matrix is built from, so a saved matrix is only served for it."""
+    return hashlib.sha1('\n'.join(df['Recommended_Exercises'].fillna('')).encode('utf-8')).hexdigest()
+
+
+class ExerciseCooccurrence:
+    """Sparse exercise-by-exercise PMI matrix built from Recommended_Exercises rows.
+
+    Rows are stored in CSR form (indptr/indices/data) with every row already
+    sorted by descending PMI, so a top-k neighbor lookup is a single slice.
+    """
+
+    def __init__(self, vocabulary, indptr, indices, data, fingerprint=''):
+        self.fingerprint = fingerprint
+        self.vocabulary = np.asarray(vocabulary)
+        self.indptr = np.asarray(indptr, dtype=np.int32)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.data = np.asarray(data, dtype=np.float32)
+        self.index = {name: i for i, name in enumerate(self.vocabulary.tolist())}
+
+    @classmethod
+    def build(cls, df, top_k=25):
+        """Build the PMI matrix from every Recommended_Exercises row of the dataset."""
+        baskets = [list(dict.fromkeys(split_exercises(value))) for value in df['Recommended_Exercises']]
+        baskets = [basket for basket in baskets if basket]
+        vocabulary = sorted({name for basket in baskets for name in basket})
+        index = {name: i for i, name in enumerate(vocabulary)}
+        n_exercises = len(vocabulary)
+
+        # Exercise frequencies and ordered pair codes (i * n + j) for every basket
+        counts = np.zeros(n_exercises, dtype=np.float64)
+        pair_codes = []
+        for basket in baskets:
+            ids = np.array([index[name] for name in basket], dtype=np.int64)
+            counts[ids] += 1
+            if len(ids) > 1:
+                left, right = np.meshgrid(ids, ids, indexing='ij')
+                mask = left != right
+                pair_codes.append(left[mask] * n_exercises + right[mask])
+
+        if pair_codes:
+            codes, pair_counts = np.unique(np.concatenate(pair_codes), return_counts=True)
+        else:
+            codes = np.zeros(0, dtype=np.int64)
+            pair_counts = np.zeros(0, dtype=np.int64)
+        rows = codes // n_exercises
+        cols = codes % n_exercises
+
+        # Pointwise mutual information, keeping only positive associations
+        n_baskets = len(baskets)
+        pmi = np.log(pair_counts * n_baskets / (counts[rows] * counts[cols]))
+        keep = pmi > 0
+        rows, cols, pmi, pair_counts = rows[keep], cols[keep], pmi[keep], pair_counts[keep]
+
+        # Sort by row, then by descending PMI (ties broken by how often the pair was seen)
+        order = np.lexsort((-pair_counts, -pmi, rows))
+        rows, cols, pmi = rows[order], cols[order], pmi[order]
+
+        # Truncate every row to its top_k neighbors
+        row_starts = np.searchsorted(rows, np.arange(n_exercises))
+        rank = np.arange(len(rows)) - row_starts[rows]
+        keep = rank < top_k
+        rows, cols, pmi = rows[keep], cols[keep], pmi[keep]
+
+        indptr = np.zeros(n_exercises + 1, dtype=np.int32)
+        np.cumsum(np.bincount(rows, minlength=n_exercises), out=indptr[1:])
+        return cls(vocabulary, indptr, cols, pmi, dataset_fingerprint(df))
+
+    def save(self, path=COOCCURRENCE_FILE):
+        """Save the matrix to a compressed .npz file."""
+        np.savez_compressed(path, fingerprint=np.array(self.fingerprint), vocabulary=self.vocabulary,
+                            indptr=self.indptr, indices=self.indices, data=self.data)
+
+    @classmethod
+    def load(cls, path=COOCCURRENCE_FILE):
+        """Load a matrix previously written with save()."""
+        with np.load(path, allow_pickle=False) as archive:
+            fingerprint = str(archive['fingerprint']) if 'fingerprint' in archive.files else ''
+            return cls(archive['vocabulary'], archive['indptr'], archive['indices'], archive['data'], fingerprint)
+
+    def neighbors(self, exercise, k=10):
+        """Return the top-k (exercise, pmi) pairs that co-occur with an exercise."""
+        i = self.index.get(exercise)
+        if i is None:
+            return []
+        start = self.indptr[i]
+        end = min(self.indptr[i + 1], start + k)
+        return [(self.vocabulary[j], float(score))
+                for j, score in zip(self.indices[start:end], self.data[start:end])]
+
+    def expand(self, exercises, count, k=10, max_hops=2):
+        """Suggest up to `count` new exercises that co-occur with the given ones.
+
+        Candidates are scored by their summed PMI to the seed set; if one hop
+        is not enough, the best candidates become seeds for the next hop.
+        """
+        seen = set(exercises)
+        seeds = [self.index[name] for name in exercises if name in self.index]
+        suggestions = []
+        for _ in range(max_hops):
+            if len(suggestions) >= count or not seeds:
+                break
+            scores = {}
+            for i in seeds:
+                start = self.indptr[i]
+                end = min(self.indptr[i + 1], start + k)
+                for j, score in zip(self.indices[start:end].tolist(), self.data[start:end].tolist()):
+                    scores[j] = scores.get(j, 0.0) + score
+            ranked = sorted(scores, key=lambda j: (-scores[j], j))
+            seeds = []
+            for j in ranked:
+                name = str(self.vocabulary[j])
+                if name in seen:
+                    continue
+                seen.add(name)
+                suggestions.append(name)
+                seeds.append(j)
+                if len(suggestions) >= count:
+                    break
+        return suggestions
+
+
+def load_or_build_cooccurrence(df=None, path=COOCCURRENCE_FILE, save=True):
+    """Load the co-occurrence matrix from disk, building it if missing or built from other members.
+
+    Built matrices are saved unless `save` is False.
+    """
+    if df is None:
+        df = pd.read_csv('members_with_exercise_recommendations.csv')
+    if os.path.exists(path):
+        try:
+            model = ExerciseCooccurrence.load(path)
+            if model.fingerprint == dataset_fingerprint(df):
+                return model
+        except Exception:
+            print("Could not load exercise co-occurrence matrix, rebuilding...")
+    model = ExerciseCooccurrence.build(df)
+    if save:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        model.save(path)
+    return model
+
+
+def main():
+    """Rebuild the exercise co-occurrence matrix from the members dataset."""
+    print("Building exercise co-occurrence matrix...")
+    df = pd.read_csv('members_with_exercise_recommendations.csv')
+    model = ExerciseCooccurrence.build(df)
+    os.makedirs(os.path.dirname(COOCCURRENCE_FILE), exist_ok=True)
+    model.save(COOCCURRENCE_FILE)
+    print(f"Saved {len(model.vocabulary)} exercises and {len(model.indices)} neighbor links to {COOCCURRENCE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Check that a saved co-occurrence matrix is rebuilt when the members data changes.
+
+Saves the matrix of the members dataset to a temporary file, then loads it
+back for the same rows and for rows whose Recommended_Exercises changed. The
+first load should match the saved matrix; the second should be rebuilt, so
+the new exercise is in its vocabulary.
+
+Usage: python exercise_cooccurrence_check.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+import pandas as pd
+from exercise_cooccurrence import ExerciseCooccurrence, load_or_build_cooccurrence
+
+NEW_EXERCISE = "Check Exercise"
+
+
+def same_matrix(left, right):
+    return (np.array_equal(left.vocabulary, right.vocabulary) and np.array_equal(left.indptr, right.indptr)
+            and np.array_equal(left.indices, right.indices) and np.array_equal(left.data, right.data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+
+    df = pd.read_csv('members_with_exercise_recommendations.csv')
+    changed = df.copy()
+    # Add the new exercise to half the members, so it has positive co-occurrences
+    changed.loc[::2, 'Recommended_Exercises'] += ', ' + NEW_EXERCISE
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'exercise_cooccurrence.npz')
+        ExerciseCooccurrence.build(df).save(path)
+        saved = ExerciseCooccurrence.load(path)
+        matches = same_matrix(load_or_build_cooccurrence(df, path, save=False), saved)
+        rebuilt = NEW_EXERCISE in load_or_build_cooccurrence(changed, path, save=False).index
+
+    print(f"same members: {'matches the saved matrix' if matches else 'differs from the saved matrix'}")
+    print(f"changed members: {'rebuilt' if rebuilt else 'served the stale matrix'}")
+    if not (matches and rebuilt):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
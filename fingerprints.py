@@ -0,0 +1,7 @@
+import hashlib
+
+
+def file_fingerprint(path):
+    """Hash the contents of a file, so artifacts built from it are only served while it is unchanged."""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
@@ -0,0 +1,127 @@
+import bisect
+import functools
+import re
+import numpy as np
+import meal_optimizer
+import nutrient_table
+
+MIN_SIMILARITY = 0.2  # Trigram similarity below which fuzzy matches are dropped
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    """Lower-case a food name or query and keep only its words."""
+    return ' '.join(_WORD.findall(str(text).lower()))
+
+
+def trigrams(text):
+    """Return the set of character trigrams of a normalized string, padded at word boundaries."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodSearchIndex:
+    """Prefix and trigram search over the food names of a nutrient table.
+
+    Word prefixes are answered by binary search over the sorted name words;
+    fuzzy matches rank foods by the share of trigrams they have in common
+    with the query, counted over per-trigram posting lists.
+    """
+
+    def __init__(self, nutrients):
+        self.nutrients = nutrients
+        self.names = [normalize(name) for name in nutrients.display_name]
+
+        words = sorted({(word, row) for row, name in enumerate(self.names) for word in name.split()})
+        self.words = [word for word, _ in words]
+        self.word_rows = np.array([row for _, row in words], dtype=np.int32)
+
+        postings = {}
+        for row, name in enumerate(self.names):
+            for gram in trigrams(name):
+                postings.setdefault(gram, []).append(row)
+        self.postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+        self.trigram_counts = np.array([len(trigrams(name)) for name in self.names], dtype=np.float64)
+
+        # Category and category group of every row, for filtering
+        self.category_groups = {}
+        for category, rows in nutrients.category_index.items():
+            for name in {category, meal_optimizer.category_group(category)}:
+                self.category_groups[name] = np.union1d(self.category_groups.get(name, []), rows).astype(np.int32)
+
+    def prefix_rows(self, query):
+        """Return the rows whose names contain a word starting with every word of the query."""
+        rows = None
+        for word in query.split():
+            lo = bisect.bisect_left(self.words, word)
+            hi = bisect.bisect_left(self.words, word + '\uffff', lo)
+            matches = np.unique(self.word_rows[lo:hi])
+            rows = matches if rows is None else np.intersect1d(rows, matches, assume_unique=True)
+        return rows if rows is not None else np.zeros(0, dtype=np.int32)
+
+    def similarity(self, query):
+        """Return the trigram similarity of the query to every food name (0 to 1)."""
+        query_grams = trigrams(query)
+        lists = [self.postings[gram] for gram in query_grams if gram in self.postings]
+        if not lists:
+            return np.zeros(len(self.names))
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.names))
+        return shared / (len(query_grams) + self.trigram_counts - shared)
+
+    def search(self, query, k=10, categories=None):
+        """Return the rows of the top-k foods matching a query, optionally only from some categories.
+
+        Foods with a word starting with every query word come first, closest
+        names first; the rest are filled with the best fuzzy matches.
+        Categories may be table categories or category groups such as 'Vegetables'.
+        """
+        query = normalize(query)
+        allowed = None
+        if categories:
+            allowed = np.zeros(len(self.names), dtype=bool)
+            for category in categories:
+                allowed[self.category_groups.get(category, [])] = True
+        if not query:
+            rows = np.arange(len(self.names)) if allowed is None else np.flatnonzero(allowed)
+            return rows[:k].tolist()
+
+        score = self.similarity(query)
+        prefix = self.prefix_rows(query)
+        score[prefix] += 1.0 + 1.0 / (1.0 + np.array([len(self.names[row]) for row in prefix]))
+        if allowed is not None:
+            score[~allowed] = 0
+        candidates = np.flatnonzero(score >= MIN_SIMILARITY)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-score[candidates], k - 1)[:k]]
+        return candidates[np.argsort(-score[candidates], kind='stable')].tolist()
+
+    def describe(self, rows):
+        """Return the name, category and nutrients per measure of the foods in some rows."""
+        return [dict(Food=self.nutrients.display_name[row],
+                     Category=self.nutrients.categories[self.nutrients.category_codes[row]],
+                     **self.nutrients.nutrients(row))
+                for row in rows]
+
+    def results(self, query, k=10, categories=None):
+        """Return the top-k matching foods with their category and nutrients per measure."""
+        return self.describe(self.search(query, k, categories))
+
+
+def swap_food(meal_plan, food, nutrients, row):
+    """Return a copy of a MealPlan with one food replaced by a table row, keeping about the same calories."""
+    calories = meal_plan.food_totals[meal_plan.foods.index(food), 0]
+    servings = np.round(calories / max(nutrients.calories[row], 1) / meal_optimizer.SERVING_STEP)
+    servings = float(np.clip(servings * meal_optimizer.SERVING_STEP, meal_optimizer.SERVING_STEP,
+                             meal_optimizer.MAX_SERVINGS))
+    return meal_plan.replace(food, nutrients, row, servings)
+
+
+@functools.lru_cache(maxsize=8)
+def _index_for(nutrients):
+    return FoodSearchIndex(nutrients)
+
+
+def load_food_index(nutrient_file=nutrient_table.NUTRIENT_FILE):
+    """Return the search index of a nutrient file, built once per loaded table."""
+    return _index_for(nutrient_table.load_nutrient_table(nutrient_file))
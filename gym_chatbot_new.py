@@ -1,18 +1,137 @@
 import pandas as pd
-import numpy as np21
+import numpy as np
 import pickle
 import os
+import threading
+from collections import namedtuple
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
 import gym_ml_model_new  # Import our ML model script
+import calorie_surface
+import cascade
+import exercise_cooccurrence
+import meal_plan_templates
+import recommendation_table
+import schedule_planner
+import food_search
+import plan_types
+import planning_pipeline
+
+# Workout types and session durations (hours) evaluated by the counterfactual calories predictions
+WORKOUT_TYPES = ['Strength', 'Cardio', 'HIIT', 'Yoga']
+SESSION_DURATIONS = [0.5, 0.75, 1.0, 1.5, 2.0]
+
+# Default what-if grid: 20 session durations (hours) by 1-7 workout days per week
+WHAT_IF_DURATIONS = np.round(np.linspace(0.25, 3.0, 20), 4).tolist()
+WHAT_IF_FREQUENCIES = list(range(1, 8))
+
+# Answer the workout type and experience classifiers from their first trees when those are sure (see cascade.py)
+CASCADE_INFERENCE = True
+
+# Workout types that serve each goal, the first one being the default
+GOAL_WORKOUTS = {
+    "Weight Loss": ["HIIT", "Cardio"],
+    "Muscle Building": ["Strength"],
+    "Cardiovascular Health": ["Cardio", "HIIT"],
+    "Flexibility": ["Yoga"],
+    "General Fitness": ["HIIT", "Strength", "Cardio", "Yoga"]
+}
+
+# Generic exercises based on workout type, used as a last resort when padding recommendations
+GENERIC_EXERCISES = {
+    'Strength': [
+        'Bench Press', 'Squats', 'Deadlifts', 'Shoulder Press', 
+        'Bicep Curls', 'Tricep Extensions', 'Lat Pulldowns', 'Lunges',
+        'Push-ups', 'Pull-ups', 'Dumbbell Rows', 'Leg Press'
+    ],
+    'Cardio': [
+        'Running', 'Cycling', 'Jumping Jacks', 'Burpees',
+        'Mountain Climbers', 'High Knees', 'Jump Rope', 'Stair Climbing',
+        'Elliptical Training', 'Swimming', 'Rowing', 'Boxing'
+    ],
+    'HIIT': [
+        'Burpees', 'Mountain Climbers', 'Jump Squats', 'Plank Jacks',
+        'High Knees', 'Kettlebell Swings', 'Box Jumps', 'Battle Ropes',
+        'Jumping Lunges', 'Push-up Variations', 'Sprints', 'Medicine Ball Slams'
+    ],
+    'Yoga': [
+        'Downward Dog', 'Warrior Pose', 'Tree Pose', 'Child\'s Pose',
+        'Cobra Pose', 'Triangle Pose', 'Bridge Pose', 'Plank Pose',
+        'Chair Pose', 'Cat-Cow Stretch', 'Sun Salutation', 'Corpse Pose'
+    ]
+}
+
+
+class ServingSnapshot(namedtuple('ServingSnapshot', [
+        'calories_model', 'workout_model', 'experience_model',
+        'dataset', 'workout_types', 'experience_levels',
+        'member_bmi', 'member_age', 'member_workout', 'member_experience', 'member_exercises',
+        'cooccurrence', 'recommendation_table', 'exercise_index', 'calorie_surface',
+        'workout_cascade', 'experience_cascade'])):
+    """Preprocessed serving state (models, member arrays and indexes) shared by all threads.
+    
+    A snapshot is never modified once published: arrays are read-only and
+    updates build a new snapshot that replaces the old one in a single
+    reference swap, so readers never need a lock.
+    """
+    __slots__ = ()
+    
+    @classmethod
+    def empty(cls):
+        return cls(*[None] * len(cls._fields))
+
+
+def _read_only(values):
+    array = np.asarray(values)
+    array.flags.writeable = False
+    return array
+
+
+def _snapshot_field(name):
+    """Expose a field of the current snapshot as an attribute; assigning it publishes a new snapshot."""
+    def getter(self):
+        return getattr(self._snapshot, name)
+    
+    def setter(self, value):
+        self.publish_snapshot(**{name: value})
+    
+    return property(getter, setter)
+
 
 class GymChatbot:
-    def __init__(self):
-        """Initialize the chatbot with trained models."""
+    calories_model = _snapshot_field('calories_model')
+    workout_model = _snapshot_field('workout_model')
+    experience_model = _snapshot_field('experience_model')
+    dataset = _snapshot_field('dataset')
+    workout_types = _snapshot_field('workout_types')
+    experience_levels = _snapshot_field('experience_levels')
+    cooccurrence = _snapshot_field('cooccurrence')
+    recommendation_table = _snapshot_field('recommendation_table')
+    exercise_index = _snapshot_field('exercise_index')
+    calorie_surface = _snapshot_field('calorie_surface')
+    workout_cascade = _snapshot_field('workout_cascade')
+    experience_cascade = _snapshot_field('experience_cascade')
+    
+    _shared = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, read_only=False):
+        """Initialize the chatbot with trained models.
+        
+        A read-only chatbot never trains models or writes artifacts to models/;
+        it fails if the models can't be loaded and keeps rebuilt indexes in memory.
+        """
         print("Initializing Gym Recommendation Chatbot...")
         
+        # Serving state is published as immutable snapshots; only writers take the lock
+        self._snapshot = ServingSnapshot.empty()
+        self._publish_lock = threading.Lock()
+        self.read_only = read_only
+        
         # Check if models exist, if not train them
-        if not os.path.exists('models'):
+        if read_only:
+            self.load_models()
+        elif not os.path.exists('models'):
             os.makedirs('models')
             self.train_models()
         else:
@@ -22,15 +141,74 @@ class GymChatbot:
                 print("Could not load models, training new ones...")
                 self.train_models()
         
-        # Load the dataset for reference
-        self.dataset = pd.read_csv('members_with_exercise_recommendations.csv')
+        # Load the interpolated calories surface, rebuilding it if the calories model changed
+        self.calorie_surface = calorie_surface.load_or_build_surface(self.calories_model, save=not read_only)
         
-        # Extract unique workout types and experience levels
-        self.workout_types = self.dataset['Workout_Type'].unique()
-        self.experience_levels = sorted(self.dataset['Experience_Level'].unique())
+        # Build the meal plan templates now rather than on the first request that needs them
+        meal_plan_templates.load_templates(gym_ml_model_new.meal_splits(), save=not read_only)
+        
+        # Load the dataset for reference and build the indexes used for recommendations
+        self.load_dataset()
         
         print("Chatbot ready! Let's help you find the perfect workout.")
     
+    @classmethod
+    def shared(cls, read_only=False):
+        """Return the process-wide chatbot instance shared by all sessions, creating it on first use."""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls(read_only)
+        return cls._shared
+    
+    @property
+    def snapshot(self):
+        """The current serving snapshot. Read it once per request and use it throughout."""
+        return self._snapshot
+    
+    def publish_snapshot(self, **changes):
+        """Publish a new snapshot with some fields replaced, swapping the reference atomically."""
+        with self._publish_lock:
+            self._snapshot = self._snapshot._replace(**changes)
+    
+    def load_dataset(self, dataset=None):
+        """Preprocess the member dataset into a new snapshot and publish it."""
+        if dataset is None:
+            dataset = pd.read_csv('members_with_exercise_recommendations.csv')
+        
+        # Load the exercise co-occurrence matrix used to pad recommendations
+        cooccurrence = exercise_cooccurrence.load_or_build_cooccurrence(dataset, save=not self.read_only)
+        
+        # Load the materialized recommendation table, refreshing partitions whose members changed
+        table = recommendation_table.load_or_refresh_table(dataset, save=not self.read_only)
+        
+        # Index the exercise catalog by muscle group and focus area for the schedule planner
+        catalog = cooccurrence.vocabulary.tolist() + [e for exercises in GENERIC_EXERCISES.values() for e in exercises]
+        exercise_index = schedule_planner.ExerciseIndex(catalog)
+        
+        # Calibrate the classifier cascades on profiles sampled from the members
+        cascades = {}
+        if CASCADE_INFERENCE:
+            profiles = cascade.calibration_profiles(dataset)
+            cascades = dict(workout_cascade=cascade.build_cascade(self.workout_model, profiles),
+                            experience_cascade=cascade.build_cascade(self.experience_model, profiles))
+        
+        self.publish_snapshot(
+            **cascades,
+            dataset=dataset,
+            # Extract unique workout types and experience levels
+            workout_types=_read_only(dataset['Workout_Type'].unique()),
+            experience_levels=tuple(sorted(dataset['Experience_Level'].unique())),
+            member_bmi=_read_only(dataset['BMI'].to_numpy(dtype=np.float64)),
+            member_age=_read_only(dataset['Age'].to_numpy(dtype=np.float64)),
+            member_workout=_read_only(dataset['Workout_Type'].to_numpy(dtype=object)),
+            member_experience=_read_only(dataset['Experience_Level'].to_numpy()),
+            member_exercises=tuple(tuple(exercise_cooccurrence.split_exercises(value))
+                                   for value in dataset['Recommended_Exercises']),
+            cooccurrence=cooccurrence,
+            recommendation_table=table,
+            exercise_index=exercise_index)
+    
     def train_models(self):
         """Train the machine learning models."""
         print("Training machine learning models...")
@@ -213,213 +391,238 @@ class GymChatbot:
         
         return user_calories, user_workout, user_experience
     
-    def get_exercise_recommendations(self, user_info, predicted_workout, predicted_experience):
-        """Get personalized exercise recommendations based on user profile and predictions."""
-        # Filter the dataset based on predicted workout type and experience level
-        filtered_df = self.dataset[
-            (self.dataset['Workout_Type'] == predicted_workout) & 
-            (self.dataset['Experience_Level'] == predicted_experience)
-        ]
+    def predict_calories_by_workout_type(self, user_info, durations=SESSION_DURATIONS, snapshot=None):
+        """Predict calories per session for every workout type and several session durations in one batch.
+        
+        The user's own session duration is always included. Returns a DataFrame
+        indexed by workout type with one column per session duration.
+        """
+        snapshot = snapshot or self.snapshot
+        durations = sorted(set(durations) | {user_info['Session_Duration (hours)']})
+        user_calories, _, _ = self.prepare_prediction_data(user_info)
+        
+        # Repeat the user's row once per (workout type, duration) pair and predict them together
+        grid = user_calories.loc[user_calories.index.repeat(len(WORKOUT_TYPES) * len(durations))].reset_index(drop=True)
+        grid['Workout_Type'] = np.repeat(WORKOUT_TYPES, len(durations))
+        grid['Session_Duration (hours)'] = np.tile(durations, len(WORKOUT_TYPES))
+        predictions = calorie_surface.predict_calories(snapshot.calories_model, snapshot.calorie_surface, grid)
+        predictions = predictions.reshape(len(WORKOUT_TYPES), len(durations))
+        
+        return pd.DataFrame(predictions, index=WORKOUT_TYPES, columns=durations)
+    
+    def predict_calories_sweep(self, user_info, workout_type, durations=WHAT_IF_DURATIONS,
+                               frequencies=WHAT_IF_FREQUENCIES, avg_bpms=None, snapshot=None):
+        """Predict calories per session over a grid of session durations, weekly frequencies and average BPMs.
+        
+        The whole grid is one feature matrix and one batched prediction.
+        Sweeps over several frequencies skip the calorie surface, which holds
+        the frequency at its median and would predict the same calories for
+        each. Returns a DataFrame with one row per grid point: the three
+        swept values, 'Calories' per session and 'Weekly Calories'.
+        """
+        snapshot = snapshot or self.snapshot
+        avg_bpms = [user_info['Avg_BPM']] if avg_bpms is None else avg_bpms
+        user_calories, _, _ = self.prepare_prediction_data(user_info)
+        duration, frequency, avg_bpm = (axis.ravel() for axis in np.meshgrid(durations, frequencies, avg_bpms,
+                                                                             indexing='ij'))
+        
+        grid = user_calories.loc[user_calories.index.repeat(len(duration))].reset_index(drop=True)
+        grid['Workout_Type'] = workout_type
+        grid['Session_Duration (hours)'] = duration
+        grid['Workout_Frequency (days/week)'] = frequency
+        grid['Avg_BPM'] = avg_bpm
+        if len(set(frequencies)) > 1:
+            calories = snapshot.calories_model.predict(grid)
+        else:
+            calories = calorie_surface.predict_calories(snapshot.calories_model, snapshot.calorie_surface, grid)
+        
+        return pd.DataFrame({
+            'Session_Duration (hours)': duration,
+            'Workout_Frequency (days/week)': frequency,
+            'Avg_BPM': avg_bpm,
+            'Calories': calories,
+            'Weekly Calories': calories * frequency,
+        })
+    
+    def classify_profile(self, user_info, snapshot=None):
+        """Predict the workout type and experience level of a user. Returns (predicted_workout, predicted_experience)."""
+        snapshot = snapshot or self.snapshot
+        _, user_workout, user_experience = self.prepare_prediction_data(user_info)
+        predicted_workout = cascade.predict(snapshot.workout_model, snapshot.workout_cascade, user_workout)[0]
+        predicted_experience = cascade.predict(snapshot.experience_model, snapshot.experience_cascade,
+                                               user_experience)[0]
+        return predicted_workout, predicted_experience
+    
+    def predict_profile(self, user_info, snapshot=None):
+        """Run all three models for a user against a single snapshot.
+        
+        Returns (calories_table, predicted_workout, predicted_experience).
+        """
+        snapshot = snapshot or self.snapshot
+        predicted_workout, predicted_experience = self.classify_profile(user_info, snapshot)
+        calories_table = self.predict_calories_by_workout_type(user_info, snapshot=snapshot)
+        return calories_table, predicted_workout, predicted_experience
+    
+    def find_similar_member_exercises(self, user_info, predicted_workout, predicted_experience, snapshot=None):
+        """Collect the exercises recommended to the members most similar to the user."""
+        snapshot = snapshot or self.snapshot
+        
+        # Filter the members based on predicted workout type and experience level
+        mask = (snapshot.member_workout == predicted_workout) & (snapshot.member_experience == predicted_experience)
         
         # If we don't have enough matches, relax the experience level constraint
-        if len(filtered_df) < 5:
-            filtered_df = self.dataset[self.dataset['Workout_Type'] == predicted_workout]
+        if mask.sum() < 5:
+            mask = snapshot.member_workout == predicted_workout
         
         # If we still don't have enough matches, use the whole dataset
-        if len(filtered_df) < 5:
-            filtered_df = self.dataset
-        
-        # Find similar users based on BMI and age
-        filtered_df['BMI_diff'] = abs(filtered_df['BMI'] - user_info['BMI'])
-        filtered_df['Age_diff'] = abs(filtered_df['Age'] - user_info['Age'])
+        if mask.sum() < 5:
+            mask = np.ones(len(snapshot.member_bmi), dtype=bool)
         
-        # Normalize differences
-        if filtered_df['BMI_diff'].max() > 0:
-            filtered_df['BMI_diff'] = filtered_df['BMI_diff'] / filtered_df['BMI_diff'].max()
-        if filtered_df['Age_diff'].max() > 0:
-            filtered_df['Age_diff'] = filtered_df['Age_diff'] / filtered_df['Age_diff'].max()
-        
-        # Calculate similarity score (lower is better)
-        filtered_df['similarity'] = filtered_df['BMI_diff'] + filtered_df['Age_diff']
+        # Find similar users based on BMI and age, normalizing each difference by its maximum
+        members = np.flatnonzero(mask)
+        bmi = snapshot.member_bmi[members]
+        age = snapshot.member_age[members]
+        scores = recommendation_table.similarity_scores(
+            bmi, age, user_info['BMI'], user_info['Age'],
+            np.abs(bmi - user_info['BMI']).max(), np.abs(age - user_info['Age']).max())
         
         # Get top 10 most similar users to have more exercise options
-        similar_users = filtered_df.sort_values('similarity').head(10)
+        similar_users = members[np.argsort(scores, kind='stable')[:10]]
         
         # Extract their recommended exercises
         all_exercises = []
-        for _, user in similar_users.iterrows():
-            if pd.notna(user['Recommended_Exercises']):
-                exercises = user['Recommended_Exercises'].split(', ')
-                all_exercises.extend(exercises)
+        for member in similar_users:
+            all_exercises.extend(snapshot.member_exercises[member])
+        
+        return all_exercises
+    
+    def get_exercise_recommendations(self, user_info, predicted_workout, predicted_experience, snapshot=None):
+        """Get personalized exercise recommendations based on user profile and predictions."""
+        snapshot = snapshot or self.snapshot
+        
+        # Look up similar members' exercises in the materialized table, falling back to a live search
+        all_exercises = snapshot.recommendation_table.lookup(user_info, predicted_workout, predicted_experience)
+        if all_exercises is None:
+            all_exercises = self.find_similar_member_exercises(user_info, predicted_workout, predicted_experience,
+                                                               snapshot)
         
         # Remove duplicates
         unique_exercises = list(dict.fromkeys(all_exercises))
         
-        # If we don't have enough exercises, add some generic ones based on workout type
-        generic_exercises = {
-            'Strength': [
-                'Bench Press', 'Squats', 'Deadlifts', 'Shoulder Press', 
-                'Bicep Curls', 'Tricep Extensions', 'Lat Pulldowns', 'Lunges',
-                'Push-ups', 'Pull-ups', 'Dumbbell Rows', 'Leg Press'
-            ],
-            'Cardio': [
-                'Running', 'Cycling', 'Jumping Jacks', 'Burpees',
-                'Mountain Climbers', 'High Knees', 'Jump Rope', 'Stair Climbing',
-                'Elliptical Training', 'Swimming', 'Rowing', 'Boxing'
-            ],
-            'HIIT': [
-                'Burpees', 'Mountain Climbers', 'Jump Squats', 'Plank Jacks',
-                'High Knees', 'Kettlebell Swings', 'Box Jumps', 'Battle Ropes',
-                'Jumping Lunges', 'Push-up Variations', 'Sprints', 'Medicine Ball Slams'
-            ],
-            'Yoga': [
-                'Downward Dog', 'Warrior Pose', 'Tree Pose', 'Child\'s Pose',
-                'Cobra Pose', 'Triangle Pose', 'Bridge Pose', 'Plank Pose',
-                'Chair Pose', 'Cat-Cow Stretch', 'Sun Salutation', 'Corpse Pose'
-            ]
-        }
+        # If we don't have enough exercises, expand them through exercises that are often recommended together
+        if len(unique_exercises) < 20:
+            unique_exercises.extend(snapshot.cooccurrence.expand(unique_exercises, 20 - len(unique_exercises)))
         
-        # Add generic exercises if needed
-        if len(unique_exercises) < 20 and predicted_workout in generic_exercises:
-            for exercise in generic_exercises[predicted_workout]:
+        # Add generic exercises if the co-occurrence model could not fill the list
+        if len(unique_exercises) < 20 and predicted_workout in GENERIC_EXERCISES:
+            for exercise in GENERIC_EXERCISES[predicted_workout]:
                 if exercise not in unique_exercises:
                     unique_exercises.append(exercise)
         
         # Return at least 20 exercises (or all if less than 20 are available)
         return unique_exercises[:min(28, len(unique_exercises))]
     
-    def get_workout_plan(self, user_info, predicted_workout, predicted_calories, predicted_experience, recommendations):
-        """Create a personalized workout plan based on user info and predictions."""
+    def recommend_workout_type(self, predicted_workout, goal):
+        """Return the workout type to recommend for a goal, given the predicted one."""
+        # Check if predicted workout aligns with user's goal
+        goal_workouts = GOAL_WORKOUTS[goal]
+        if predicted_workout in goal_workouts:
+            return predicted_workout
+        # If not, recommend the first workout type that matches their goal
+        return goal_workouts[0]
+    
+    def get_workout_plan(self, user_info, predicted_workout, predicted_calories, predicted_experience, recommendations,
+                         calories_table=None, snapshot=None):
+        """Create a personalized workout plan based on user info and predictions.
+        
+        If a calories table from predict_calories_by_workout_type is given, the
+        calories per session are taken for the recommended workout type.
+        """
         experience_descriptions = {
             1: "Beginner",
             2: "Intermediate",
             3: "Advanced"
         }
         
-        goal_workout_mapping = {
-            "Weight Loss": ["HIIT", "Cardio"],
-            "Muscle Building": ["Strength"],
-            "Cardiovascular Health": ["Cardio", "HIIT"],
-            "Flexibility": ["Yoga"],
-            "General Fitness": ["HIIT", "Strength", "Cardio", "Yoga"]
-        }
+        recommended_workout = self.recommend_workout_type(predicted_workout, user_info['Goal'])
         
-        # Check if predicted workout aligns with user's goal
-        goal_workouts = goal_workout_mapping[user_info['Goal']]
-        if predicted_workout in goal_workouts:
-            recommended_workout = predicted_workout
-        else:
-            # If not, recommend the first workout type that matches their goal
-            recommended_workout = goal_workouts[0]
+        # Use the calories predicted for the workout type we actually recommend
+        if calories_table is not None:
+            predicted_calories = calories_table.loc[recommended_workout, user_info['Session_Duration (hours)']]
         
         # Determine workout days
         sessions_per_week = min(int(user_info['Workout_Frequency (days/week)']), 5)
         
-        # Create a weekly schedule with workout days and rest days
-        days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        workout_days = []
-        rest_days = []
-        
-        # Distribute workouts with rest days if possible
-        for i, day in enumerate(days):
-            if len(workout_days) < sessions_per_week:
-                if i % 2 == 0 or sessions_per_week > 3:
-                    workout_days.append(day)
-                else:
-                    rest_days.append(day)
-            else:
-                rest_days.append(day)
-        
-        # Organize exercises by workout day (4 exercises per day)
-        daily_exercises = {}
-        exercise_index = 0
-        
-        # Different exercise focus for each day if it's a strength workout
-        strength_focus = {
-            0: "Upper Body",
-            1: "Lower Body",
-            2: "Core",
-            3: "Full Body",
-            4: "Arms and Back"
-        }
-        
-        for i, day in enumerate(workout_days):
-            # Get 4 exercises for this day
-            day_exercises = []
-            for j in range(4):
-                if exercise_index < len(recommendations):
-                    day_exercises.append(recommendations[exercise_index])
-                    exercise_index += 1
-                else:
-                    # If we run out of recommendations, start over
-                    exercise_index = 0
-                    if exercise_index < len(recommendations):
-                        day_exercises.append(recommendations[exercise_index])
-                        exercise_index += 1
-            
-            # Add focus area for strength workouts
-            if recommended_workout == "Strength":
-                focus = strength_focus.get(i % len(strength_focus), "Full Body")
-                daily_exercises[day] = {"focus": focus, "exercises": day_exercises}
-            else:
-                daily_exercises[day] = {"focus": recommended_workout, "exercises": day_exercises}
+        # Search the weekly layout and day-to-exercise assignment, with muscle-group focus days for strength workouts
+        if recommended_workout == "Strength":
+            focus_areas = schedule_planner.FOCUS_AREAS
+        else:
+            focus_areas = [recommended_workout]
+        snapshot = snapshot or self.snapshot
+        workout_days, rest_days, schedule = schedule_planner.plan_schedule(
+            recommendations, sessions_per_week, snapshot.exercise_index, focus_areas)
         
         # Create the workout plan
-        plan = {
-            "workout_type": recommended_workout,
-            "experience_level": experience_descriptions.get(predicted_experience, "Beginner"),
-            "sessions_per_week": sessions_per_week,
-            "calories_per_session": int(predicted_calories),
-            "session_duration": f"{user_info['Session_Duration (hours)']:.2f} hours",
-            "daily_exercises": daily_exercises,
-            "workout_days": workout_days,
-            "rest_days": rest_days,
-            "hydration": f"{user_info['Weight (kg)'] * 0.03:.1f} liters of water per day"
-        }
+        plan = plan_types.WorkoutPlan(
+            workout_type=recommended_workout,
+            experience_level=experience_descriptions.get(predicted_experience, "Beginner"),
+            sessions_per_week=sessions_per_week,
+            calories_per_session=predicted_calories,
+            session_hours=user_info['Session_Duration (hours)'],
+            hydration_liters=user_info['Weight (kg)'] * 0.03,
+            workout_days=workout_days,
+            rest_days=rest_days,
+            daily_exercises=schedule
+        )
         
         return plan
     
-    def display_workout_plan(self, plan):
+    def get_weekly_meal_plan(self, plan, user_goal=None):
+        """Plan the meals of every day of the week from the calories burned that day."""
+        day_calories = {day: plan.calories_per_session if day in plan.workout_days else 0
+                        for day in schedule_planner.DAYS}
+        return gym_ml_model_new.generate_weekly_meal_plan(day_calories, "nutrients_csvfile.csv", user_goal)
+    
+    def display_workout_plan(self, plan, weekly_meals=None):
         """Display the workout plan in a user-friendly format."""
         print("\n" + "="*60)
-        print(f"YOUR PERSONALIZED {plan['workout_type'].upper()} WORKOUT PLAN")
+        print(f"YOUR PERSONALIZED {plan.workout_type.upper()} WORKOUT PLAN")
         print("="*60)
         
-        print(f"\nExperience Level: {plan['experience_level']}")
-        print(f"Recommended Sessions: {plan['sessions_per_week']} days per week")
-        print(f"Estimated Calories Burned: {plan['calories_per_session']} per session")
-        print(f"Recommended Session Duration: {plan['session_duration']}")
+        print(f"\nExperience Level: {plan.experience_level}")
+        print(f"Recommended Sessions: {plan.sessions_per_week} days per week")
+        print(f"Estimated Calories Burned: {plan.calories_per_session} per session")
+        print(f"Recommended Session Duration: {plan.session_duration}")
         
-        # Convert liters to cups (1 liter ≈ 4.22675 cups)
-        cups = float(plan['hydration'].split()[0]) * 4.22675
-        print(f"Hydration Recommendation: {plan['hydration']} (approximately {cups:.1f} cups per day)")
+        print(f"Hydration Recommendation: {plan.hydration} (approximately {plan.hydration_cups:.1f} cups per day)")
         
         print("\nWEEKLY SCHEDULE:")
         print("-"*60)
         
-        used_foods = set()  # Track previously recommended foods to avoid repetition
+        # Plan every day's meals at once, without repeating foods on consecutive days
+        if weekly_meals is None:
+            weekly_meals = self.get_weekly_meal_plan(plan)
         
         # Display workout days with exercises
-        for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]:
-            if day in plan['workout_days']:
-                day_plan = plan['daily_exercises'][day]
-                print(f"\n{day}: {plan['workout_type']} Workout - {day_plan['focus']}")
+        for day in schedule_planner.DAYS:
+            if day in plan.workout_days:
+                focus, exercises = plan.daily_exercises[day]
+                print(f"\n{day}: {plan.workout_type} Workout - {focus}")
                 print("  Exercises:")
-                for i, exercise in enumerate(day_plan['exercises'], 1):
+                for i, exercise in enumerate(exercises, 1):
                     print(f"  {i}. {exercise}")
-                
-                # Generate and display unique nutrition recommendation for the workout day
-                print("  Recommended Nutrition:")
-                nutrient_file = "nutrients_csvfile.csv"
-                gym_ml_model_new.generate_meal_recommendations(plan['calories_per_session'], nutrient_file, used_foods)
             else:
                 print(f"\n{day}: Rest Day")
                 print("  Focus on recovery, light stretching, and staying hydrated")
+            
+            print("  Recommended Nutrition:")
+            for food, measure, servings, totals in weekly_meals[day].items():
+                print(f"  - {food}: {servings:g} x {measure} ({totals['Calories']:.0f} cal)")
         
         print("\nNOTES:")
         print("- Always warm up for 5-10 minutes before starting your workout")
         print("- Cool down and stretch for 5-10 minutes after your workout")
-        print(f"- Stay hydrated! Drink {plan['hydration']} throughout the day")
+        print(f"- Stay hydrated! Drink {plan.hydration} throughout the day")
         print("- Listen to your body and adjust intensity as needed")
         print("- For best results, follow this plan consistently for at least 4-6 weeks")
         print("="*60)
@@ -432,25 +635,23 @@ class GymChatbot:
         # Get user information
         user_info = self.get_user_info()
         
-        # Prepare data for prediction
-        user_calories, user_workout, user_experience = self.prepare_prediction_data(user_info)
-        
-        # Make predictions
-        predicted_calories = self.calories_model.predict(user_calories)[0]
-        predicted_workout = self.workout_model.predict(user_workout)[0]
-        predicted_experience = self.experience_model.predict(user_experience)[0]
+        # Run the planning stages against a single snapshot of the serving state, independent ones concurrently
+        outputs = planning_pipeline.PlanningPipeline(self).run_stages(
+            user_info, ['classification', 'calories_table', 'plan', 'weekly_meals'], self.snapshot)
+        predicted_workout, predicted_experience = outputs['classification']
+        calories_table = outputs['calories_table']
+        predicted_calories = calories_table.loc[predicted_workout, user_info['Session_Duration (hours)']]
         
         print("\nAnalyzing your profile...")
         print(f"Based on your profile, you would typically burn {predicted_calories:.2f} calories per session.")
         print(f"Your workout style matches with: {predicted_workout}")
+        by_type = calories_table[user_info['Session_Duration (hours)']]
+        print("Calories per session by workout type: " + ", ".join(f"{t} {c:.0f}" for t, c in by_type.items()))
         print(f"Your experience level appears to be: {predicted_experience} (1=Beginner, 2=Intermediate, 3=Advanced)")
         
-        # Get exercise recommendations
-        recommendations = self.get_exercise_recommendations(user_info, predicted_workout, predicted_experience)
-        
-        # Create and display workout plan
-        plan = self.get_workout_plan(user_info, predicted_workout, predicted_calories, predicted_experience, recommendations)
-        self.display_workout_plan(plan)
+        # Display the workout plan with the meals of every day
+        plan = outputs['plan']
+        self.display_workout_plan(plan, outputs['weekly_meals'])
         
         print("\nWould you like to ask any questions about your workout plan? (yes/no)")
         if input().lower().startswith('y'):
@@ -469,38 +670,48 @@ class GymChatbot:
             if question == 'exit':
                 break
             
-            if 'calories' in question:
-                print(f"Based on your profile, you'll burn approximately {plan['calories_per_session']} calories per {plan['workout_type']} session.")
-                print(f"This is influenced by your session duration ({plan['session_duration']}), heart rate, and body metrics.")
+            if question.startswith(('search ', 'find ', 'food ')):
+                # Look foods up in the nutrient table, e.g. "search chicken"
+                query = question.split(' ', 1)[1]
+                matches = food_search.load_food_index().results(query, k=5)
+                if not matches:
+                    print(f"I couldn't find any foods matching '{query}'.")
+                for food in matches:
+                    print(f"- {food['Food']} ({food['Measure']}): {food['Calories']:.0f} cal, {food['Protein']:.0f}g protein, "
+                          f"{food['Carbs']:.0f}g carbs, {food['Fat']:.0f}g fat [{food['Category']}]")
+            
+            elif 'calories' in question:
+                print(f"Based on your profile, you'll burn approximately {plan.calories_per_session} calories per {plan.workout_type} session.")
+                print(f"This is influenced by your session duration ({plan.session_duration}), heart rate, and body metrics.")
             
             elif 'workout type' in question or 'exercise type' in question:
-                print(f"I've recommended {plan['workout_type']} based on your profile and fitness goals ({user_info['Goal']}).")
-                print(f"This type of workout is effective for your experience level ({plan['experience_level']}) and aligns with your goals.")
+                print(f"I've recommended {plan.workout_type} based on your profile and fitness goals ({user_info['Goal']}).")
+                print(f"This type of workout is effective for your experience level ({plan.experience_level}) and aligns with your goals.")
             
             elif any(day.lower() in question for day in ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]):
                 # Extract the day from the question
                 for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]:
                     if day.lower() in question:
-                        if day in plan['workout_days']:
-                            day_plan = plan['daily_exercises'][day]
-                            print(f"{day} is a workout day with focus on {day_plan['focus']}.")
+                        if day in plan.workout_days:
+                            focus, exercises = plan.daily_exercises[day]
+                            print(f"{day} is a workout day with focus on {focus}.")
                             print("Exercises for this day:")
-                            for i, exercise in enumerate(day_plan['exercises'], 1):
+                            for i, exercise in enumerate(exercises, 1):
                                 print(f"{i}. {exercise}")
                             
                             # Add sets and reps recommendations
-                            if plan['workout_type'] == "Strength":
-                                if plan['experience_level'] == "Beginner":
+                            if plan.workout_type == "Strength":
+                                if plan.experience_level == "Beginner":
                                     print("Do 2-3 sets of 10-12 reps with moderate weight.")
-                                elif plan['experience_level'] == "Intermediate":
+                                elif plan.experience_level == "Intermediate":
                                     print("Do 3-4 sets of 8-10 reps with challenging weight.")
                                 else:  # Advanced
                                     print("Do 4-5 sets of 6-8 reps with heavy weight.")
-                            elif plan['workout_type'] == "HIIT":
+                            elif plan.workout_type == "HIIT":
                                 print("Format: 30 seconds work, 15 seconds rest, 3-4 rounds")
-                            elif plan['workout_type'] == "Cardio":
-                                print(f"Duration: {int(float(plan['session_duration'].split()[0]) * 60)} minutes at moderate intensity")
-                            elif plan['workout_type'] == "Yoga":
+                            elif plan.workout_type == "Cardio":
+                                print(f"Duration: {plan.session_minutes} minutes at moderate intensity")
+                            elif plan.workout_type == "Yoga":
                                 print("Hold each pose for 30-60 seconds, focus on breathing")
                         else:
                             print(f"{day} is a rest day. Focus on recovery, light stretching, and staying hydrated.")
@@ -508,27 +719,25 @@ class GymChatbot:
             
             elif 'exercises' in question or 'specific' in question:
                 print("I've recommended specific exercises for each workout day:")
-                for day in plan['workout_days']:
-                    day_plan = plan['daily_exercises'][day]
-                    print(f"\n{day} - {day_plan['focus']}:")
-                    for i, exercise in enumerate(day_plan['exercises'], 1):
+                for day in plan.workout_days:
+                    focus, exercises = plan.daily_exercises[day]
+                    print(f"\n{day} - {focus}:")
+                    for i, exercise in enumerate(exercises, 1):
                         print(f"  {i}. {exercise}")
             
             elif 'schedule' in question or 'frequency' in question:
-                print(f"I recommend working out {plan['sessions_per_week']} days per week based on your input.")
-                print("Your workout days are: " + ", ".join(plan['workout_days']))
-                print("Your rest days are: " + ", ".join(plan['rest_days']))
+                print(f"I recommend working out {plan.sessions_per_week} days per week based on your input.")
+                print("Your workout days are: " + ", ".join(plan.workout_days))
+                print("Your rest days are: " + ", ".join(plan.rest_days))
                 print("It's important to include rest days to allow your body to recover and build strength.")
             
             elif 'water' in question or 'hydration' in question:
-                liters = float(plan['hydration'].split()[0])
-                cups = liters * 4.22675
-                print(f"You should drink approximately {liters:.1f} liters ({cups:.1f} cups) of water daily.")
+                print(f"You should drink approximately {plan.hydration_liters:.1f} liters ({plan.hydration_cups:.1f} cups) of water daily.")
                 print("Proper hydration is crucial for workout performance and recovery.")
             
             elif 'goal' in question:
                 print(f"Your primary goal is {user_info['Goal']}.")
-                print(f"The {plan['workout_type']} workout plan I've recommended is aligned with this goal.")
+                print(f"The {plan.workout_type} workout plan I've recommended is aligned with this goal.")
                 
                 # Add goal-specific advice
                 if user_info['Goal'] == "Weight Loss":
@@ -573,29 +782,29 @@ class GymChatbot:
                     print("This is in the obese range. Your workout plan focuses on cardiovascular health and gradual weight loss.")
             
             elif 'rest' in question:
-                print(f"Your rest days are: {', '.join(plan['rest_days'])}")
+                print(f"Your rest days are: {', '.join(plan.rest_days)}")
                 print("Rest days are crucial for muscle recovery and growth.")
                 print("On rest days, you can do light activities like walking or gentle stretching.")
                 print("Make sure to stay hydrated and get adequate sleep for optimal recovery.")
             
             elif 'sets' in question or 'reps' in question:
-                if plan['workout_type'] == "Strength":
-                    if plan['experience_level'] == "Beginner":
+                if plan.workout_type == "Strength":
+                    if plan.experience_level == "Beginner":
                         print("As a beginner, aim for 2-3 sets of 10-12 reps with moderate weight.")
                         print("Focus on proper form rather than lifting heavy weights.")
-                    elif plan['experience_level'] == "Intermediate":
+                    elif plan.experience_level == "Intermediate":
                         print("As an intermediate lifter, aim for 3-4 sets of 8-10 reps with challenging weight.")
                         print("You should be struggling with the last 1-2 reps of each set.")
                     else:  # Advanced
                         print("As an advanced lifter, aim for 4-5 sets of 6-8 reps with heavy weight.")
                         print("Consider periodizing your training for optimal results.")
-                elif plan['workout_type'] == "HIIT":
+                elif plan.workout_type == "HIIT":
                     print("For HIIT workouts, do each exercise for 30 seconds at maximum effort, followed by 15 seconds of rest.")
                     print("Complete 3-4 rounds of the circuit with minimal rest between rounds.")
-                elif plan['workout_type'] == "Cardio":
-                    print(f"For cardio workouts, maintain a moderate intensity for {int(float(plan['session_duration'].split()[0]) * 60)} minutes.")
+                elif plan.workout_type == "Cardio":
+                    print(f"For cardio workouts, maintain a moderate intensity for {plan.session_minutes} minutes.")
                     print("You should be able to talk but not sing during your cardio sessions.")
-                elif plan['workout_type'] == "Yoga":
+                elif plan.workout_type == "Yoga":
                     print("For yoga, hold each pose for 30-60 seconds while focusing on your breathing.")
                     print("Move slowly between poses and listen to your body to avoid strain.")
             
@@ -612,6 +821,7 @@ class GymChatbot:
                 print("- Your fitness goals")
                 print("- Your weight and height")
                 print("- Your BMI and what it means")
+                print("- Foods and their nutrients (e.g., 'search chicken')")
 
     def validate_numeric_range(self, value_str, min_val, max_val):
         """Validate that a string input is a number within the specified range."""
@@ -10,6 +10,10 @@ from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error, r2_score, accuracy_score, classification_report
 from sklearn.impute import SimpleImputer
+import nutrient_table
+import meal_optimizer
+import meal_plan_templates
+import plan_types
 
 # Set random seed for reproducibility
 np.random.seed(42)
@@ -355,11 +359,18 @@ def make_predictions(calories_model, workout_model, experience_model):
     return predicted_calories  # Return a scalar float instead of an array
 
 
-def generate_meal_recommendations(predicted_calories, nutrient_file, user_goal=None):
-    """Generate meal recommendations based on predicted calories burned and user's goal."""
-    # Read nutrient data
-    nutrient_data = pd.read_csv(nutrient_file)
-    
+GOALS = ["Weight Loss", "Muscle Building", "Cardiovascular Health", "Flexibility", "General Fitness"]
+
+# Nutrient whose most calorie-dense sources are favored for a goal
+GOAL_DENSITY = {
+    "Muscle Building": "protein",
+    "Weight Loss": "fiber",
+    "Cardiovascular Health": "fiber",
+}
+
+
+def meal_targets(predicted_calories, user_goal=None):
+    """Return the (target calories, protein ratio, carb ratio, fat ratio) of a day for the user's goal."""
     # Calculate target calories based on goal
     if user_goal == "Muscle Building":
         target_calories = predicted_calories + 500  # Caloric surplus for muscle growth
@@ -381,83 +392,48 @@ def generate_meal_recommendations(predicted_calories, nutrient_file, user_goal=N
         protein_ratio = 0.3  # 30% protein
         carb_ratio = 0.45   # 45% carbs
         fat_ratio = 0.25    # 25% fat
-    
-    # Define meal recommendations with goal-specific portions
-    meal_plan = {
-        'Grilled Chicken Breast': {
-            'Calories': 165,
-            'Protein': 31,
-            'Carbs': 0,
-            'Fiber': 0,
-            'Servings': 2 if user_goal == "Muscle Building" else 1.5
-        },
-        'Brown Rice': {
-            'Calories': 216,
-            'Protein': 5,
-            'Carbs': 45,
-            'Fiber': 3.5,
-            'Servings': 2 if user_goal in ["Muscle Building", "Cardiovascular Health"] else 1
-        },
-        'Sweet Potato': {
-            'Calories': 180,
-            'Protein': 4,
-            'Carbs': 41,
-            'Fiber': 6.6,
-            'Servings': 1.5 if user_goal in ["Muscle Building", "Cardiovascular Health"] else 1
-        },
-        'Greek Yogurt': {
-            'Calories': 133,
-            'Protein': 11,
-            'Carbs': 3.8,
-            'Fiber': 0,
-            'Servings': 2 if user_goal == "Muscle Building" else 1
-        },
-        'Mixed Nuts': {
-            'Calories': 160,
-            'Protein': 6,
-            'Carbs': 8,
-            'Fiber': 3,
-            'Servings': 1.5 if user_goal == "Weight Loss" else 1
-        },
-        'Protein Shake': {
-            'Calories': 120,
-            'Protein': 24,
-            'Carbs': 3,
-            'Fiber': 0,
-            'Servings': 2 if user_goal == "Muscle Building" else 1
-        },
-        'Quinoa': {
-            'Calories': 222,
-            'Protein': 8,
-            'Carbs': 39,
-            'Fiber': 5,
-            'Servings': 1.5 if user_goal in ["Muscle Building", "Cardiovascular Health"] else 1
-        },
-        'Salmon': {
-            'Calories': 208,
-            'Protein': 22,
-            'Carbs': 0,
-            'Fiber': 0,
-            'Servings': 1.5 if user_goal in ["Muscle Building", "Weight Loss"] else 1
-        },
-        'Broccoli': {
-            'Calories': 55,
-            'Protein': 3.7,
-            'Carbs': 11.2,
-            'Fiber': 5.2,
-            'Servings': 2
-        },
-        'Eggs': {
-            'Calories': 155,
-            'Protein': 13,
-            'Carbs': 1.1,
-            'Fiber': 0,
-            'Servings': 3 if user_goal == "Muscle Building" else 2
-        }
-    }
-    
-    return meal_plan
+    return target_calories, protein_ratio, carb_ratio, fat_ratio
+
+
+def meal_splits():
+    """Return the (protein ratio, carb ratio, fat ratio, preferred nutrient) of every goal's meal plans."""
+    return [(*meal_targets(0, goal)[1:], GOAL_DENSITY.get(goal, '')) for goal in GOALS]
+
+
+def generate_meal_recommendations(predicted_calories, nutrient_file, user_goal=None, read_only=False):
+    """Generate meal recommendations based on predicted calories burned and user's goal, as a MealPlan.
+    
+    With read_only, stale meal plan templates are rebuilt in memory but never written to disk.
+    """
+    # Load the cleaned nutrient table (parsed once per process and file version)
+    nutrients = nutrient_table.load_nutrient_table(nutrient_file)
+    target_calories, protein_ratio, carb_ratio, fat_ratio = meal_targets(predicted_calories, user_goal)
+    prefer = GOAL_DENSITY.get(user_goal, '')
+    
+    # Serve the precomputed plan of the nearest calorie band for the goal's macro split
+    templates = meal_plan_templates.load_templates(meal_splits(), nutrient_file, save=not read_only)
+    plan = templates.lookup(nutrients, target_calories, protein_ratio, carb_ratio, fat_ratio, prefer)
+    if plan is None:
+        # Pick foods and servings (multiples of each food's measure) that hit the calorie and macro targets
+        plan = meal_optimizer.optimize_meal_plan(nutrients, target_calories, protein_ratio, carb_ratio, fat_ratio,
+                                                 prefer=prefer)
+    return plan_types.MealPlan.from_rows(nutrients, *plan)
+
 
+def generate_weekly_meal_plan(day_calories, nutrient_file, user_goal=None):
+    """Generate a meal plan for every day of the week from the calories burned that day.
+    
+    day_calories maps each day to its predicted workout calories (0 on rest
+    days). All days are solved together, and no food is repeated on
+    consecutive days. Returns a dict mapping each day to its MealPlan.
+    """
+    nutrients = nutrient_table.load_nutrient_table(nutrient_file)
+    targets = [meal_targets(calories, user_goal) for calories in day_calories.values()]
+    _, protein_ratio, carb_ratio, fat_ratio = targets[0]
+    
+    week = meal_optimizer.optimize_weekly_meal_plan(nutrients, [target[0] for target in targets], protein_ratio,
+                                                    carb_ratio, fat_ratio, GOAL_DENSITY.get(user_goal, ''))
+    return {day: plan_types.MealPlan.from_rows(nutrients, rows, servings) for day, (rows, servings) in zip(day_calories, week)}
 
 
 def main():
@@ -0,0 +1,259 @@
+import functools
+import re
+import numpy as np
+
+# Limits on how many foods of a category group a plan may contain
+CATEGORY_LIMITS = {
+    'Dairy products': 2,
+    'Meat, Poultry': 2,
+    'Fish, Seafood': 1,
+    'Vegetables': 2,
+    'Fruits': 1,
+    'Breads, cereals, fastfood,grains': 2,
+    'Seeds and Nuts': 1,
+    'Fats, Oils, Shortenings': 0,
+    'Soups': 0,
+    'Desserts, sweets': 0,
+    'Jams, Jellies': 0,
+    'Drinks,Alcohol, Beverages': 0,
+}
+
+MAX_FOODS = 10
+MAX_SERVINGS = 3.0
+MAX_FOOD_CALORIES = 700      # Cap on the calories a single food may contribute
+SERVING_STEP = 0.5
+MIN_FOOD_CALORIES = 20       # Ignore foods that barely contribute (coffee, bouillon...)
+MIN_TARGET_CALORIES = 1200   # Never plan below a safe daily minimum
+CANDIDATES_PER_LIMIT = 3     # Pool size per allowed food of a category
+MAX_FOOD_DAYS = 2            # Days a week the same food may be planned, never on consecutive days
+WEEKLY_CANDIDATES_PER_LIMIT = 6
+
+# Relative weights of the calorie, protein, carb and fat errors
+TARGET_WEIGHTS = np.array([2.0, 1.0, 1.0, 1.0])
+
+
+@functools.lru_cache(maxsize=None)
+def category_group(category):
+    """Collapse alphabetical sub-categories such as 'Vegetables A-E' into 'Vegetables'."""
+    return re.sub(r'\s+[A-Z]-[A-Z]$', '', category)
+
+
+def macro_targets(target_calories, protein_ratio, carb_ratio, fat_ratio):
+    """Return the [calories, protein g, carbs g, fat g] targets of a plan."""
+    target_calories = max(float(target_calories), MIN_TARGET_CALORIES)
+    return np.array([target_calories,
+                     target_calories * protein_ratio / 4,
+                     target_calories * carb_ratio / 4,
+                     target_calories * fat_ratio / 9])
+
+
+def nutrient_matrix(nutrients, rows):
+    """Return the (foods, 4) matrix of calories, protein, carbs and fat per serving."""
+    return np.stack([nutrients.calories[rows], nutrients.protein[rows],
+                     nutrients.carbs[rows], nutrients.fat[rows]], axis=-1)
+
+
+def solve_servings(A, targets, upper, iterations=150, ridge=1e-3):
+    """Bounded least squares: minimize ||x @ A - targets||^2 + ridge * ||x||^2 with 0 <= x <= upper.
+
+    A is (foods, 4); targets (..., 4) and upper (..., foods) may carry any
+    number of leading batch dimensions, which are solved together with
+    accelerated projected gradient steps. Rows of A and targets should be
+    scaled so the four errors are comparable.
+    """
+    upper = np.asarray(upper, dtype=np.float64)
+    gram = A @ A.T + ridge * np.eye(A.shape[0])
+    step = 1.0 / np.linalg.eigvalsh(gram)[-1]
+    gram_step = gram * step
+    linear_step = (targets @ A.T) * step
+
+    x = np.zeros(upper.shape)
+    y = x
+    momentum = 1.0
+    for _ in range(iterations):
+        # Gradient step followed by projection onto the bounds
+        x_next = y - y @ gram_step + linear_step
+        np.maximum(x_next, 0.0, out=x_next)
+        np.minimum(x_next, upper, out=x_next)
+        momentum_next = (1 + np.sqrt(1 + 4 * momentum ** 2)) / 2
+        y = x_next + ((momentum - 1) / momentum_next) * (x_next - x)
+        x, momentum = x_next, momentum_next
+    return x
+
+
+def round_servings(A, targets, servings, upper, max_moves=20):
+    """Snap servings to SERVING_STEP and greedily nudge them to recover the targets.
+
+    Every +/- one-step move of every food is scored at once and the best one
+    is applied until no move reduces the error. Foods may be dropped, but foods
+    the solution left at zero are never added.
+    Like solve_servings, leading batch dimensions are rounded together.
+    """
+    servings = np.round(servings / SERVING_STEP) * SERVING_STEP
+    upper = np.broadcast_to(upper, servings.shape)
+    active = servings > 0
+    step_norms = SERVING_STEP ** 2 * np.sum(A ** 2, axis=1)
+    for _ in range(max_moves):
+        # Change in squared error of moving each food one step up or down: +/-2 step r.a + step^2 |a|^2
+        slope = 2 * SERVING_STEP * ((servings @ A - targets) @ A.T)
+        up = np.where(active & (servings + SERVING_STEP <= upper), slope + step_norms, np.inf)
+        down = np.where(servings >= SERVING_STEP, step_norms - slope, np.inf)
+        change = np.concatenate([up, down], axis=-1)
+        best = np.argmin(change, axis=-1)
+        improved = np.take_along_axis(change, best[..., None], axis=-1)[..., 0] < 0
+        if not improved.any():
+            break
+        food = best % servings.shape[-1]
+        direction = np.where(best < servings.shape[-1], SERVING_STEP, -SERVING_STEP) * improved
+        servings = servings.copy()
+        np.put_along_axis(servings, food[..., None], np.take_along_axis(servings, food[..., None], axis=-1)
+                          + direction[..., None], axis=-1)
+    return servings
+
+
+def serving_limits(nutrients, rows):
+    """Return the most servings allowed per food: MAX_SERVINGS, capped at MAX_FOOD_CALORIES."""
+    limit = np.floor(MAX_FOOD_CALORIES / np.maximum(nutrients.calories[rows], 1) / SERVING_STEP) * SERVING_STEP
+    return np.minimum(limit, MAX_SERVINGS)
+
+
+@functools.lru_cache(maxsize=8)
+def plannable_rows(nutrients):
+    """Return a mask of the foods a plan may contain."""
+    usable = nutrients.calories >= MIN_FOOD_CALORIES
+    # Foods whose smallest step already exceeds the per-food calorie cap can't be portioned
+    usable &= serving_limits(nutrients, np.arange(len(nutrients))) >= SERVING_STEP
+    # Names starting with a lowercase letter or '(' continue the previous row of the source table
+    usable &= np.array([name[:1].isupper() for name in nutrients.food])
+    usable.flags.writeable = False
+    return usable
+
+
+def macro_fit(nutrients, targets):
+    """Score every food on how close its protein/carb/fat split is to the targets (higher is better).
+
+    Foods a plan may not contain score -inf.
+    """
+    calories = nutrients.calories
+    with np.errstate(divide='ignore', invalid='ignore'):
+        split = np.stack([nutrients.protein * 4, nutrients.carbs * 4, nutrients.fat * 9], axis=1) / calories[:, None]
+        target_split = targets[1:] * np.array([4, 4, 9]) / targets[0]
+        fit = -np.abs(split - target_split).sum(axis=1) + nutrients.density['fiber'] * 10
+    return np.where(plannable_rows(nutrients), np.nan_to_num(fit, nan=-np.inf), -np.inf)
+
+
+def candidate_pool(nutrients, targets, excluded=(), per_limit=CANDIDATES_PER_LIMIT, prefer=''):
+    """Pick candidate rows per category group, ranked by how well their macros fit the targets.
+
+    With `prefer` set to a nutrient such as 'protein' or 'fiber', the foods
+    with the most of it per calorie in every category join the pool too.
+    """
+    fit = macro_fit(nutrients, targets)
+    if len(excluded):
+        fit[list(excluded)] = -np.inf
+
+    pool = []
+    for category, rows in nutrients.category_index.items():
+        limit = CATEGORY_LIMITS.get(category_group(category), 1)
+        if limit == 0:
+            continue
+        ranked = rows[np.argsort(-fit[rows], kind='stable')]
+        ranked = ranked[np.isfinite(fit[ranked])]
+        pool.extend(ranked[:limit * per_limit].tolist())
+        if prefer:
+            dense = nutrients.top_foods(prefer, limit * per_limit, category)
+            pool.extend(dense[np.isfinite(fit[dense])][:limit].tolist())
+    return np.array(sorted(set(pool)), dtype=np.int64)
+
+
+def enforce_limits(nutrients, pool, servings, blocked=None, fit=None):
+    """Zero out foods beyond the category limits and MAX_FOODS, keeping the largest calorie contributors.
+
+    Foods marked in `blocked` are swapped for the best-fitting available food
+    of the same category group, ranked by `fit`.
+    """
+    contribution = servings * nutrients.calories[pool]
+    keep = np.zeros(len(pool), dtype=bool)
+    groups = np.array([category_group(nutrients.categories[code]) for code in nutrients.category_codes[pool]])
+    taken = {}
+    for i in np.argsort(-contribution, kind='stable'):
+        if contribution[i] <= 0 or keep.sum() >= MAX_FOODS:
+            break
+        if keep[i]:
+            continue  # Already kept as the replacement of a blocked food
+        if blocked is not None and blocked[i]:
+            options = np.flatnonzero((groups == groups[i]) & ~blocked & ~keep & np.isfinite(fit))
+            if len(options) == 0:
+                continue
+            i = options[np.argmax(fit[options])]
+        if taken.get(groups[i], 0) < CATEGORY_LIMITS.get(groups[i], 1):
+            keep[i] = True
+            taken[groups[i]] = taken.get(groups[i], 0) + 1
+    return keep
+
+
+def optimize_meal_plan(nutrients, target_calories, protein_ratio, carb_ratio, fat_ratio, excluded=(), prefer=''):
+    """Choose foods and servings from the nutrient table that hit calorie and macro targets.
+
+    Solves a bounded least-squares problem over a candidate pool, keeps the
+    foods allowed by the category limits, re-solves on them and rounds the
+    servings. `prefer` is passed on to candidate_pool. Returns (rows,
+    servings) for the chosen foods.
+    """
+    targets = macro_targets(target_calories, protein_ratio, carb_ratio, fat_ratio)
+    pool = candidate_pool(nutrients, targets, excluded, prefer=prefer)
+    scale = TARGET_WEIGHTS / targets
+    A = nutrient_matrix(nutrients, pool) * scale
+    scaled_targets = targets * scale
+
+    upper = serving_limits(nutrients, pool)
+    servings = solve_servings(A, scaled_targets, upper)
+    keep = enforce_limits(nutrients, pool, servings)
+    servings = solve_servings(A, scaled_targets, np.where(keep, upper, 0.0))
+    servings = round_servings(A, scaled_targets, servings, upper)
+
+    chosen = servings > 0
+    return pool[chosen], servings[chosen]
+
+
+def optimize_weekly_meal_plan(nutrients, day_calories, protein_ratio, carb_ratio, fat_ratio, prefer=''):
+    """Plan the menus of several days at once, one calorie target per day.
+
+    All days share one candidate pool and are solved together as a batch.
+    Foods are then chosen day by day so that none is planned on consecutive
+    days or on more than MAX_FOOD_DAYS days, and the servings of every day
+    are re-solved and rounded in a second batch. Returns a list of
+    (rows, servings), one per day.
+    """
+    targets = np.array([macro_targets(calories, protein_ratio, carb_ratio, fat_ratio) for calories in day_calories])
+    # The macro split is the same every day, so one pool fits the whole week
+    pool = candidate_pool(nutrients, targets[0], per_limit=WEEKLY_CANDIDATES_PER_LIMIT, prefer=prefer)
+    fit = macro_fit(nutrients, targets[0])[pool]
+    # Targets of different days only differ by a factor, so one scale keeps the errors comparable for all
+    scale = TARGET_WEIGHTS / targets.mean(axis=0)
+    A = nutrient_matrix(nutrients, pool) * scale
+    scaled_targets = targets * scale
+
+    upper = serving_limits(nutrients, pool)
+    servings = solve_servings(A, scaled_targets, upper)
+
+    keep = np.zeros(servings.shape, dtype=bool)
+    days_used = np.zeros(len(pool), dtype=int)
+    for day in range(len(targets)):
+        blocked = days_used >= MAX_FOOD_DAYS
+        if day > 0:
+            blocked |= keep[day - 1]
+        keep[day] = enforce_limits(nutrients, pool, servings[day], blocked, fit)
+        days_used += keep[day]
+
+    # Re-solve on the foods kept on at least one day
+    kept = keep.any(axis=0)
+    pool, A, upper, keep = pool[kept], A[kept], upper[kept], keep[:, kept]
+    servings = solve_servings(A, scaled_targets, np.where(keep, upper, 0.0))
+    servings = round_servings(A, scaled_targets, servings, np.where(keep, upper, 0.0))
+    return [(pool[day_servings > 0], day_servings[day_servings > 0]) for day_servings in servings]
+
+
+def plan_totals(nutrients, rows, servings):
+    """Return the [calories, protein, carbs, fat] totals of a plan."""
+    return servings @ nutrient_matrix(nutrients, rows)
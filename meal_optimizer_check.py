@@ -0,0 +1,50 @@
+"""Check that enforce_limits counts the replacement of a blocked food once.
+
+Builds a pool of three foods of one category group allowed twice a day,
+blocks the largest calorie contributor and fits the second largest best, so
+it replaces the blocked food before the loop reaches it. The replacement and
+the remaining food should both be kept, for every such group in the nutrient
+table.
+
+Usage: python meal_optimizer_check.py
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+import meal_optimizer
+import nutrient_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+
+    nutrients = nutrient_table.load_nutrient_table()
+    usable = meal_optimizer.plannable_rows(nutrients)
+    groups = np.array([meal_optimizer.category_group(category) for category in nutrients.categories])
+    failures = 0
+    for group, limit in meal_optimizer.CATEGORY_LIMITS.items():
+        if limit != 2:
+            continue
+        pool = np.flatnonzero(usable & (groups[nutrients.category_codes] == group))[:3]
+        # Largest contributor first, the replacement second
+        servings = np.array([3.0, 2.0, 1.0]) * 100 / nutrients.calories[pool]
+        blocked = np.array([True, False, False])
+        fit = np.array([0.0, 2.0, 1.0])
+        keep = meal_optimizer.enforce_limits(nutrients, pool, servings, blocked, fit)
+        expected = [False, True, True]
+        failures += keep.tolist() != expected
+        print(f"{group:>34}: kept {keep.tolist()}, expected {expected}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
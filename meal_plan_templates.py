@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+import meal_optimizer
+import nutrient_table
+from fingerprints import file_fingerprint
+
+MEAL_TEMPLATES_FILE = 'models/meal_plan_templates.npz'
+
+# Target calorie bands the templates are solved for
+CALORIE_RANGE = (meal_optimizer.MIN_TARGET_CALORIES, 3200)
+BAND_WIDTH = 25
+
+# Extra relative miss of any calorie or macro target a served template may have over the live solve of its
+# band; beyond it the lookup misses and the plan is solved live
+TEMPLATE_TOLERANCE = 0.05
+
+
+class MealPlanTemplates:
+    """Optimized meal plans precomputed per macro split and target calorie band.
+
+    A split is a (protein ratio, carb ratio, fat ratio, preferred nutrient)
+    tuple, the preferred nutrient being '' or one passed to
+    meal_optimizer.candidate_pool.
+
+    Plans are stored as nutrient table rows (-1 padded) and servings in
+    SERVING_STEP units. Lookups take the two bands around the target, nudge
+    one serving of each to close the remaining calorie gap and serve the one
+    closer to the targets.
+
+    The optimizer itself can miss a macro target by 20% or more on some
+    splits (low-calorie Muscle Building plans, for one), so a served plan is
+    held to the error its band's live solve reached, plus TEMPLATE_TOLERANCE.
+    """
+
+    def __init__(self, fingerprint, ratios, prefer, band_calories, rows, steps, errors):
+        self.fingerprint = fingerprint
+        self.ratios = ratios                # (splits, 3) protein, carb and fat ratios
+        self.prefer = prefer                # (splits,) preferred nutrient
+        self.band_calories = band_calories  # (bands,)
+        self.rows = rows                    # (splits, bands, MAX_FOODS), int16
+        self.steps = steps                  # (splits, bands, MAX_FOODS), uint8
+        self.errors = errors                # (splits, bands), plan_error() of each template at its band
+
+    @classmethod
+    def build(cls, nutrients, fingerprint, splits, band_width=BAND_WIDTH, calorie_range=CALORIE_RANGE):
+        """Solve a plan for every macro split and calorie band."""
+        splits = list(dict.fromkeys(_split_key(split) for split in splits))
+        ratios = np.array([split[:3] for split in splits], dtype=np.float64).reshape(-1, 3)
+        prefer = np.array([split[3] for split in splits], dtype=str)
+        band_calories = np.arange(calorie_range[0], calorie_range[1] + band_width / 2, band_width, dtype=np.float64)
+        shape = (len(ratios), len(band_calories), meal_optimizer.MAX_FOODS)
+        rows = np.full(shape, -1, dtype=np.int16)
+        steps = np.zeros(shape, dtype=np.uint8)
+        errors = np.zeros(shape[:2], dtype=np.float32)
+        for i, (protein_ratio, carb_ratio, fat_ratio, nutrient) in enumerate(splits):
+            for j, calories in enumerate(band_calories):
+                plan_rows, servings = meal_optimizer.optimize_meal_plan(nutrients, calories, protein_ratio, carb_ratio,
+                                                                        fat_ratio, prefer=nutrient)
+                rows[i, j, :len(plan_rows)] = plan_rows
+                steps[i, j, :len(plan_rows)] = np.round(servings / meal_optimizer.SERVING_STEP)
+                targets = meal_optimizer.macro_targets(calories, protein_ratio, carb_ratio, fat_ratio)
+                errors[i, j] = plan_error(nutrients, plan_rows, servings, targets)
+        return cls(fingerprint, ratios, prefer, band_calories, rows, steps, errors)
+
+    def find_split(self, protein_ratio, carb_ratio, fat_ratio, prefer=''):
+        """Return the index of a split, or None if there are no templates for it."""
+        split = np.flatnonzero(np.all(np.isclose(self.ratios, [protein_ratio, carb_ratio, fat_ratio]), axis=1)
+                               & (self.prefer == prefer))
+        return int(split[0]) if len(split) else None
+
+    def lookup(self, nutrients, target_calories, protein_ratio, carb_ratio, fat_ratio, prefer=''):
+        """Return the (rows, servings) of the best template for the targets, or None if there is none.
+
+        Templates that miss the targets by more than TEMPLATE_TOLERANCE over
+        their band's own error are not served.
+        """
+        split = self.find_split(protein_ratio, carb_ratio, fat_ratio, prefer)
+        if split is None:
+            return None
+        target_calories = max(float(target_calories), meal_optimizer.MIN_TARGET_CALORIES)
+        targets = meal_optimizer.macro_targets(target_calories, protein_ratio, carb_ratio, fat_ratio)
+        position = (target_calories - self.band_calories[0]) / self.band_width if self.band_width else 0
+
+        best, best_error = None, np.inf
+        for band in {int(np.floor(position)), int(np.ceil(position))}:
+            if not 0 <= band < len(self.band_calories):
+                continue
+            rows = self.rows[split, band]
+            steps = self.steps[split, band]
+            rows, servings = rows[rows >= 0].astype(np.int64), steps[rows >= 0] * meal_optimizer.SERVING_STEP
+            servings = adjust_servings(nutrients, rows, servings, target_calories)
+            error = plan_error(nutrients, rows, servings, targets)
+            if error <= self.errors[split, band] + TEMPLATE_TOLERANCE and error < best_error:
+                best, best_error = (rows, servings), error
+        return best
+
+    @property
+    def band_width(self):
+        return self.band_calories[1] - self.band_calories[0] if len(self.band_calories) > 1 else 0
+
+    def save(self, path=MEAL_TEMPLATES_FILE):
+        """Save the templates to a compressed .npz file."""
+        np.savez_compressed(path, fingerprint=np.array(self.fingerprint), ratios=self.ratios, prefer=self.prefer,
+                            band_calories=self.band_calories, rows=self.rows, steps=self.steps, errors=self.errors)
+
+    @classmethod
+    def load(cls, path=MEAL_TEMPLATES_FILE):
+        """Load templates previously written with save()."""
+        with np.load(path, allow_pickle=False) as archive:
+            return cls(str(archive['fingerprint']), archive['ratios'], archive['prefer'], archive['band_calories'],
+                       archive['rows'], archive['steps'], archive['errors'])
+
+
+def templates_fingerprint(nutrient_file):
+    """Hash a nutrient file together with the optimizer and band settings the templates are solved with.
+
+    Templates are only served for the fingerprint they were built with, so
+    changing a meal_optimizer constant (CATEGORY_LIMITS, MIN_TARGET_CALORIES...)
+    rebuilds them like a new nutrient table does.
+    """
+    settings = {name: value.tolist() if isinstance(value, np.ndarray) else value
+                for name, value in vars(meal_optimizer).items() if name.isupper()}
+    settings.update(CALORIE_RANGE=CALORIE_RANGE, BAND_WIDTH=BAND_WIDTH)
+    digest = hashlib.sha1(file_fingerprint(nutrient_file).encode('utf-8'))
+    digest.update(json.dumps(settings, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _split_key(split):
+    protein_ratio, carb_ratio, fat_ratio, prefer = split
+    return round(float(protein_ratio), 4), round(float(carb_ratio), 4), round(float(fat_ratio), 4), prefer
+
+
+def plan_error(nutrients, rows, servings, targets):
+    """Return the largest relative miss of a plan's calories, protein, carbs and fat against their targets."""
+    totals = servings @ meal_optimizer.nutrient_matrix(nutrients, rows)
+    return float(np.max(np.abs(totals - targets) / targets))
+
+
+def adjust_servings(nutrients, rows, servings, target_calories):
+    """Move one food by one serving step if that brings the plan's calories closer to the target."""
+    calories = nutrients.calories[rows]
+    gap = target_calories - servings @ calories
+    step_calories = np.concatenate([calories, -calories]) * meal_optimizer.SERVING_STEP
+    moved = np.concatenate([servings, servings]) + np.sign(step_calories) * meal_optimizer.SERVING_STEP
+    upper = np.tile(meal_optimizer.serving_limits(nutrients, rows), 2)
+    remaining = np.where((moved >= meal_optimizer.SERVING_STEP) & (moved <= upper),
+                         np.abs(gap - step_calories), np.inf)
+    best = int(np.argmin(remaining))
+    if remaining[best] >= abs(gap):
+        return servings
+    servings = servings.copy()
+    servings[best % len(rows)] = moved[best]
+    return servings
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _file_state(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_templates(splits, nutrient_file=nutrient_table.NUTRIENT_FILE, path=MEAL_TEMPLATES_FILE, save=True):
+    """Return the meal plan templates for a nutrient file, building them if missing or stale.
+
+    Built templates are saved unless `save` is False. Templates are cached
+    per process until either file changes.
+    """
+    key = (os.path.abspath(path), os.path.abspath(nutrient_file))
+    state = tuple(_file_state(name) for name in key)
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == state:
+        return cached[1]
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != state:
+            templates = _load_or_build(splits, nutrient_file, path, save)
+            # Building rewrites the templates file, so look at both files again
+            cached = (tuple(_file_state(name) for name in key), templates)
+            _cache[key] = cached
+    return cached[1]
+
+
+def _load_or_build(splits, nutrient_file, path, save):
+    fingerprint = templates_fingerprint(nutrient_file)
+    if os.path.exists(path):
+        try:
+            templates = MealPlanTemplates.load(path)
+            covered = all(templates.find_split(*_split_key(split)) is not None for split in splits)
+            if templates.fingerprint == fingerprint and covered:
+                return templates
+        except Exception:
+            print("Could not load meal plan templates, rebuilding...")
+
+    nutrients = nutrient_table.load_nutrient_table(nutrient_file)
+    templates = MealPlanTemplates.build(nutrients, fingerprint, splits)
+    if save:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        templates.save(path)
+    return templates
+
+
+def main():
+    """Precompute the meal plan templates for every goal."""
+    import gym_ml_model_new
+
+    print("Building meal plan templates...")
+    splits = gym_ml_model_new.meal_splits()
+    nutrients = nutrient_table.load_nutrient_table()
+    templates = MealPlanTemplates.build(nutrients, templates_fingerprint(nutrient_table.NUTRIENT_FILE), splits)
+    os.makedirs(os.path.dirname(MEAL_TEMPLATES_FILE), exist_ok=True)
+    templates.save()
+    print(f"{templates.rows.shape[0]} macro splits x {templates.rows.shape[1]} calorie bands "
+          f"saved to {MEAL_TEMPLATES_FILE}")
+
+
+if __name__ == "__main__":
+    main()
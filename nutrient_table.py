@@ -0,0 +1,152 @@
+import os
+import re
+import threading
+import numpy as np
+import pandas as pd
+
+NUTRIENT_FILE = 'nutrients_csvfile.csv'
+
+# Numeric columns of the nutrient CSV and the attribute names they are stored under
+NUMERIC_COLUMNS = {
+    'Grams': 'grams',
+    'Calories': 'calories',
+    'Protein': 'protein',
+    'Fat': 'fat',
+    'Sat.Fat': 'sat_fat',
+    'Fiber': 'fiber',
+    'Carbs': 'carbs',
+}
+
+# Nutrients ranked by grams per calorie
+DENSITY_NUTRIENTS = ('protein', 'fiber', 'carbs', 'fat')
+DENSITY_MIN_CALORIES = 20  # Ratios of near-zero calorie foods (coffee, bouillon...) are meaningless
+
+_NUMBER = re.compile(r"^-?\d+(\.\d+)?$")
+_TRACE = re.compile(r"^t'?$")  # 't' marks a trace amount
+
+
+def parse_nutrient_value(value):
+    """Parse one cell of a numeric nutrient column.
+
+    Trace markers count as 0 and thousands separators are dropped; anything
+    else that is not a number (e.g. spreadsheet-mangled dates) becomes NaN.
+    """
+    if pd.isna(value):
+        return np.nan
+    text = str(value).strip().replace(',', '')
+    if _TRACE.match(text):
+        return 0.0
+    if _NUMBER.match(text):
+        return float(text)
+    return np.nan
+
+
+class NutrientTable:
+    """Cleaned, column-oriented view of the nutrient CSV.
+
+    Every numeric column is a read-only float64 array (calories, protein, fat,
+    sat_fat, fiber, carbs, grams) aligned with the `food`, `measure` and
+    `category_codes` arrays. `category_index` maps each category to the rows
+    in it.
+
+    Nutrient densities (grams per calorie) are ranked once per category at
+    load time, so top_foods() only slices a presorted array.
+    """
+
+    def __init__(self, df):
+        numeric = {attribute: df[column].map(parse_nutrient_value).to_numpy(dtype=np.float64)
+                   for column, attribute in NUMERIC_COLUMNS.items()}
+
+        # Foods without a usable calorie count can't be planned with
+        keep = ~np.isnan(numeric['calories'])
+        df = df[keep]
+
+        self.food = np.array([str(name).strip() for name in df['Food']], dtype=object)
+        self.measure = np.array([str(measure).strip() for measure in df['Measure']], dtype=object)
+        for attribute, values in numeric.items():
+            values = np.nan_to_num(values[keep])
+            values.flags.writeable = False
+            setattr(self, attribute, values)
+
+        categories = [' '.join(str(category).split()) for category in df['Category']]
+        self.categories = tuple(dict.fromkeys(categories))
+        codes = {category: i for i, category in enumerate(self.categories)}
+        self.category_codes = np.array([codes[category] for category in categories], dtype=np.int16)
+        self.category_index = {category: np.flatnonzero(self.category_codes == i)
+                               for i, category in enumerate(self.categories)}
+
+        # Rows sorted by decreasing density, per nutrient and per category (None for all foods)
+        self.density = {}
+        self.density_rankings = {}
+        ranked = np.flatnonzero(self.calories >= DENSITY_MIN_CALORIES)
+        for nutrient in DENSITY_NUTRIENTS:
+            density = np.zeros(len(self.food))
+            density[ranked] = getattr(self, nutrient)[ranked] / self.calories[ranked]
+            density.flags.writeable = False
+            self.density[nutrient] = density
+            order = ranked[np.argsort(-density[ranked], kind='stable')]
+            rankings = {None: order}
+            codes = self.category_codes[order]
+            for i, category in enumerate(self.categories):
+                rankings[category] = order[codes == i]
+            self.density_rankings[nutrient] = rankings
+
+        # Several rows share a food name; tell them apart by their measure
+        counts = pd.Series(self.food).value_counts()
+        self.display_name = np.array([f"{food} ({measure})" if counts[food] > 1 else food
+                                      for food, measure in zip(self.food, self.measure)], dtype=object)
+        self._rows_by_name = {}
+        for row, name in enumerate(self.food):
+            self._rows_by_name.setdefault(name.lower(), row)
+
+    def __len__(self):
+        return len(self.food)
+
+    def top_foods(self, nutrient, k=10, category=None):
+        """Return the rows of the k foods with the most grams of a nutrient per calorie, optionally in one category."""
+        return self.density_rankings[nutrient].get(category, np.zeros(0, dtype=np.int64))[:k]
+
+    def find(self, food):
+        """Return the row of the first food with this name (case-insensitive), or None."""
+        return self._rows_by_name.get(food.strip().lower())
+
+    def nutrients(self, row, servings=1):
+        """Return a meal plan entry for `servings` measures of the food in a row."""
+        return {
+            'Calories': float(self.calories[row]),
+            'Protein': float(self.protein[row]),
+            'Carbs': float(self.carbs[row]),
+            'Fat': float(self.fat[row]),
+            'Fiber': float(self.fiber[row]),
+            'Measure': self.measure[row],
+            'Servings': servings,
+        }
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_nutrient_table(path=NUTRIENT_FILE):
+    """Return the cleaned nutrient table for a CSV file.
+
+    Tables are cached per process and reused until the file's modification
+    time or size changes.
+    """
+    key = os.path.abspath(path)
+    fingerprint = _fingerprint(key)
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != fingerprint:
+            cached = (fingerprint, NutrientTable(pd.read_csv(key)))
+            _cache[key] = cached
+    return cached[1]
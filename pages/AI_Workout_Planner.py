@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
-from gym_chatbot_new import GymChatbot
-import gym_ml_model_new  # Add this import
+import plan_store
+import planning_pipeline
+import session_store
 
 # Page configuration
 st.set_page_config(
@@ -162,9 +163,6 @@ with col1:
         </a>
     """, unsafe_allow_html=True)
 
-# Initialize chatbot
-chatbot = GymChatbot()
-
 # Update title with gradient
 st.markdown("""
     <div style="
@@ -204,18 +202,6 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-# Collect user inputs
-age = st.number_input("What is your age?", min_value=18, max_value=100, value=25)
-gender = st.selectbox("What is your gender?", ["Male", "Female"])
-weight = st.number_input("What is your weight (in lbs)?", min_value=75, max_value=330)
-height_feet = st.number_input("What is your height (feet)?", min_value=4, max_value=7)
-height_inches = st.number_input("Inches:", min_value=0, max_value=11)
-
-# Calculate BMI
-weight_kg = weight / 2.20462
-height_m = ((height_feet * 12) + height_inches) * 0.0254
-bmi = weight_kg / (height_m ** 2)
-
 # Calculate heart rates based on user characteristics
 def calculate_heart_rates(age, gender, bmi):
     # Calculate maximum heart rate using the Tanaka formula (more accurate than 220-age)
@@ -244,26 +230,67 @@ def calculate_heart_rates(age, gender, bmi):
     
     return int(max_bpm), avg_bpm, int(resting_bpm)
 
-# Calculate heart rates
-max_bpm, avg_bpm, resting_bpm = calculate_heart_rates(age, gender, bmi)
+# Run the models on a profile and build its workout and meal plan.
+# The pipeline memoizes every stage, so changing a few inputs only recomputes the stages that read them.
+def build_results(user_info):
+    return planning_pipeline.shared_pipeline().run(user_info)
+
+def show_results(results):
+    # Keep the results in the server-side store; the session only holds their key
+    st.session_state.results_key = session_store.get_store().put(results)
+
+    # Redirect to results page
+    st.switch_page("pages/AI_Workout_Planner_Results.py")
+
+# Collect user inputs in a form, so editing them doesn't rerun the page until submitted
+with st.form("planner_inputs", border=False):
+    age = st.number_input("What is your age?", min_value=18, max_value=100, value=25)
+    gender = st.selectbox("What is your gender?", ["Male", "Female"])
+    weight = st.number_input("What is your weight (in lbs)?", min_value=75, max_value=330)
+    height_feet = st.number_input("What is your height (feet)?", min_value=4, max_value=7)
+    height_inches = st.number_input("Inches:", min_value=0, max_value=11)
+
+    # Workout session details
+    session_duration = st.number_input("Typical workout session duration (hours):", min_value=0.25, max_value=3.0, value=1.0)
+    workout_freq = st.slider("How many days per week do you work out?", min_value=1, max_value=7)
+
+    # Body fat percentage; the default depends on gender, which is only known on submit
+    fat_percentage = st.number_input("What is your body fat percentage?", min_value=5, max_value=50, value=None,
+                                     placeholder="Leave empty for a typical value (15% men, 25% women)")
 
-# Workout session details
-session_duration = st.number_input("Typical workout session duration (hours):", min_value=0.25, max_value=3.0, value=1.0)
-workout_freq = st.slider("How many days per week do you work out?", min_value=1, max_value=7)
+    # Water intake
+    cups = st.number_input("How many cups of water do you drink per day? (1 cup = 8 oz)", min_value=2, max_value=20)
 
-# Body fat percentage
-default_fat = 15 if gender == 'Male' else 25
-fat_percentage = st.number_input("What is your body fat percentage?", min_value=5, max_value=50, value=default_fat)
+    # Fitness goals
+    goals = st.selectbox("What is your fitness goal?", ["Weight Loss", "Muscle Building", "Cardiovascular Health", "Flexibility", "General Fitness"])
 
-# Water intake
-cups = st.number_input("How many cups of water do you drink per day? (1 cup = 8 oz)", min_value=2, max_value=20)
-water_intake_liters = cups * 0.236588
+    # Member ID and passphrase to save the plan under
+    member_id = st.text_input("Member ID (optional, to find your plan again later):")
+    passphrase = st.text_input("Passphrase (needed with a member ID, to keep your plan private):", type="password")
 
-# Fitness goals
-goals = st.selectbox("What is your fitness goal?", ["Weight Loss", "Muscle Building", "Cardiovascular Health", "Flexibility", "General Fitness"])
+    submitted = st.form_submit_button("**Get AI Calculated Workout and Meal Plan!**")
 
 # Step 2: Process the inputs
-if st.button("**Get AI Calculated Workout and Meal Plan!**"):
+MEMBER_ID_TAKEN = "This member ID is already in use with a different passphrase."
+member_id = member_id.strip()
+saved_plans = plan_store.get_store()
+if submitted and member_id and not passphrase:
+    st.warning("Please choose a passphrase to save your plan under your member ID.")
+elif submitted and member_id and not saved_plans.check_member(member_id, passphrase):
+    st.error(MEMBER_ID_TAKEN)
+elif submitted:
+    # Calculate BMI
+    weight_kg = weight / 2.20462
+    height_m = ((height_feet * 12) + height_inches) * 0.0254
+    bmi = weight_kg / (height_m ** 2)
+
+    # Calculate heart rates
+    max_bpm, avg_bpm, resting_bpm = calculate_heart_rates(age, gender, bmi)
+
+    if fat_percentage is None:
+        fat_percentage = 15 if gender == 'Male' else 25
+    water_intake_liters = cups * 0.236588
+
     # Prepare user information for chatbot
     user_info = {
         'Age': age,
@@ -281,30 +308,31 @@ if st.button("**Get AI Calculated Workout and Meal Plan!**"):
         'Goal': goals,
     }
 
-    # Call chatbot methods to generate predictions
-    user_calories, user_workout, user_experience = chatbot.prepare_prediction_data(user_info)
-    predicted_calories = chatbot.calories_model.predict(user_calories)[0]
-    predicted_workout = chatbot.workout_model.predict(user_workout)[0]
-    predicted_experience = chatbot.experience_model.predict(user_experience)[0]
+    # Reuse the saved plan of an identical profile unless the models changed since
+    results = saved_plans.find(user_info, member_id)
+    if results is None:
+        results = build_results(user_info)
+        try:
+            saved_plans.save(user_info, results, member_id, passphrase)
+        except PermissionError:
+            # Another session claimed the member ID since the check above
+            st.error(MEMBER_ID_TAKEN)
+            st.stop()
 
-    # Get workout recommendations
-    recommendations = chatbot.get_exercise_recommendations(user_info, predicted_workout, predicted_experience)
+    show_results(results)
 
-    # Generate and display workout plan
-    plan = chatbot.get_workout_plan(user_info, predicted_workout, predicted_calories, predicted_experience, recommendations)
+# Returning members can load their saved plan with their member ID and passphrase
+with st.form("saved_plan", border=False):
+    saved_member_id = st.text_input("Returning member? Enter your member ID to load your saved plan:")
+    saved_passphrase = st.text_input("Passphrase:", type="password", key="saved_passphrase")
+    load_saved = st.form_submit_button("**Load My Saved Plan**")
 
-    # Generate meal recommendations
-    nutrient_file = "nutrients_csvfile.csv"
-    meal_plan = gym_ml_model_new.generate_meal_recommendations(predicted_calories, nutrient_file, goals)
-
-    # Store results in session state
-    st.session_state.workout_results = {
-        'predicted_calories': predicted_calories,
-        'predicted_workout': predicted_workout,
-        'predicted_experience': predicted_experience,
-        'plan': plan,
-        'meal_plan': meal_plan
-    }
-
-    # Redirect to results page
-    st.switch_page("pages/AI_Workout_Planner_Results.py")
+if load_saved and saved_member_id.strip():
+    saved = plan_store.get_store().latest(saved_member_id.strip(), saved_passphrase)
+    if saved is None:
+        st.warning("No saved plan was found for this member ID and passphrase. Please fill in your details above.")
+    elif saved.model_version == plan_store.model_version():
+        show_results(saved.results)
+    else:
+        # The models changed since the plan was saved: regenerate it from the saved inputs
+        show_results(build_results(saved.user_info))
@@ -1,112 +1,11 @@
 import streamlit as st
 import pandas as pd
-from fpdf import FPDF
 from datetime import datetime
-import io
-
-def generate_pdf(plan, meal_plan):
-    # Create PDF object
-    pdf = FPDF()
-    pdf.add_page()
-    
-    # Set font
-    pdf.set_font("Arial", "B", 16)
-    
-    # Add title
-    pdf.cell(0, 10, "Your Personalized Workout & Nutrition Plan", ln=True, align='C')
-    
-    # Add date
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(0, 10, f"Generated on: {datetime.now().strftime('%B %d, %Y')}", ln=True, align='C')
-    
-    # Add workout plan section
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "Your Personalized Workout Plan", ln=True)
-    pdf.set_font("Arial", "", 12)
-    
-    # Add workout details
-    pdf.cell(0, 10, f"Workout Type: {plan['workout_type']}", ln=True)
-    pdf.cell(0, 10, f"Experience Level: {plan['experience_level']}", ln=True)
-    pdf.cell(0, 10, f"Sessions per Week: {plan['sessions_per_week']}", ln=True)
-    pdf.cell(0, 10, f"Calories per Session: {plan['calories_per_session']}", ln=True)
-    pdf.cell(0, 10, f"Session Duration: {plan['session_duration']}", ln=True)
-    pdf.cell(0, 10, f"Hydration Recommendation: {plan['hydration']}", ln=True)
-    
-    # Add weekly schedule
-    pdf.ln(5)
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "Weekly Schedule", ln=True)
-    pdf.set_font("Arial", "", 12)
-    
-    for day, details in plan['daily_exercises'].items():
-        pdf.cell(0, 10, f"{day}: {details['focus']}", ln=True)
-        for exercise in details['exercises']:
-            pdf.cell(10, 10, "-", ln=False)
-            pdf.cell(0, 10, exercise, ln=True)
-    
-    # Add nutrition plan section
-    pdf.ln(5)
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "Recommended Daily Nutrition Plan", ln=True)
-    pdf.set_font("Arial", "", 12)
-    
-    # Calculate and add total nutrients
-    total_calories = sum(details['Calories'] * details['Servings'] for details in meal_plan.values())
-    total_protein = sum(details['Protein'] * details['Servings'] for details in meal_plan.values())
-    total_carbs = sum(details['Carbs'] * details['Servings'] for details in meal_plan.values())
-    total_fiber = sum(details['Fiber'] * details['Servings'] for details in meal_plan.values())
-    
-    pdf.cell(0, 10, "Total Daily Nutrition:", ln=True)
-    pdf.cell(0, 10, f"- Total Calories: {total_calories:.1f}", ln=True)
-    pdf.cell(0, 10, f"- Total Protein: {total_protein:.1f}g", ln=True)
-    pdf.cell(0, 10, f"- Total Carbs: {total_carbs:.1f}g", ln=True)
-    pdf.cell(0, 10, f"- Total Fiber: {total_fiber:.1f}g", ln=True)
-    
-    # Add food items
-    pdf.ln(5)
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "Recommended Foods", ln=True)
-    pdf.set_font("Arial", "", 12)
-    
-    for food, details in meal_plan.items():
-        total_calories = details['Calories'] * details['Servings']
-        total_protein = details['Protein'] * details['Servings']
-        total_carbs = details['Carbs'] * details['Servings']
-        total_fiber = details['Fiber'] * details['Servings']
-        
-        pdf.cell(0, 10, f"{food} (x{details['Servings']})", ln=True)
-        pdf.cell(10, 10, "-", ln=False)
-        pdf.cell(0, 10, f"Calories: {total_calories:.1f}", ln=True)
-        pdf.cell(10, 10, "-", ln=False)
-        pdf.cell(0, 10, f"Protein: {total_protein:.1f}g", ln=True)
-        pdf.cell(10, 10, "-", ln=False)
-        pdf.cell(0, 10, f"Carbs: {total_carbs:.1f}g", ln=True)
-        pdf.cell(10, 10, "-", ln=False)
-        pdf.cell(0, 10, f"Fiber: {total_fiber:.1f}g", ln=True)
-        pdf.ln(5)
-    
-    # Add notes section
-    pdf.ln(5)
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "Important Notes", ln=True)
-    pdf.set_font("Arial", "", 12)
-    
-    notes = [
-        "Always warm up for 5-10 minutes before starting your workout",
-        "Cool down and stretch for 5-10 minutes after your workout",
-        f"Stay hydrated! Drink {plan['hydration']} throughout the day",
-        "Listen to your body and adjust intensity as needed",
-        "For best results, follow this plan consistently for at least 4-6 weeks",
-        "Eat your post-workout meal within 30 minutes of completing your workout",
-        "Adjust portion sizes based on your hunger and energy levels"
-    ]
-    
-    for note in notes:
-        pdf.cell(10, 10, "-", ln=False)
-        pdf.cell(0, 10, note, ln=True)
-    
-    # Get the PDF as bytes
-    return pdf.output(dest='S').encode('latin-1')
+import food_search
+from gym_chatbot_new import GymChatbot
+import pdf_report
+import results_html
+import session_store
 
 # Page configuration
 st.set_page_config(
@@ -282,6 +181,13 @@ st.markdown("""
     div[data-testid="stExpander"] em {
         color: black !important;
     }
+    /* Recommended food details */
+    .food-details {
+        border: 1px solid #E0E0E0;
+        border-radius: 0.5rem;
+        padding: 0.5rem 1rem;
+        margin-bottom: 0.5rem;
+    }
     /* Print button styles */
     .print-button {
         background: linear-gradient(45deg, #FF9800, #FFB74D, #FFA726, #FF8F00) !important;
@@ -372,8 +278,10 @@ st.markdown("""
     </div>
 """.format(pd.Timestamp.now().strftime("%B %d, %Y")), unsafe_allow_html=True)
 
-# Check if results exist in session state
-if 'workout_results' not in st.session_state:
+# Fetch the results of this session from the store; they may have been evicted
+results_store = session_store.get_store()
+results = results_store.get(st.session_state['results_key']) if 'results_key' in st.session_state else None
+if results is None:
     st.markdown('<p style="color: #8B0000; font-weight: bold;">Please complete the workout planner form first!</p>', unsafe_allow_html=True)
     st.markdown("""
         <a href="/AI_Workout_Planner" target="_self" style="text-decoration: none;">
@@ -392,78 +300,120 @@ if 'workout_results' not in st.session_state:
         </a>
     """, unsafe_allow_html=True)
 else:
-    # Get results from session state
-    results = st.session_state.workout_results
     plan = results['plan']
     
-    # Display analysis results
-    st.markdown(f"### Analysis Results")
-    st.markdown(f"- **Recommended Workout Type:** {plan['workout_type']}")
-    st.markdown(f"- **Experience Level:** {results['predicted_experience']} (   1=Beginner, 2=Intermediate, 3=Advanced)")
+    # The plan is rendered as a few HTML blocks rather than one element per line
+    st.markdown(results_html.render_workout(plan, results['predicted_experience']), unsafe_allow_html=True)
 
-    # Display workout plan
-    st.markdown('<div style="color: #2196F3; font-weight: bold; font-size: 2em; margin-bottom: 1rem;">Your Personalized Workout Plan</div>', unsafe_allow_html=True)
-    
-    # Display workout plan in a structured format
-    st.markdown(f"**Workout Type:** {plan['workout_type']}")
-    st.markdown(f"**Experience Level:** {plan['experience_level']}")
-    st.markdown(f"**Sessions per Week:** {plan['sessions_per_week']}")
-    st.markdown(f"**Calories per Session:** {plan['calories_per_session']}")
-    st.markdown(f"**Session Duration:** {plan['session_duration']}")
-    st.markdown(f"**Hydration Recommendation:** {plan['hydration']}")
+    # Display predicted calories for every workout type and session duration
+    if 'calories_table' in results:
+        st.markdown("### Calories per Session by Workout Type")
+        calories_table = results['calories_table'].round(0).astype(int)
+        calories_table.columns = [f"{duration:g} h" for duration in calories_table.columns]
+        st.dataframe(calories_table)
+
+    # Show how calories change with longer or more frequent sessions, in a fragment so the
+    # controls only rerun this section. Every curve comes from a single batched prediction.
+    @st.fragment
+    def what_if(user_info, workout_type):
+        st.markdown(f"### What If? Calories from {workout_type} Workouts")
+        bpm_col, measure_col = st.columns(2)
+        with bpm_col:
+            avg_bpm = st.slider("Average heart rate during exercise (BPM)", min_value=100, max_value=190,
+                                value=min(max(int(user_info['Avg_BPM']), 100), 190))
+        with measure_col:
+            measure = st.radio("Calories", ["Weekly Calories", "Calories"], horizontal=True,
+                               format_func=lambda name: "Per week" if name == "Weekly Calories" else "Per session")
+        sweep = GymChatbot.shared().predict_calories_sweep(user_info, workout_type, avg_bpms=[avg_bpm])
+        chart = sweep.pivot(index='Session_Duration (hours)', columns='Workout_Frequency (days/week)', values=measure)
+        chart.columns = [f"{days} days/week" for days in chart.columns]
+        st.line_chart(chart, x_label="Session duration (hours)", y_label="Calories")
 
-    # Display daily exercises
-    st.markdown("### Weekly Schedule")
-    for day, details in plan['daily_exercises'].items():
-        st.markdown(f"**{day}:** {details['focus']}")
-        st.markdown("- " + "\n- ".join(details['exercises']))
+    # Plans saved before the profile was kept with the results can't be swept
+    if 'user_info' in results:
+        what_if(results['user_info'], plan.workout_type)
 
-    # Display meal recommendations
-    st.markdown('<div style="color: #4CAF50; font-weight: bold; font-size: 2em; margin-bottom: 1rem;">Recommended Daily Nutrition Plan</div>', unsafe_allow_html=True)
+    # Display the weekly schedule, daily nutrition totals and recommended foods
     meal_plan = results['meal_plan']
-    
-    # Calculate total nutrients
-    total_calories = sum(details['Calories'] * details['Servings'] for details in meal_plan.values())
-    total_protein = sum(details['Protein'] * details['Servings'] for details in meal_plan.values())
-    total_carbs = sum(details['Carbs'] * details['Servings'] for details in meal_plan.values())
-    total_fiber = sum(details['Fiber'] * details['Servings'] for details in meal_plan.values())
-    
-    # Display total nutrients
-    st.markdown("### Total Daily Nutrition")
-    st.markdown(f"- **Total Calories:** {total_calories:.1f}")
-    st.markdown(f"- **Total Protein:** {total_protein:.1f}g")
-    st.markdown(f"- **Total Carbs:** {total_carbs:.1f}g")
-    st.markdown(f"- **Total Fiber:** {total_fiber:.1f}g")
-    
-    # Display individual food items
-    st.markdown("### Recommended Foods")
-    for food, details in meal_plan.items():
-        total_calories = details['Calories'] * details['Servings']
-        total_protein = details['Protein'] * details['Servings']
-        total_carbs = details['Carbs'] * details['Servings']
-        total_fiber = details['Fiber'] * details['Servings']
-        
-        with st.expander(f"**{food}** (x{details['Servings']})"):
-            st.markdown(f"- Calories: {total_calories:.1f}")
-            st.markdown(f"- Protein: {total_protein:.1f}g")
-            st.markdown(f"- Carbs: {total_carbs:.1f}g")
-            st.markdown(f"- Fiber: {total_fiber:.1f}g")
+    st.markdown(results_html.render_schedule(plan) + results_html.render_nutrition(meal_plan), unsafe_allow_html=True)
+
+    # Search the nutrient table and swap a recommended food for another one
+    st.markdown("### Swap a Food")
+    food_index = food_search.load_food_index()
+    search_col, category_col = st.columns([2, 1])
+    with search_col:
+        query = st.text_input("Search foods", placeholder="e.g. chicken, oats, brocoli")
+    with category_col:
+        category = st.selectbox("Category", ["All"] + sorted(set(food_index.category_groups)))
+    matches = food_index.search(query, k=10, categories=None if category == "All" else [category])
+    if query and matches:
+        found = pd.DataFrame(food_index.describe(matches))
+        st.dataframe(found[['Food', 'Measure', 'Calories', 'Protein', 'Carbs', 'Fat', 'Fiber', 'Category']],
+                     hide_index=True)
+        old_col, new_col = st.columns(2)
+        with old_col:
+            replaced = st.selectbox("Replace", meal_plan.foods)
+        with new_col:
+            replacement = st.selectbox("With", matches, format_func=lambda row: food_index.nutrients.display_name[row])
+        if st.button("Swap Food"):
+            results['meal_plan'] = food_search.swap_food(meal_plan, replaced, food_index.nutrients, replacement)
+            results_store.put(results, st.session_state['results_key'])
+            st.rerun()
+    elif query:
+        st.markdown("No foods match your search.")
+
+    # Rank foods by how much of a nutrient they give per calorie
+    st.markdown("### Nutrient-Dense Foods")
+    nutrients = food_index.nutrients
+    rank_col, group_col = st.columns([1, 2])
+    with rank_col:
+        nutrient = st.selectbox("Most per calorie", ["Protein", "Fiber", "Carbs", "Fat"])
+    with group_col:
+        ranked_category = st.selectbox("Food category", ["All"] + list(nutrients.categories), key="ranked_category")
+    dense = nutrients.top_foods(nutrient.lower(), k=10, category=None if ranked_category == "All" else ranked_category)
+    dense_foods = pd.DataFrame(food_index.describe(dense))
+    if len(dense_foods):
+        dense_foods[f"{nutrient} per 100 cal"] = (nutrients.density[nutrient.lower()][dense] * 100).round(1)
+        st.dataframe(dense_foods[['Food', 'Measure', 'Calories', f"{nutrient} per 100 cal", 'Category']], hide_index=True)
 
     # Additional notes and advice
     st.markdown("### Notes")
     st.markdown("- Always warm up for 5-10 minutes before starting your workout")
     st.markdown("- Cool down and stretch for 5-10 minutes after your workout")
-    st.markdown(f"- Stay hydrated! Drink {plan['hydration']} throughout the day")
+    st.markdown(f"- Stay hydrated! Drink {plan.hydration} throughout the day")
     st.markdown("- Listen to your body and adjust intensity as needed")
     st.markdown("- For best results, follow this plan consistently for at least 4-6 weeks")
     st.markdown("- Eat your post-workout meal within 30 minutes of completing your workout")
     st.markdown("- Adjust portion sizes based on your hunger and energy levels")
 
-    # Generate PDF and create download button
-    pdf_bytes = generate_pdf(plan, meal_plan)
-    st.download_button(
-        label="📥 Download Workout Plan as PDF",
-        data=pdf_bytes,
-        file_name=f"workout_plan_{datetime.now().strftime('%Y%m%d')}.pdf",
-        mime="application/pdf"
-    )
+    # The PDF renders on a background worker once asked for; poll until it is ready
+    pdf_key = pdf_report.content_hash(plan, meal_plan)
+    pdf_job = pdf_report.submit_pdf(plan, meal_plan) if st.session_state.get('pdf_requested') == pdf_key else None
+
+    @st.fragment(run_every=None if pdf_job is None or pdf_job.done() else 0.5)
+    def pdf_download():
+        if pdf_job is None:
+            if st.button("📄 Create PDF of My Plan"):
+                st.session_state['pdf_requested'] = pdf_key
+                st.rerun()
+        elif not pdf_job.done():
+            st.session_state['pdf_polling'] = pdf_job.key
+            st.button("📥 Preparing your PDF...", disabled=True)
+        elif pdf_job.failed():
+            st.error("Sorry, the PDF could not be created.")
+            if st.button("Try Again"):
+                st.session_state['pdf_requested'] = None
+                st.rerun()
+        else:
+            st.download_button(
+                label="📥 Download Workout Plan as PDF",
+                data=pdf_job.result(),
+                file_name=f"workout_plan_{datetime.now().strftime('%Y%m%d')}.pdf",
+                mime="application/pdf"
+            )
+            if st.session_state.get('pdf_polling') == pdf_job.key:
+                # Rerun the page once to stop polling
+                st.session_state['pdf_polling'] = None
+                st.rerun()
+
+    pdf_download()
@@ -0,0 +1,261 @@
+import atexit
+import hashlib
+import json
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from fpdf import FPDF
+
+PDF_CACHE_SIZE = 32  # Rendered documents kept in memory
+PDF_WORKERS = 2      # Processes rendering PDFs in the background, shared by all sessions
+
+# Fonts of the report, registered in this order in every document
+FONTS = [("Arial", "B"), ("Arial", "")]
+
+
+def new_document():
+    """Create an empty report document.
+
+    Registering the fonts up front gives them the same resource names in
+    every document, so pages can be moved between documents (see assemble).
+    """
+    pdf = FPDF()
+    for family, style in FONTS:
+        pdf.set_font(family, style, 12)
+    return pdf
+
+
+def generate_pdf(plan, meal_plan):
+    """Lay out a WorkoutPlan and MealPlan as a PDF document and return its bytes."""
+    pdf = new_document()
+    add_plan_pages(pdf, plan, meal_plan)
+    return pdf.output(dest='S').encode('latin-1')
+
+
+def add_plan_pages(pdf, plan, meal_plan, title="Your Personalized Workout & Nutrition Plan"):
+    """Append the pages of one plan to a report document. Returns the number of pages added."""
+    first_page = pdf.page
+    pdf.add_page()
+    
+    # Set font
+    pdf.set_font("Arial", "B", 16)
+    
+    # Add title
+    pdf.cell(0, 10, title, ln=True, align='C')
+    
+    # Add date
+    pdf.set_font("Arial", "", 12)
+    pdf.cell(0, 10, f"Generated on: {datetime.now().strftime('%B %d, %Y')}", ln=True, align='C')
+    
+    # Add workout plan section
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Your Personalized Workout Plan", ln=True)
+    pdf.set_font("Arial", "", 12)
+    
+    # Add workout details
+    pdf.cell(0, 10, f"Workout Type: {plan.workout_type}", ln=True)
+    pdf.cell(0, 10, f"Experience Level: {plan.experience_level}", ln=True)
+    pdf.cell(0, 10, f"Sessions per Week: {plan.sessions_per_week}", ln=True)
+    pdf.cell(0, 10, f"Calories per Session: {plan.calories_per_session}", ln=True)
+    pdf.cell(0, 10, f"Session Duration: {plan.session_duration}", ln=True)
+    pdf.cell(0, 10, f"Hydration Recommendation: {plan.hydration}", ln=True)
+    
+    # Add weekly schedule
+    pdf.ln(5)
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Weekly Schedule", ln=True)
+    pdf.set_font("Arial", "", 12)
+    
+    for day, (focus, exercises) in plan.daily_exercises.items():
+        pdf.cell(0, 10, f"{day}: {focus}", ln=True)
+        for exercise in exercises:
+            pdf.cell(10, 10, "-", ln=False)
+            pdf.cell(0, 10, exercise, ln=True)
+    
+    # Add nutrition plan section
+    pdf.ln(5)
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Recommended Daily Nutrition Plan", ln=True)
+    pdf.set_font("Arial", "", 12)
+    
+    # Add total nutrients
+    totals = meal_plan.totals
+    pdf.cell(0, 10, "Total Daily Nutrition:", ln=True)
+    pdf.cell(0, 10, f"- Total Calories: {totals['Calories']:.1f}", ln=True)
+    pdf.cell(0, 10, f"- Total Protein: {totals['Protein']:.1f}g", ln=True)
+    pdf.cell(0, 10, f"- Total Carbs: {totals['Carbs']:.1f}g", ln=True)
+    pdf.cell(0, 10, f"- Total Fiber: {totals['Fiber']:.1f}g", ln=True)
+    
+    # Add food items
+    pdf.ln(5)
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Recommended Foods", ln=True)
+    pdf.set_font("Arial", "", 12)
+    
+    for food, measure, servings, totals in meal_plan.items():
+        pdf.cell(0, 10, f"{food} (x{servings:g})", ln=True)
+        pdf.cell(10, 10, "-", ln=False)
+        pdf.cell(0, 10, f"Calories: {totals['Calories']:.1f}", ln=True)
+        pdf.cell(10, 10, "-", ln=False)
+        pdf.cell(0, 10, f"Protein: {totals['Protein']:.1f}g", ln=True)
+        pdf.cell(10, 10, "-", ln=False)
+        pdf.cell(0, 10, f"Carbs: {totals['Carbs']:.1f}g", ln=True)
+        pdf.cell(10, 10, "-", ln=False)
+        pdf.cell(0, 10, f"Fiber: {totals['Fiber']:.1f}g", ln=True)
+        pdf.ln(5)
+    
+    # Add notes section
+    pdf.ln(5)
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Important Notes", ln=True)
+    pdf.set_font("Arial", "", 12)
+    
+    notes = [
+        "Always warm up for 5-10 minutes before starting your workout",
+        "Cool down and stretch for 5-10 minutes after your workout",
+        f"Stay hydrated! Drink {plan.hydration} throughout the day",
+        "Listen to your body and adjust intensity as needed",
+        "For best results, follow this plan consistently for at least 4-6 weeks",
+        "Eat your post-workout meal within 30 minutes of completing your workout",
+        "Adjust portion sizes based on your hunger and energy levels"
+    ]
+    
+    for note in notes:
+        pdf.cell(10, 10, "-", ln=False)
+        pdf.cell(0, 10, note, ln=True)
+    
+    return pdf.page - first_page
+
+
+def page_streams(pdf):
+    """Return the content streams of a document's pages."""
+    return [pdf.pages[n] for n in range(1, pdf.page + 1)]
+
+
+def assemble(streams):
+    """Build one document out of page content streams taken from documents made with new_document().
+
+    The pages are copied as is; this relies on the page layout of fpdf 1.7.2,
+    which requirements.txt pins.
+    """
+    pdf = new_document()
+    pdf.open()
+    for stream in streams:
+        pdf.page += 1
+        pdf.pages[pdf.page] = stream
+    return pdf
+
+
+def content_hash(plan, meal_plan):
+    """Hash everything a PDF shows, including the generation date printed on it."""
+    content = {'plan': plan.to_dict(), 'meal_plan': meal_plan.to_dict(), 'date': datetime.now().strftime('%Y-%m-%d')}
+    return hashlib.sha1(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _store(key, pdf_bytes):
+    with _cache_lock:
+        _cache[key] = pdf_bytes
+        _cache.move_to_end(key)
+        while len(_cache) > PDF_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+class PdfJob:
+    """Handle on a PDF rendered in the background by submit_pdf()."""
+
+    def __init__(self, key, future=None, pdf_bytes=None):
+        self.key = key
+        self._future = future
+        self._bytes = pdf_bytes
+
+    def done(self):
+        return self._future is None or self._future.done()
+
+    def failed(self):
+        return self.done() and self._future is not None and self._future.exception() is not None
+
+    def result(self, timeout=None):
+        """Return the PDF bytes, waiting for the render to finish if needed."""
+        if self._bytes is None:
+            self._bytes = self._future.result(timeout)
+        return self._bytes
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_jobs = {}
+
+
+def _submit(plan, meal_plan):
+    global _executor
+    with _executor_lock:
+        for _ in range(2):
+            if _executor is None:
+                # Spawned workers only import this module, never the Streamlit app or its server threads
+                _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS,
+                                                mp_context=multiprocessing.get_context('spawn'))
+            try:
+                return _executor.submit(generate_pdf, plan, meal_plan)
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool
+                _executor = None
+    raise BrokenProcessPool("PDF workers keep failing")
+
+
+@atexit.register
+def _shutdown():
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+
+
+def submit_pdf(plan, meal_plan):
+    """Start rendering the PDF of a plan on the background pool and return a PdfJob.
+
+    Plans already in the cache are returned as finished jobs, and a plan
+    that is already being rendered shares the running job.
+    """
+    key = content_hash(plan, meal_plan)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return PdfJob(key, pdf_bytes=_cache[key])
+        future = _jobs.get(key)
+        started = future is None
+        if started:
+            # Reserve the job with a placeholder, so starting the pool doesn't hold up other callers
+            future = _jobs[key] = Future()
+    if started:
+        try:
+            render = _submit(plan, meal_plan)
+        except Exception as e:
+            with _cache_lock:
+                _jobs.pop(key, None)
+            future.set_exception(e)
+        else:
+            # The callback runs right away if the render already finished
+            render.add_done_callback(lambda done: _finish(key, future, done))
+    return PdfJob(key, future)
+
+
+def _finish(key, future, render):
+    """Cache the bytes of a finished render and pass its outcome on to the placeholder."""
+    if render.cancelled():
+        error = CancelledError()
+    else:
+        error = render.exception()
+    if error is None:
+        _store(key, render.result())
+    with _cache_lock:
+        _jobs.pop(key, None)
+    if error is None:
+        future.set_result(render.result())
+    else:
+        future.set_exception(error)
@@ -0,0 +1,162 @@
+import collections
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import threading
+import time
+import nutrient_table
+import session_store
+
+PLAN_STORE_FILE = 'data/saved_plans.db'  # Member profiles and passphrase hashes, kept out of git
+PLAN_STORE_MAX_ROWS = 10000       # Saved plans kept before the oldest are deleted
+PLAN_STORE_MAX_AGE_DAYS = 180     # Saved plans older than this are deleted
+PASSPHRASE_ITERATIONS = 100000    # PBKDF2 rounds hashing member passphrases
+
+# Files whose contents determine a plan; a change to any of them makes saved plans stale
+MODEL_FILES = [
+    'models/calories_model.pkl',
+    'models/workout_model.pkl',
+    'models/experience_model.pkl',
+    'members_with_exercise_recommendations.csv',
+    nutrient_table.NUTRIENT_FILE,
+]
+
+SavedPlan = collections.namedtuple('SavedPlan', 'member_id profile_hash model_version user_info results created')
+
+
+def profile_hash(user_info):
+    """Hash the planner inputs of a profile, with floats rounded so recomputed values match."""
+    profile = {name: round(float(value), 4) if isinstance(value, float) else value for name, value in user_info.items()}
+    return hashlib.sha1(json.dumps(profile, sort_keys=True, default=float).encode('utf-8')).hexdigest()
+
+
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def model_version(files=None):
+    """Hash the contents of the model files. Hashes are cached until a file's size or mtime changes."""
+    files = tuple(files or MODEL_FILES)
+    state = tuple((os.stat(path).st_mtime_ns, os.stat(path).st_size) if os.path.exists(path) else None
+                  for path in files)
+    with _versions_lock:
+        cached = _versions.get(files)
+        if cached is None or cached[0] != state:
+            digest = hashlib.sha1()
+            for path in files:
+                digest.update(path.encode('utf-8'))
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        digest.update(hashlib.sha1(f.read()).digest())
+            cached = _versions[files] = (state, digest.hexdigest()[:16])
+    return cached[1]
+
+
+def passphrase_key(passphrase, salt):
+    return hashlib.pbkdf2_hmac('sha256', passphrase.encode('utf-8'), salt, PASSPHRASE_ITERATIONS)
+
+
+class PlanStore:
+    """Generated plans saved in SQLite, found by member ID or by profile hash and model version.
+
+    Each row keeps the planner inputs next to the serialized results, so a
+    stale plan can be regenerated without asking the member again. The first
+    save under a member ID claims it with a passphrase, which every later
+    save and load of that member's plans must give.
+
+    Plans older than max_age_days, and the oldest past max_rows, are deleted
+    as new ones are saved.
+    """
+
+    def __init__(self, path=PLAN_STORE_FILE, max_rows=PLAN_STORE_MAX_ROWS, max_age_days=PLAN_STORE_MAX_AGE_DAYS):
+        self.path = path
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS plans ("
+                       "member_id TEXT NOT NULL, profile_hash TEXT NOT NULL, model_version TEXT NOT NULL, "
+                       "user_info TEXT NOT NULL, results BLOB NOT NULL, created REAL NOT NULL, "
+                       "PRIMARY KEY (member_id, profile_hash, model_version))")
+            db.execute("CREATE INDEX IF NOT EXISTS plans_member ON plans (member_id, created)")
+            db.execute("CREATE INDEX IF NOT EXISTS plans_profile ON plans (profile_hash, model_version)")
+            db.execute("CREATE INDEX IF NOT EXISTS plans_created ON plans (created)")
+            db.execute("CREATE TABLE IF NOT EXISTS members ("
+                       "member_id TEXT PRIMARY KEY, salt BLOB NOT NULL, key BLOB NOT NULL)")
+
+    def _connect(self):
+        # sqlite3 connections may only be used by the thread that opened them
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def check_member(self, member_id, passphrase):
+        """Return whether a passphrase opens a member ID. Unclaimed member IDs open with any passphrase."""
+        row = self._connect().execute("SELECT salt, key FROM members WHERE member_id = ?", (member_id,)).fetchone()
+        return row is None or hmac.compare_digest(passphrase_key(passphrase, row[0]), row[1])
+
+    def save(self, user_info, results, member_id='', passphrase='', version=None):
+        """Save the results of a profile, for a member or anonymously (member_id '').
+
+        Raises PermissionError if the member ID is claimed with another passphrase.
+        """
+        now = time.time()
+        row = (member_id or '', profile_hash(user_info), version or model_version(),
+               json.dumps(user_info, default=float), session_store.serialize_results(results), now)
+        with self._connect() as db:
+            if member_id:
+                salt = os.urandom(16)
+                db.execute("INSERT OR IGNORE INTO members VALUES (?, ?, ?)",
+                           (member_id, salt, passphrase_key(passphrase, salt)))
+                if not self.check_member(member_id, passphrase):
+                    raise PermissionError(f"Member ID {member_id!r} is claimed with another passphrase")
+            db.execute("INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?, ?, ?)", row)
+            self._prune(db, now)
+
+    def _prune(self, db, now):
+        db.execute("DELETE FROM plans WHERE created < ?", (now - self.max_age_days * 86400,))
+        db.execute("DELETE FROM plans WHERE rowid IN "
+                   "(SELECT rowid FROM plans ORDER BY created DESC LIMIT -1 OFFSET ?)", (self.max_rows,))
+        # Members whose plans are all gone give their ID up
+        db.execute("DELETE FROM members WHERE member_id NOT IN (SELECT member_id FROM plans)")
+
+    def find(self, user_info, member_id='', version=None):
+        """Return the results saved for a profile under the current model version, or None.
+
+        Only plans saved under the same member ID ('' for anonymous) are found.
+        """
+        row = self._connect().execute(
+            "SELECT results FROM plans WHERE member_id = ? AND profile_hash = ? AND model_version = ?",
+            (member_id or '', profile_hash(user_info), version or model_version())).fetchone()
+        return session_store.deserialize_results(row[0]) if row else None
+
+    def latest(self, member_id, passphrase):
+        """Return the most recent SavedPlan of a member, or None if there is none or the passphrase is wrong."""
+        db = self._connect()
+        member = db.execute("SELECT salt, key FROM members WHERE member_id = ?", (member_id,)).fetchone()
+        if member is None or not hmac.compare_digest(passphrase_key(passphrase, member[0]), member[1]):
+            return None
+        row = db.execute(
+            "SELECT member_id, profile_hash, model_version, user_info, results, created FROM plans "
+            "WHERE member_id = ? ORDER BY created DESC LIMIT 1", (member_id,)).fetchone()
+        if row is None:
+            return None
+        return SavedPlan(row[0], row[1], row[2], json.loads(row[3]), session_store.deserialize_results(row[4]), row[5])
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the plan store of this process."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PlanStore()
+    return _store
@@ -0,0 +1,137 @@
+import numpy as np
+
+# Nutrients stored per serving, in column order
+NUTRIENTS = ('Calories', 'Protein', 'Carbs', 'Fat', 'Fiber')
+
+LITERS_TO_CUPS = 4.22675
+
+
+class MealPlan:
+    """Foods of a meal plan with their servings and nutrients.
+
+    Nutrients per serving are one (foods, 5) float array in NUTRIENTS order.
+    Plans are immutable, so the per-food and overall totals are computed
+    once and cached.
+    """
+
+    __slots__ = ('foods', 'measures', 'servings', 'nutrients', '_food_totals', '_totals')
+
+    def __init__(self, foods, measures, servings, nutrients):
+        self.foods = tuple(foods)
+        self.measures = tuple(measures)
+        self.servings = np.asarray(servings, dtype=np.float64).reshape(len(self.foods))
+        self.nutrients = np.asarray(nutrients, dtype=np.float64).reshape(len(self.foods), len(NUTRIENTS))
+        self.servings.flags.writeable = False
+        self.nutrients.flags.writeable = False
+        self._food_totals = None
+        self._totals = None
+
+    @classmethod
+    def from_rows(cls, table, rows, servings):
+        """Build a plan from rows of a NutrientTable and their servings."""
+        rows = np.asarray(rows, dtype=np.int64)
+        nutrients = np.stack([table.calories[rows], table.protein[rows], table.carbs[rows],
+                              table.fat[rows], table.fiber[rows]], axis=-1)
+        return cls(table.display_name[rows], table.measure[rows], servings, nutrients)
+
+    def __len__(self):
+        return len(self.foods)
+
+    def __iter__(self):
+        return iter(self.foods)
+
+    def __eq__(self, other):
+        return (isinstance(other, MealPlan) and self.foods == other.foods and self.measures == other.measures
+                and np.array_equal(self.servings, other.servings) and np.array_equal(self.nutrients, other.nutrients))
+
+    @property
+    def food_totals(self):
+        """(foods, 5) array of each food's nutrients times its servings."""
+        if self._food_totals is None:
+            totals = self.nutrients * self.servings[:, None]
+            totals.flags.writeable = False
+            self._food_totals = totals
+        return self._food_totals
+
+    @property
+    def totals(self):
+        """Dict of the plan's total Calories, Protein, Carbs, Fat and Fiber."""
+        if self._totals is None:
+            self._totals = dict(zip(NUTRIENTS, self.food_totals.sum(axis=0).tolist()))
+        return self._totals
+
+    def items(self):
+        """Yield (food, measure, servings, totals) for every food, totals being a dict like `totals`."""
+        for i, food in enumerate(self.foods):
+            yield food, self.measures[i], float(self.servings[i]), dict(zip(NUTRIENTS, self.food_totals[i].tolist()))
+
+    def replace(self, food, table, row, servings):
+        """Return a copy of the plan with one food replaced by a NutrientTable row."""
+        i = self.foods.index(food)
+        new = MealPlan.from_rows(table, [row], [servings])
+        return MealPlan(self.foods[:i] + new.foods + self.foods[i + 1:],
+                        self.measures[:i] + new.measures + self.measures[i + 1:],
+                        np.concatenate([self.servings[:i], new.servings, self.servings[i + 1:]]),
+                        np.concatenate([self.nutrients[:i], new.nutrients, self.nutrients[i + 1:]]))
+
+    def to_dict(self):
+        """Serialize to plain lists, e.g. for JSON."""
+        return {'foods': list(self.foods), 'measures': list(self.measures),
+                'servings': self.servings.tolist(), 'nutrients': self.nutrients.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['foods'], data['measures'], data['servings'], data['nutrients'])
+
+
+class WorkoutPlan:
+    """A weekly workout plan with numeric fields.
+
+    daily_exercises maps each workout day to a (focus, exercises) tuple.
+    """
+
+    __slots__ = ('workout_type', 'experience_level', 'sessions_per_week', 'calories_per_session',
+                 'session_hours', 'hydration_liters', 'workout_days', 'rest_days', 'daily_exercises')
+
+    def __init__(self, workout_type, experience_level, sessions_per_week, calories_per_session, session_hours,
+                 hydration_liters, workout_days, rest_days, daily_exercises):
+        self.workout_type = workout_type
+        self.experience_level = experience_level
+        self.sessions_per_week = int(sessions_per_week)
+        self.calories_per_session = int(calories_per_session)
+        self.session_hours = float(session_hours)
+        self.hydration_liters = round(float(hydration_liters), 1)
+        self.workout_days = tuple(workout_days)
+        self.rest_days = tuple(rest_days)
+        self.daily_exercises = {day: (focus, tuple(exercises)) for day, (focus, exercises) in daily_exercises.items()}
+
+    def __eq__(self, other):
+        return isinstance(other, WorkoutPlan) and self.to_dict() == other.to_dict()
+
+    @property
+    def session_duration(self):
+        return f"{self.session_hours:.2f} hours"
+
+    @property
+    def session_minutes(self):
+        return int(self.session_hours * 60)
+
+    @property
+    def hydration(self):
+        return f"{self.hydration_liters:.1f} liters of water per day"
+
+    @property
+    def hydration_cups(self):
+        return self.hydration_liters * LITERS_TO_CUPS
+
+    def to_dict(self):
+        """Serialize to plain values, e.g. for JSON."""
+        data = {field: getattr(self, field) for field in self.__slots__}
+        data['workout_days'] = list(self.workout_days)
+        data['rest_days'] = list(self.rest_days)
+        data['daily_exercises'] = {day: [focus, list(exercises)] for day, (focus, exercises) in self.daily_exercises.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
@@ -0,0 +1,237 @@
+import collections
+import concurrent.futures
+import hashlib
+import json
+import threading
+import time
+import pandas as pd
+import gym_ml_model_new
+
+# Every profile field the three models take as a feature
+PREDICTION_FIELDS = ('Age', 'Gender', 'Weight (kg)', 'Height (m)', 'Max_BPM', 'Avg_BPM', 'Resting_BPM',
+                     'Session_Duration (hours)', 'Fat_Percentage', 'Water_Intake (liters)',
+                     'Workout_Frequency (days/week)', 'BMI')
+
+STAGE_CACHE_SIZE = 256  # Memoized outputs kept per stage
+PIPELINE_WORKERS = 4    # Threads running independent stages, shared by all requests
+
+NUTRIENT_FILE = "nutrients_csvfile.csv"
+
+# A step of the planner: the user_info fields it reads, the stages whose outputs it takes
+# (passed as keyword arguments) and run(chatbot, snapshot, profile, **outputs)
+Stage = collections.namedtuple('Stage', 'name fields after run')
+
+
+def _classify(chatbot, snapshot, profile):
+    return chatbot.classify_profile(profile, snapshot)
+
+
+def _calories_table(chatbot, snapshot, profile):
+    return chatbot.predict_calories_by_workout_type(profile, snapshot=snapshot)
+
+
+def _exercises(chatbot, snapshot, profile, classification):
+    return chatbot.get_exercise_recommendations(profile, *classification, snapshot)
+
+
+def _session_calories(chatbot, snapshot, profile, classification, calories_table):
+    # The calories of the workout type the plan will recommend, as the plan rounds them
+    workout = chatbot.recommend_workout_type(classification[0], profile['Goal'])
+    return int(calories_table.loc[workout, profile['Session_Duration (hours)']])
+
+
+def _plan(chatbot, snapshot, profile, classification, calories_table, exercises):
+    predicted_workout, predicted_experience = classification
+    predicted_calories = calories_table.loc[predicted_workout, profile['Session_Duration (hours)']]
+    return chatbot.get_workout_plan(profile, predicted_workout, predicted_calories, predicted_experience, exercises,
+                                    calories_table, snapshot)
+
+
+def _meal_plan(chatbot, snapshot, profile, session_calories):
+    return gym_ml_model_new.generate_meal_recommendations(session_calories, NUTRIENT_FILE, profile['Goal'],
+                                                          read_only=chatbot.read_only)
+
+
+def _weekly_meals(chatbot, snapshot, profile, plan):
+    return chatbot.get_weekly_meal_plan(plan, profile['Goal'])
+
+
+STAGES = [
+    Stage('classification', PREDICTION_FIELDS, (), _classify),
+    Stage('calories_table', PREDICTION_FIELDS, (), _calories_table),
+    Stage('exercises', ('BMI', 'Age'), ('classification',), _exercises),
+    # Meals only need the calories of the recommended workout, so they don't wait for exercises and the plan
+    Stage('session_calories', ('Goal', 'Session_Duration (hours)'), ('classification', 'calories_table'),
+          _session_calories),
+    Stage('plan', ('Goal', 'Workout_Frequency (days/week)', 'Session_Duration (hours)', 'Weight (kg)'),
+          ('classification', 'calories_table', 'exercises'), _plan),
+    Stage('meal_plan', ('Goal',), ('session_calories',), _meal_plan),
+    Stage('weekly_meals', ('Goal',), ('plan',), _weekly_meals),
+]
+
+# Stages the planner pages need for their results
+RESULT_STAGES = ('classification', 'calories_table', 'plan', 'meal_plan')
+
+
+def fingerprint(value):
+    """Hash a stage output, so stages after it can tell whether it actually changed."""
+    if isinstance(value, pd.DataFrame):
+        content = repr((value.index.tolist(), value.columns.tolist())).encode('utf-8') + value.to_numpy().tobytes()
+    elif hasattr(value, 'to_dict'):
+        content = json.dumps(value.to_dict(), sort_keys=True, default=str).encode('utf-8')
+    else:
+        content = repr(value).encode('utf-8')
+    return hashlib.sha1(content).hexdigest()
+
+
+class PlanningPipeline:
+    """The planner as a graph of stages, memoized on the inputs each stage actually reads.
+
+    A stage's memo key is the values of its declared user_info fields plus
+    the fingerprints of the outputs it takes. Stages only see the fields
+    they declare, so an undeclared read fails instead of going stale.
+    When a stage recomputes to the same output, the stages after it still
+    hit their memo. Memos are dropped when the chatbot publishes a new snapshot.
+
+    Stages whose inputs are ready run concurrently on a thread pool; memo
+    hits are resolved on the calling thread.
+    """
+
+    def __init__(self, chatbot, stages=STAGES, cache_size=STAGE_CACHE_SIZE, executor=None):
+        self.chatbot = chatbot
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_size = cache_size
+        self.executor = executor
+        self._snapshot = None
+        self._memo = {name: collections.OrderedDict() for name in self.stages}
+        # Per stage: [runs, memo hits, seconds spent computing]
+        self.stats = {name: [0, 0, 0.0] for name in self.stages}
+        self._lock = threading.Lock()
+
+    def required(self, names):
+        """Return the named stages and every stage they depend on, in graph order."""
+        order = []
+        def visit(name):
+            if name not in order:
+                for upstream in self.stages[name].after:
+                    visit(upstream)
+                order.append(name)
+        for name in names:
+            visit(name)
+        return order
+
+    def stage_key(self, stage, user_info, fingerprints):
+        return (tuple(user_info[field] for field in stage.fields)
+                + tuple(fingerprints[name] for name in stage.after))
+
+    def _lookup(self, stage, key, snapshot):
+        with self._lock:
+            if self._snapshot is not snapshot:
+                # New models or data: nothing memoized so far still holds
+                for memo in self._memo.values():
+                    memo.clear()
+                self._snapshot = snapshot
+            self.stats[stage.name][0] += 1
+            cached = self._memo[stage.name].get(key)
+            if cached is not None:
+                self._memo[stage.name].move_to_end(key)
+                self.stats[stage.name][1] += 1
+            return cached
+
+    def _compute(self, stage, key, user_info, inputs, snapshot):
+        start = time.perf_counter()
+        profile = {field: user_info[field] for field in stage.fields}
+        output = stage.run(self.chatbot, snapshot, profile, **inputs)
+        cached = (output, fingerprint(output))
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.stats[stage.name][2] += seconds
+            if self._snapshot is snapshot:
+                memo = self._memo[stage.name]
+                memo[key] = cached
+                while len(memo) > self.cache_size:
+                    memo.popitem(last=False)
+        return cached + (seconds,)
+
+    def run_stages(self, user_info, names, snapshot=None, trace=None):
+        """Run the named stages and their dependencies for a profile. Returns {stage: output}.
+
+        Every stage runs at most once per call. If `trace` is a list,
+        (stage, computed, seconds) is appended as each stage finishes.
+        """
+        snapshot = snapshot or self.chatbot.snapshot
+        executor = self.executor or _get_executor()
+        waiting = self.required(names)
+        outputs, fingerprints, running = {}, {}, {}
+
+        while waiting or running:
+            # Resolve every stage whose inputs are ready: memo hits right away, the rest on the pool
+            ready = [name for name in waiting if all(upstream in fingerprints for upstream in self.stages[name].after)]
+            for name in ready:
+                waiting.remove(name)
+                stage = self.stages[name]
+                key = self.stage_key(stage, user_info, fingerprints)
+                cached = self._lookup(stage, key, snapshot)
+                if cached is not None:
+                    outputs[name], fingerprints[name] = cached
+                    if trace is not None:
+                        trace.append((name, False, 0.0))
+                else:
+                    inputs = {upstream: outputs[upstream] for upstream in stage.after}
+                    running[executor.submit(self._compute, stage, key, user_info, inputs, snapshot)] = name
+            if ready and not running:
+                continue  # Hits may have readied more stages
+
+            finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                outputs[name], fingerprints[name], seconds = future.result()
+                if trace is not None:
+                    trace.append((name, True, seconds))
+        return outputs
+
+    def run(self, user_info, snapshot=None, trace=None):
+        """Plan a profile, recomputing only the stages whose inputs changed since a memoized run.
+
+        Returns the results dict the planner pages store.
+        """
+        return results_from(self.run_stages(user_info, RESULT_STAGES, snapshot, trace), user_info)
+
+
+def results_from(outputs, user_info):
+    """Build the planner results dict from stage outputs."""
+    predicted_workout, predicted_experience = outputs['classification']
+    calories_table = outputs['calories_table']
+    return {
+        'predicted_calories': calories_table.loc[predicted_workout, user_info['Session_Duration (hours)']],
+        'predicted_workout': predicted_workout,
+        'predicted_experience': predicted_experience,
+        'plan': outputs['plan'],
+        'meal_plan': outputs['meal_plan'],
+        'calories_table': calories_table,
+        'user_info': dict(user_info),
+    }
+
+
+_executor = None
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _shared_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=PIPELINE_WORKERS,
+                                                              thread_name_prefix='planning')
+    return _executor
+
+
+def shared_pipeline():
+    """Return the pipeline shared by all sessions, over the shared chatbot."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            from gym_chatbot_new import GymChatbot
+            _shared = PlanningPipeline(GymChatbot.shared())
+    return _shared
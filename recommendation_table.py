@@ -0,0 +1,267 @@
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+from exercise_cooccurrence import split_exercises
+
+RECOMMENDATION_TABLE_FILE = 'models/recommendation_table.npz'
+
+# Quantization grid for the materialized cells
+BMI_RANGE = (10.0, 60.0)
+BMI_STEP = 1.0
+AGE_RANGE = (18.0, 100.0)
+AGE_STEP = 2.0
+
+CANDIDATES_PER_CELL = 25  # Members kept per cell for the online refinement
+SIMILAR_MEMBERS = 10      # Same as the live neighbor search
+MAX_EXERCISES = 28
+MIN_PARTITION_SIZE = 5    # Partitions smaller than this are relaxed, like the live search
+
+# Wildcards used in partition keys for the relaxed fallbacks
+ANY_WORKOUT = ''
+ANY_EXPERIENCE = 0
+
+
+def similarity_scores(bmi, age, user_bmi, user_age, bmi_scale, age_scale):
+    """Score members against a user like get_exercise_recommendations does (lower is better).
+
+    The scales are the largest BMI/Age difference within the partition, which
+    only depends on the partition's min and max and the user's own values.
+    """
+    bmi_diff = np.abs(bmi - user_bmi)
+    age_diff = np.abs(age - user_age)
+    if bmi_scale > 0:
+        bmi_diff = bmi_diff / bmi_scale
+    if age_scale > 0:
+        age_diff = age_diff / age_scale
+    return bmi_diff + age_diff
+
+
+def _grid_centers(value_range, step):
+    lo, hi = value_range
+    return lo + step * (np.arange(int(round((hi - lo) / step))) + 0.5)
+
+
+class _Partition:
+    """Materialized cells for one (Workout_Type, Experience_Level) partition."""
+
+    def __init__(self, fingerprint, bmi, age, exercise_indptr, exercise_ids, cell_members, cell_exercises):
+        self.fingerprint = fingerprint
+        self.bmi = bmi
+        self.age = age
+        self.exercise_indptr = exercise_indptr
+        self.exercise_ids = exercise_ids
+        self.cell_members = cell_members      # (n_bmi, n_age, CANDIDATES_PER_CELL), ranked at the cell center
+        self.cell_exercises = cell_exercises  # (n_bmi, n_age, MAX_EXERCISES), -1 padded
+
+    def scales(self, user_bmi, user_age):
+        return (max(user_bmi - self.bmi.min(), self.bmi.max() - user_bmi),
+                max(user_age - self.age.min(), self.age.max() - user_age))
+
+    def member_exercises(self, members):
+        """Return the de-duplicated exercise ids recommended to the given members, in order."""
+        ids = [self.exercise_ids[self.exercise_indptr[m]:self.exercise_indptr[m + 1]] for m in members]
+        ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int32)
+        _, first = np.unique(ids, return_index=True)
+        return ids[np.sort(first)]
+
+    @classmethod
+    def build(cls, members, fingerprint, vocabulary_index):
+        bmi = members['BMI'].to_numpy(dtype=np.float32)
+        age = members['Age'].to_numpy(dtype=np.float32)
+
+        exercise_lists = [[vocabulary_index[name] for name in split_exercises(value)]
+                          for value in members['Recommended_Exercises']]
+        exercise_indptr = np.zeros(len(exercise_lists) + 1, dtype=np.int32)
+        np.cumsum([len(ids) for ids in exercise_lists], out=exercise_indptr[1:])
+        exercise_ids = np.array([i for ids in exercise_lists for i in ids], dtype=np.int32)
+
+        partition = cls(fingerprint, bmi, age, exercise_indptr, exercise_ids, None, None)
+
+        # Score every member against every cell center at once
+        bmi_centers = _grid_centers(BMI_RANGE, BMI_STEP)
+        age_centers = _grid_centers(AGE_RANGE, AGE_STEP)
+        bmi_scale = np.maximum(bmi_centers - bmi.min(), bmi.max() - bmi_centers)
+        age_scale = np.maximum(age_centers - age.min(), age.max() - age_centers)
+        bmi_term = np.abs(bmi[None, :] - bmi_centers[:, None]) / np.where(bmi_scale > 0, bmi_scale, 1)[:, None]
+        age_term = np.abs(age[None, :] - age_centers[:, None]) / np.where(age_scale > 0, age_scale, 1)[:, None]
+        scores = bmi_term[:, None, :] + age_term[None, :, :]
+
+        n_candidates = min(CANDIDATES_PER_CELL, len(bmi))
+        ranked = np.argsort(scores, axis=2, kind='stable')[:, :, :n_candidates]
+        cell_members = np.full(scores.shape[:2] + (CANDIDATES_PER_CELL,), -1, dtype=np.int16)
+        cell_members[:, :, :n_candidates] = ranked
+
+        cell_exercises = np.full(scores.shape[:2] + (MAX_EXERCISES,), -1, dtype=np.int16)
+        for i in range(scores.shape[0]):
+            for j in range(scores.shape[1]):
+                ids = partition.member_exercises(ranked[i, j, :SIMILAR_MEMBERS])[:MAX_EXERCISES]
+                cell_exercises[i, j, :len(ids)] = ids
+
+        partition.cell_members = cell_members
+        partition.cell_exercises = cell_exercises
+        return partition
+
+
+class RecommendationTable:
+    """Precomputed similar-member exercise lists per partition and BMI/Age cell.
+
+    Each cell stores the members ranked closest to the cell center and the
+    exercise list they produce. Lookups re-rank the cell's candidates against
+    the user's exact BMI and Age, which reproduces the live neighbor search
+    without scanning the partition.
+    """
+
+    def __init__(self, vocabulary=None, partitions=None):
+        self.vocabulary = list(vocabulary) if vocabulary is not None else []
+        self.vocabulary_index = {name: i for i, name in enumerate(self.vocabulary)}
+        self.partitions = partitions if partitions is not None else {}
+
+    @staticmethod
+    def partition_members(df):
+        """Yield (key, member rows) for every partition the live search can fall back to."""
+        yield (ANY_WORKOUT, ANY_EXPERIENCE), df
+        for workout_type, members in df.groupby('Workout_Type'):
+            if len(members) >= MIN_PARTITION_SIZE:
+                yield (workout_type, ANY_EXPERIENCE), members
+        for (workout_type, experience), members in df.groupby(['Workout_Type', 'Experience_Level']):
+            if len(members) >= MIN_PARTITION_SIZE:
+                yield (workout_type, int(experience)), members
+
+    @staticmethod
+    def fingerprint(members):
+        """Hash the columns of a partition that the recommendations depend on."""
+        digest = hashlib.sha1()
+        digest.update(members['BMI'].to_numpy(dtype=np.float64).tobytes())
+        digest.update(members['Age'].to_numpy(dtype=np.float64).tobytes())
+        digest.update('\n'.join(members['Recommended_Exercises'].fillna('')).encode('utf-8'))
+        return digest.hexdigest()
+
+    @classmethod
+    def build(cls, df):
+        """Materialize every partition of the dataset."""
+        table = cls()
+        table.refresh(df)
+        return table
+
+    def refresh(self, df):
+        """Bring the table up to date with the dataset, rebuilding only changed partitions.
+
+        Returns the number of partitions that were rebuilt or dropped.
+        """
+        # The vocabulary is append-only so ids in untouched partitions stay valid
+        for value in df['Recommended_Exercises']:
+            for name in split_exercises(value):
+                if name not in self.vocabulary_index:
+                    self.vocabulary_index[name] = len(self.vocabulary)
+                    self.vocabulary.append(name)
+
+        partitions = {}
+        rebuilt = 0
+        for key, members in self.partition_members(df):
+            fingerprint = self.fingerprint(members)
+            partition = self.partitions.get(key)
+            if partition is None or partition.fingerprint != fingerprint:
+                partition = _Partition.build(members, fingerprint, self.vocabulary_index)
+                rebuilt += 1
+            partitions[key] = partition
+        removed = len(set(self.partitions) - set(partitions))
+        self.partitions = partitions
+        return rebuilt + removed
+
+    def find_partition(self, predicted_workout, predicted_experience):
+        """Return the partition the live search would use, relaxing the filters the same way."""
+        for key in [(predicted_workout, int(predicted_experience)),
+                    (predicted_workout, ANY_EXPERIENCE),
+                    (ANY_WORKOUT, ANY_EXPERIENCE)]:
+            if key in self.partitions:
+                return self.partitions[key]
+        return None
+
+    def lookup(self, user_info, predicted_workout, predicted_experience, refine=True):
+        """Return the similar-member exercise list for a user, or None if the user is off the grid.
+
+        With refine=False the precomputed list of the cell is returned as is.
+        """
+        partition = self.find_partition(predicted_workout, predicted_experience)
+        if partition is None:
+            return None
+
+        user_bmi = float(user_info['BMI'])
+        user_age = float(user_info['Age'])
+        i = int(np.floor((user_bmi - BMI_RANGE[0]) / BMI_STEP))
+        j = int(np.floor((user_age - AGE_RANGE[0]) / AGE_STEP))
+        if not (0 <= i < partition.cell_members.shape[0] and 0 <= j < partition.cell_members.shape[1]):
+            return None
+
+        if refine:
+            candidates = partition.cell_members[i, j]
+            candidates = candidates[candidates >= 0]
+            scores = similarity_scores(partition.bmi[candidates], partition.age[candidates],
+                                       user_bmi, user_age, *partition.scales(user_bmi, user_age))
+            members = candidates[np.argsort(scores, kind='stable')[:SIMILAR_MEMBERS]]
+            ids = partition.member_exercises(members)
+        else:
+            ids = partition.cell_exercises[i, j]
+            ids = ids[ids >= 0]
+        return [self.vocabulary[k] for k in ids[:MAX_EXERCISES]]
+
+    def save(self, path=RECOMMENDATION_TABLE_FILE):
+        """Save the table to a compressed .npz file."""
+        keys = list(self.partitions)
+        arrays = {
+            'vocabulary': np.array(self.vocabulary),
+            'key_workouts': np.array([key[0] for key in keys]),
+            'key_experience': np.array([key[1] for key in keys], dtype=np.int8),
+            'fingerprints': np.array([self.partitions[key].fingerprint for key in keys]),
+        }
+        for n, key in enumerate(keys):
+            partition = self.partitions[key]
+            for field in ['bmi', 'age', 'exercise_indptr', 'exercise_ids', 'cell_members', 'cell_exercises']:
+                arrays[f'p{n}_{field}'] = getattr(partition, field)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path=RECOMMENDATION_TABLE_FILE):
+        """Load a table previously written with save()."""
+        with np.load(path, allow_pickle=False) as archive:
+            partitions = {}
+            keys = zip(archive['key_workouts'].tolist(), archive['key_experience'].tolist(),
+                       archive['fingerprints'].tolist())
+            for n, (workout_type, experience, fingerprint) in enumerate(keys):
+                partitions[(workout_type, int(experience))] = _Partition(
+                    fingerprint,
+                    *[archive[f'p{n}_{field}'] for field in ['bmi', 'age', 'exercise_indptr', 'exercise_ids',
+                                                             'cell_members', 'cell_exercises']])
+            return cls(archive['vocabulary'].tolist(), partitions)
+
+
+def load_or_refresh_table(df, path=RECOMMENDATION_TABLE_FILE, save=True):
+    """Load the recommendation table and refresh any partitions whose members changed.
+
+    Refreshed tables are written back unless `save` is False.
+    """
+    table = None
+    if os.path.exists(path):
+        try:
+            table = RecommendationTable.load(path)
+        except Exception:
+            print("Could not load recommendation table, rebuilding...")
+    if table is None:
+        table = RecommendationTable()
+    if table.refresh(df) and save:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table.save(path)
+    return table
+
+
+def main():
+    """Materialize (or incrementally refresh) the recommendation table from the members dataset."""
+    print("Refreshing recommendation table...")
+    df = pd.read_csv('members_with_exercise_recommendations.csv')
+    table = load_or_refresh_table(df)
+    print(f"{len(table.partitions)} partitions up to date in {RECOMMENDATION_TABLE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from html import escape
+from string import Template
+
+# Templates of the results page, parsed once per process. Lines are kept unindented,
+# since st.markdown treats indented lines as code blocks.
+WORKOUT = Template(
+    '<h3>Analysis Results</h3>\n'
+    '<ul>\n'
+    '<li><strong>Recommended Workout Type:</strong> $workout_type</li>\n'
+    '<li><strong>Experience Level:</strong> $predicted_experience (1=Beginner, 2=Intermediate, 3=Advanced)</li>\n'
+    '</ul>\n'
+    '<div style="color: #2196F3; font-weight: bold; font-size: 2em; margin-bottom: 1rem;">'
+    'Your Personalized Workout Plan</div>\n'
+    '<p><strong>Workout Type:</strong> $workout_type</p>\n'
+    '<p><strong>Experience Level:</strong> $experience_level</p>\n'
+    '<p><strong>Sessions per Week:</strong> $sessions_per_week</p>\n'
+    '<p><strong>Calories per Session:</strong> $calories_per_session</p>\n'
+    '<p><strong>Session Duration:</strong> $session_duration</p>\n'
+    '<p><strong>Hydration Recommendation:</strong> $hydration</p>'
+)
+SCHEDULE = Template('<h3>Weekly Schedule</h3>\n$days')
+SCHEDULE_DAY = Template('<p><strong>$day:</strong> $focus</p>\n<ul>$exercises</ul>\n')
+LIST_ITEM = Template('<li>$item</li>')
+NUTRITION = Template(
+    '<div style="color: #4CAF50; font-weight: bold; font-size: 2em; margin-bottom: 1rem;">'
+    'Recommended Daily Nutrition Plan</div>\n'
+    '<h3>Total Daily Nutrition</h3>\n'
+    '<ul>\n'
+    '<li><strong>Total Calories:</strong> $calories</li>\n'
+    '<li><strong>Total Protein:</strong> ${protein}g</li>\n'
+    '<li><strong>Total Carbs:</strong> ${carbs}g</li>\n'
+    '<li><strong>Total Fiber:</strong> ${fiber}g</li>\n'
+    '</ul>\n'
+    '<h3>Recommended Foods</h3>\n'
+    '$foods'
+)
+FOOD = Template(
+    '<details class="food-details">'
+    '<summary><strong>$food</strong> (x$servings)</summary>\n'
+    '<ul>\n'
+    '<li>Calories: $calories</li>\n'
+    '<li>Protein: ${protein}g</li>\n'
+    '<li>Carbs: ${carbs}g</li>\n'
+    '<li>Fiber: ${fiber}g</li>\n'
+    '</ul>'
+    '</details>\n'
+)
+
+
+def _nutrients(totals):
+    return {name.lower(): f"{value:.1f}" for name, value in totals.items()}
+
+
+def render_workout(plan, predicted_experience):
+    """HTML of the analysis results and workout plan details."""
+    return WORKOUT.substitute(
+        workout_type=escape(str(plan.workout_type)),
+        predicted_experience=escape(str(predicted_experience)),
+        experience_level=escape(str(plan.experience_level)),
+        sessions_per_week=plan.sessions_per_week,
+        calories_per_session=plan.calories_per_session,
+        session_duration=escape(plan.session_duration),
+        hydration=escape(plan.hydration),
+    )
+
+
+def render_schedule(plan):
+    """HTML of the weekly schedule of a WorkoutPlan."""
+    days = ''.join(
+        SCHEDULE_DAY.substitute(day=escape(day), focus=escape(focus),
+                                exercises=''.join(LIST_ITEM.substitute(item=escape(exercise)) for exercise in exercises))
+        for day, (focus, exercises) in plan.daily_exercises.items()
+    )
+    return SCHEDULE.substitute(days=days)
+
+
+def render_nutrition(meal_plan):
+    """HTML of the daily totals of a MealPlan and a collapsible block per food."""
+    foods = ''.join(FOOD.substitute(food=escape(food), servings=f"{servings:g}", **_nutrients(totals))
+                    for food, measure, servings, totals in meal_plan.items())
+    return NUTRITION.substitute(foods=foods, **_nutrients(meal_plan.totals))
@@ -0,0 +1,200 @@
+import itertools
+import re
+import time
+import numpy as np
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Day focus areas for strength plans
+FOCUS_AREAS = ["Upper Body", "Lower Body", "Core", "Full Body", "Arms and Back"]
+
+# The focus whose days may take exercises of any focus
+MIXED_FOCUS = "Full Body"
+
+# Keyword patterns mapped to muscle groups. Patterns are matched in order and each
+# match is removed from the name, so specific phrases ("leg press") win over
+# generic ones ("press").
+MUSCLE_GROUP_PATTERNS = [
+    (r"leg press|leg curl|hamstring curl|leg extension|hip thrust|glute|bridge|calf|step[- ]?up|pistol|adduct|abduct|sumo", "Legs"),
+    (r"squat|lunge|deadlift|hamstring|quad|box jump|good morning", "Legs"),
+    (r"leg raise|knee raise|knee tuck|crunch|plank|sit[- ]?up|twist|oblique|\babs?\b|v[- ]?up|hollow|dead bug|"
+     r"bicycle|side bend|rollout|wood ?chop|flutter|toe touch|jackknife|pike", "Core"),
+    (r"bench|push[- ]?ups?|chest|\bfly\b|\bflyes?\b|\bdips?\b|\bpec", "Chest"),
+    (r"shoulder|overhead|arnold|lateral raise|front raise|\bdelt|upright row|military|push[- ]?press|"
+     r"push[- ]?jerk|\bjerk\b|face pull", "Shoulders"),
+    (r"\brows?\b|pull[- ]?ups?|chin[- ]?ups?|pulldown|\blat\b|\blats\b|back extension|superman|shrug|pullover|pull[- ]?apart", "Back"),
+    (r"\bcurls?\b|tricep|bicep|skullcrusher|crusher|kickback|hammer|jm press|close[- ]grip|push[- ]?down", "Arms"),
+    (r"\bpress\b|\braise\b", "Shoulders"),
+    (r"burpee|jack|sprint|\brun|jog|jump rope|swing|clean|snatch|thruster|battle rope|rowing|cycling|swim|"
+     r"boxing|punch|crawl|slam|high knees|skater|shuffle|elliptical|stair|climber|hop|jump|kick", "Conditioning"),
+    (r"pose|stretch|yoga|salutation|\bdog\b|child|cobra|cat[- ]cow|pigeon|warrior|\bhold\b", "Mobility"),
+]
+
+MUSCLE_GROUP_FOCUS = {
+    "Chest": "Upper Body",
+    "Shoulders": "Upper Body",
+    "Back": "Arms and Back",
+    "Arms": "Arms and Back",
+    "Legs": "Lower Body",
+    "Core": "Core",
+    "Conditioning": "Full Body",
+    "Mobility": "Full Body",
+}
+
+_COMPILED_PATTERNS = [(re.compile(pattern), group) for pattern, group in MUSCLE_GROUP_PATTERNS]
+
+
+def classify_exercise(name):
+    """Return the (muscle groups, focus area) of an exercise, inferred from its name."""
+    text = name.lower()
+    groups = []
+    for pattern, group in _COMPILED_PATTERNS:
+        text, matches = pattern.subn(" ", text)
+        if matches and group not in groups:
+            groups.append(group)
+
+    focuses = {MUSCLE_GROUP_FOCUS[group] for group in groups}
+    if len(focuses) == 1:
+        focus = focuses.pop()
+    elif focuses == {"Upper Body", "Arms and Back"}:
+        focus = "Upper Body"
+    else:
+        # Unknown or compound movements work the whole body
+        focus = "Full Body"
+    return tuple(groups), focus
+
+
+class ExerciseIndex:
+    """Exercise-to-muscle-group and focus-area index over the exercise catalog."""
+
+    def __init__(self, exercises=()):
+        self.muscle_groups = {}
+        self.focus = {}
+        for exercise in exercises:
+            self.add(exercise)
+
+    def add(self, exercise):
+        groups, focus = classify_exercise(exercise)
+        self.muscle_groups[exercise] = groups
+        self.focus[exercise] = focus
+        return focus
+
+    def focus_of(self, exercise):
+        """Return the focus area of an exercise, classifying exercises outside the catalog on the fly.
+
+        Lookups never modify the index, so one index can be shared between threads.
+        """
+        focus = self.focus.get(exercise)
+        return focus if focus is not None else classify_exercise(exercise)[1]
+
+    def exercises_by_focus(self, exercises, focus_areas=FOCUS_AREAS):
+        """Group exercises by focus area, keeping their order."""
+        grouped = {focus: [] for focus in focus_areas}
+        for exercise in exercises:
+            focus = self.focus_of(exercise)
+            grouped.setdefault(focus, []).append(exercise)
+        return grouped
+
+
+def _layout_scores(positions):
+    """Score weekly layouts, given as sorted workout day positions, on recovery spacing (higher is better)."""
+    gaps = (np.roll(positions, -1, axis=1) - positions) % 7  # Days until the next workout, wrapping into next week
+    gaps[gaps == 0] = 7
+    # Penalize back-to-back workouts and prefer rest days spread evenly between workouts
+    return -1.0 * (gaps == 1).sum(axis=1) - 0.5 * gaps.std(axis=1), gaps
+
+
+def _assignment_scores(gaps, sequences, supply, exercises_per_day):
+    """Score every (layout, focus sequence) pair at once (higher is better)."""
+    same_focus = sequences == np.roll(sequences, -1, axis=1)  # (S, k), same focus at the next workout
+    if sequences.shape[1] == 1:
+        same_focus[:] = False
+
+    # Recovery: the same focus on back-to-back days is worst, one rest day in between still hurts
+    penalty = (gaps == 1) * 3.0 + (gaps == 2) * 1.0                      # (L, k)
+    recovery = np.einsum('lk,sk->ls', penalty, same_focus.astype(np.float64))
+
+    # Coverage: number of distinct focus areas trained during the week
+    counts = (sequences[:, :, None] == np.arange(len(supply))).sum(axis=1)  # (S, F)
+    coverage = (counts > 0).sum(axis=1)
+
+    # No repeats: exercises that would have to be reused because a focus runs out
+    shortfall = np.clip(counts * exercises_per_day - supply[None, :], 0, None).sum(axis=1)
+
+    return -recovery + 1.0 * coverage[None, :] - 0.5 * shortfall[None, :]
+
+
+def plan_schedule(recommendations, sessions_per_week, exercise_index, focus_areas=FOCUS_AREAS,
+                  exercises_per_day=4, time_budget=0.05, chunk_size=8):
+    """Pick the best weekly layout and day-to-exercise assignment for the recommendations.
+
+    Every way of placing the workout days in the week is combined with every
+    sequence of focus areas for those days, and all candidates are scored with
+    NumPy. Layouts are evaluated in chunks and the search stops early, keeping
+    the best plan so far, once `time_budget` seconds are spent. With a single
+    focus area only the layout is searched and exercises keep their rank order.
+
+    Days only list exercises of their focus (MIXED_FOCUS days take any), so
+    focus areas with too few recommendations to fill a day are not scheduled.
+
+    Returns (workout_days, rest_days, daily) where daily maps each workout day
+    to a (focus, exercises) tuple.
+    """
+    start = time.perf_counter()
+    sessions_per_week = max(1, min(int(sessions_per_week), len(DAYS)))
+
+    if len(focus_areas) == 1:
+        pools = {focus_areas[0]: list(recommendations)}
+    else:
+        grouped = exercise_index.exercises_by_focus(recommendations, focus_areas)
+        pools = {focus: grouped.get(focus, []) for focus in focus_areas}
+        if MIXED_FOCUS in pools:
+            # Mixed days take their own exercises first, then the rest in rank order
+            pools[MIXED_FOCUS] = pools[MIXED_FOCUS] + [e for e in recommendations if e not in pools[MIXED_FOCUS]]
+    supply = np.array([len(pools[focus]) for focus in focus_areas], dtype=np.float64)
+
+    # Only schedule focus areas that can fill a day on their own, or failing that any with exercises
+    fillable = supply >= min(exercises_per_day, len(recommendations))
+    if not fillable.any():
+        fillable = supply > 0
+    if not fillable.any():
+        fillable[:] = True
+
+    positions = np.array(list(itertools.combinations(range(len(DAYS)), sessions_per_week)))
+    sequences = np.array(list(itertools.product(np.flatnonzero(fillable), repeat=sessions_per_week)))
+    layout_scores, gaps = _layout_scores(positions)
+
+    best_score, best_layout, best_sequence = -np.inf, 0, 0
+    for lo in range(0, len(positions), chunk_size):
+        hi = lo + chunk_size
+        scores = layout_scores[lo:hi, None] + _assignment_scores(gaps[lo:hi], sequences, supply, exercises_per_day)
+        i, j = np.unravel_index(int(np.argmax(scores)), scores.shape)
+        if scores[i, j] > best_score:
+            best_score, best_layout, best_sequence = scores[i, j], lo + i, j
+        if time.perf_counter() - start > time_budget:
+            break
+
+    workout_days = [DAYS[d] for d in positions[best_layout]]
+    rest_days = [day for day in DAYS if day not in workout_days]
+    day_focus = [focus_areas[f] for f in sequences[best_sequence]]
+
+    # Hand out exercises of each day's focus, without repeats across days until the focus runs out
+    used = set()
+    daily = {}
+    for day, focus in zip(workout_days, day_focus):
+        day_exercises = []
+        for exercise in pools[focus]:
+            if len(day_exercises) == exercises_per_day:
+                break
+            if exercise not in used:
+                used.add(exercise)
+                day_exercises.append(exercise)
+        # If the focus runs out, reuse its exercises from earlier days
+        for exercise in pools[focus]:
+            if len(day_exercises) == exercises_per_day:
+                break
+            if exercise not in day_exercises:
+                day_exercises.append(exercise)
+        daily[day] = (focus, day_exercises)
+
+    return workout_days, rest_days, daily
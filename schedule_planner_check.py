@@ -0,0 +1,49 @@
+"""Check that plan_schedule only fills a day with exercises of its focus area.
+
+Plans a week at 1-5 sessions for the exercises the chatbot recommends to
+sampled member profiles and counts the days, other than MIXED_FOCUS days,
+that list an exercise of another focus, and the days with fewer exercises
+than asked for. Both counts should be zero.
+
+Usage: python schedule_planner_check.py [--profiles 300]
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+os.chdir(ROOT)
+
+import schedule_planner
+from chatbot_concurrency import sample_profiles
+from gym_chatbot_new import GymChatbot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', type=int, default=300)
+    args = parser.parse_args()
+
+    chatbot = GymChatbot.shared()
+    exercise_index = chatbot.snapshot.exercise_index
+    days = off_focus = short = 0
+    for user_info in sample_profiles(args.profiles, seed=5):
+        workout, experience = chatbot.classify_profile(user_info)
+        recommendations = chatbot.get_exercise_recommendations(user_info, workout, experience)
+        for sessions_per_week in range(1, 6):
+            _, _, daily = schedule_planner.plan_schedule(recommendations, sessions_per_week, exercise_index)
+            for focus, exercises in daily.values():
+                days += 1
+                short += len(exercises) < 4
+                if focus != schedule_planner.MIXED_FOCUS:
+                    off_focus += any(exercise_index.focus_of(name) != focus for name in exercises)
+
+    print(f"{days} days planned, {off_focus} with off-focus exercises, {short} short")
+    if off_focus or short:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
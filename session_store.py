@@ -0,0 +1,146 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+import pandas as pd
+import plan_types
+
+SESSION_STORE_FILE = None  # Set to a path like 'data/sessions.db' to keep results in SQLite instead of memory
+SESSION_STORE_BYTES = 64 * 1024 * 1024  # Serialized results kept before the least recently used are evicted
+
+
+def serialize_results(results):
+    """Pack the results of a planner run into compressed JSON bytes."""
+    data = {
+        'plan': results['plan'].to_dict(),
+        'meal_plan': results['meal_plan'].to_dict(),
+        'predicted_calories': float(results['predicted_calories']),
+        'predicted_workout': str(results['predicted_workout']),
+        'predicted_experience': int(results['predicted_experience']),
+    }
+    if results.get('calories_table') is not None:
+        table = results['calories_table']
+        data['calories_table'] = {'index': table.index.tolist(), 'columns': table.columns.tolist(),
+                                  'values': table.values.round(1).tolist()}
+    if results.get('user_info') is not None:
+        data['user_info'] = results['user_info']
+    return zlib.compress(json.dumps(data, separators=(',', ':'), default=float).encode('utf-8'))
+
+
+def deserialize_results(blob):
+    """Unpack results written by serialize_results."""
+    data = json.loads(zlib.decompress(blob))
+    data['plan'] = plan_types.WorkoutPlan.from_dict(data['plan'])
+    data['meal_plan'] = plan_types.MealPlan.from_dict(data['meal_plan'])
+    if 'calories_table' in data:
+        table = data['calories_table']
+        data['calories_table'] = pd.DataFrame(table['values'], index=table['index'], columns=table['columns'])
+    return data
+
+
+def new_key():
+    return secrets.token_urlsafe(9)
+
+
+class MemoryStore:
+    """Serialized results in process memory, evicting the least recently used past max_bytes."""
+
+    def __init__(self, max_bytes=SESSION_STORE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._blobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, results, key=None):
+        """Store results under a key (a new one by default) and return the key."""
+        key = key or new_key()
+        blob = serialize_results(results)
+        with self._lock:
+            self.size -= len(self._blobs.pop(key, b''))
+            self._blobs[key] = blob
+            self.size += len(blob)
+            while self.size > self.max_bytes and len(self._blobs) > 1:
+                self.size -= len(self._blobs.popitem(last=False)[1])
+        return key
+
+    def get(self, key):
+        """Return the results stored under a key, or None if unknown or evicted."""
+        with self._lock:
+            blob = self._blobs.get(key)
+            if blob is None:
+                return None
+            self._blobs.move_to_end(key)
+        return deserialize_results(blob)
+
+    def __len__(self):
+        return len(self._blobs)
+
+
+class SqliteStore:
+    """Serialized results in a local SQLite file, shared by the processes of one server.
+
+    Evicts the least recently read results once the stored blobs exceed max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=SESSION_STORE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS results "
+                       "(key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    def _connect(self):
+        # sqlite3 connections may only be used by the thread that opened them
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def put(self, results, key=None):
+        key = key or new_key()
+        blob = serialize_results(results)
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (key, blob, len(blob), time.time()))
+            size = db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if size > self.max_bytes:
+                self._evict(db, size)
+        return key
+
+    def _evict(self, db, size):
+        for old_key, old_size in db.execute("SELECT key, size FROM results ORDER BY accessed").fetchall()[:-1]:
+            db.execute("DELETE FROM results WHERE key = ?", (old_key,))
+            size -= old_size
+            if size <= self.max_bytes:
+                break
+
+    def get(self, key):
+        with self._connect() as db:
+            row = db.execute("SELECT data FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        return deserialize_results(row[0])
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the results store of this process: SQLite if SESSION_STORE_FILE is set, else memory."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SqliteStore(SESSION_STORE_FILE) if SESSION_STORE_FILE else MemoryStore()
+    return _store